@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import json
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,12 +46,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.campus.CampusMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -142,11 +146,16 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
+# Response headers the frontend may read
+CORS_EXPOSE_HEADERS = [
+    'idempotent-replayed',
+]
 
 # JWT Settings
 from datetime import timedelta
@@ -172,3 +181,123 @@ load_dotenv()  # loads .env file
 
 DEBUG = os.getenv("DEBUG", "False") == "True"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Trip detection: a gap longer than this between OBD records ends a trip
+TRIP_GAP_MINUTES = int(os.getenv("TRIP_GAP_MINUTES", "5"))
+
+# Billing: optional distance charge on top of the hourly rate
+BILLING_RATE_PER_KM = os.getenv("BILLING_RATE_PER_KM", "0")
+
+# Recurring availability rules are materialized this many days ahead
+AVAILABILITY_HORIZON_DAYS = int(os.getenv("AVAILABILITY_HORIZON_DAYS", "14"))
+
+# How long a freed ride/slot is held for the next waitlisted user
+WAITLIST_HOLD_MINUTES = int(os.getenv("WAITLIST_HOLD_MINUTES", "15"))
+
+# Archiving: finished rides/slots older than this move to the archive tables
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "7"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+# Background jobs: name -> (callable, interval in seconds). They run in a
+# thread of the web process when SCHEDULER_ENABLED is set (enable it on one
+# worker only), or standalone with `manage.py run_scheduler`.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "False") == "True"
+SCHEDULED_JOBS = {
+    "detect_trips": ("core.trips.detect_trips", 60),
+    "expire_waitlist_holds": ("core.waitlist.expire_holds", 60),
+    "extend_availability_horizon": ("core.recurrence.extend_horizons", 60 * 60),
+    "archive_expired": ("core.archive.archive_expired", 60 * 60),
+    "settle_invoices": ("core.billing.settle_invoices", 24 * 60 * 60),
+    "purge_idempotency_keys": ("core.idempotency.purge_expired", 60 * 60),
+    "run_admin_jobs": ("core.adminjobs.run_pending", 60),
+    "score_vehicle_health": ("core.health.score_vehicles", 60 * 60),
+    "purge_outbox": ("core.outbox.purge_sent", 24 * 60 * 60),
+}
+
+# Idempotency-Key responses are replayed for this long
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+
+# Token buckets per scope: (requests per second, burst)
+RATE_LIMITS = {
+    "obd_push": (float(os.getenv("RATE_LIMIT_OBD_PER_SECOND", "2")), int(os.getenv("RATE_LIMIT_OBD_BURST", "20"))),
+    "obd_mock": (1.0, 5),
+    "create_test_vehicle": (1 / 60, 3),
+}
+# "local" keeps buckets per process, "cache" shares them through CACHES
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+
+# Write-behind OBD ingest: pushes go to a local log, a flusher bulk-inserts them
+OBD_WRITE_BEHIND = os.getenv("OBD_WRITE_BEHIND", "false").lower() == "true"
+OBD_LOG_DIR = Path(os.getenv("OBD_LOG_DIR", BASE_DIR / "var" / "obd-log"))
+OBD_LOG_GROUP_COMMIT_MS = float(os.getenv("OBD_LOG_GROUP_COMMIT_MS", "2"))
+OBD_FLUSH_INTERVAL_SECONDS = float(os.getenv("OBD_FLUSH_INTERVAL_SECONDS", "1"))
+OBD_FLUSH_BATCH_SIZE = int(os.getenv("OBD_FLUSH_BATCH_SIZE", "5000"))
+
+# Request profiling: staff send X-Profile, or a share of requests is sampled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "1"))
+PROFILING_TRACE_MEMORY = os.getenv("PROFILING_TRACE_MEMORY", "true").lower() == "true"
+
+# Purge/export jobs queued from the admin: output files and rows per chunk
+ADMIN_JOB_DIR = Path(os.getenv("ADMIN_JOB_DIR", BASE_DIR / "var" / "admin-jobs"))
+ADMIN_JOB_CHUNK_SIZE = int(os.getenv("ADMIN_JOB_CHUNK_SIZE", "2000"))
+
+# Fare suggestions: each process rebuilds its in-memory indexes this often; rentals use this much history
+PRICING_REFRESH_SECONDS = int(os.getenv("PRICING_REFRESH_SECONDS", "300"))
+PRICING_HISTORY_DAYS = int(os.getenv("PRICING_HISTORY_DAYS", "180"))
+
+# Vehicle health scores look at this much OBD history
+HEALTH_WINDOW_DAYS = int(os.getenv("HEALTH_WINDOW_DAYS", "30"))
+
+# Notification outbox, delivered by `manage.py run_outbox_worker`
+OUTBOX_CHANNELS = [
+    path for path in os.getenv("OUTBOX_CHANNELS", "core.outbox.InAppChannel,core.outbox.ConsoleChannel").split(",") if path
+]
+OUTBOX_FILE = Path(os.getenv("OUTBOX_FILE", BASE_DIR / "var" / "outbox.ndjson"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "5"))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+# A user's campus is the first group of this pattern matched against their university_id
+CAMPUS_ID_PATTERN = os.getenv("CAMPUS_ID_PATTERN", r"([A-Za-z]+)[-_/:]")
+# Campuses whose marketplace tables live in their own database, as JSON
+# {"campus": "database name"}; the connection settings are the default database's
+CAMPUS_DATABASES = {}
+for _campus, _name in json.loads(os.getenv("CAMPUS_DATABASES", "{}")).items():
+    DATABASES[f"campus_{_campus.lower()}"] = {**DATABASES["default"], "NAME": _name}
+    CAMPUS_DATABASES[_campus.lower()] = f"campus_{_campus.lower()}"
+DATABASE_ROUTERS = ["core.campus.CampusRouter"]
+
+# Response encodings in order of preference; zstd and br need the zstandard
+# and brotli packages and are skipped without them
+COMPRESSION_ENCODINGS = [name for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if name]
+# Smaller responses are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Longest a write transaction may stay open; id cursors (sync, trip
+# detection) don't move past rows younger than this
+WRITE_SETTLE_SECONDS = float(os.getenv("WRITE_SETTLE_SECONDS", "5"))
+
+# Prebuilt by `manage.py build_openapi`; served instead of generating the schema at runtime
+OPENAPI_SCHEMA_FILE = Path(os.getenv("OPENAPI_SCHEMA_FILE", BASE_DIR / "backend" / "openapi.json"))
+
+# API-only workers (serverless, short-lived) skip the admin, sessions and
+# templates-related apps and middleware to start faster
+API_ONLY = os.getenv("API_ONLY", "false").lower() == "true"
+if API_ONLY:
+    INSTALLED_APPS = [
+        'core',
+        'corsheaders',
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+    ]
+    MIDDLEWARE = [
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'core.compression.CompressionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'core.profiling.ProfilingMiddleware',
+        'core.campus.CampusMiddleware',
+    ]
@@ -1,12 +1,54 @@
-from django.contrib import admin
+import logging
+import math
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
 from django.urls import path
 from ninja import NinjaAPI
+from core.ratelimit import RateLimited
 from core.routes import router as core_router
 
-api = NinjaAPI()
+logger = logging.getLogger(__name__)
+
+
+def prebuilt_openapi_is_current():
+    """Whether the schema file was built after the last change to the API code."""
+    schema = settings.OPENAPI_SCHEMA_FILE
+    if not schema.exists():
+        return False
+    built = schema.stat().st_mtime
+    sources = [Path(__file__), *(Path(settings.BASE_DIR) / "core").glob("*.py")]
+    if any(source.stat().st_mtime > built for source in sources):
+        logger.warning("%s is older than the API code, generating the schema instead", schema)
+        return False
+    return True
+
+
+# API-only workers serve the schema built by `manage.py build_openapi`
+# instead of generating it on first request
+prebuilt_openapi = settings.API_ONLY and prebuilt_openapi_is_current()
+
+api = NinjaAPI(openapi_url=None) if prebuilt_openapi else NinjaAPI()
 api.add_router("/", core_router)
 
-urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api/", api.urls),
-]
+
+@api.exception_handler(RateLimited)
+def rate_limited(request, exc):
+    response = api.create_response(request, {"detail": "Too many requests, slow down"}, status=429)
+    response["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return response
+
+
+def openapi_schema(request):
+    return FileResponse(open(settings.OPENAPI_SCHEMA_FILE, "rb"), content_type="application/json")
+
+
+urlpatterns = []
+if prebuilt_openapi:
+    urlpatterns.append(path("api/openapi.json", openapi_schema))
+if not settings.API_ONLY:
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+urlpatterns.append(path("api/", api.urls))
@@ -1,17 +1,33 @@
+from pathlib import Path
 from django.contrib import admin
-from .models import User, Vehicle, Ride, RideBooking, OBDRecord
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, NullIf
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+from django.utils.timezone import now
+from .admin_scale import ScalableAdmin
+from .models import User, Vehicle, Ride, RideBooking, OBDRecord, Trip, Invoice, WaitlistEntry, RequestProfile, RouteDemand, AdminJob, VehicleHealth, OutboxMessage, Rating
+from .places import normalize_place
+from .profiling import flame_graph
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ['username', 'email', 'university_id', 'phone_number', 'is_verified', 'is_staff']
-    list_filter = ['is_verified', 'is_staff', 'is_superuser']
+    list_display = ['username', 'email', 'university_id', 'campus', 'phone_number', 'rating_score', 'rating_count', 'is_verified', 'is_staff']
+    list_filter = ['campus', 'is_verified', 'is_staff', 'is_superuser']
     search_fields = ['username', 'email', 'university_id']
 
 @admin.register(Ride)
-class RideAdmin(admin.ModelAdmin):
+class RideAdmin(ScalableAdmin):
     list_display = ['id', 'driver', 'source', 'destination', 'departure_time', 'fare', 'available_seats']
-    list_filter = ['departure_time', 'created_at']
-    search_fields = ['source', 'destination', 'driver__username']
+    list_select_related = ['driver']
+    date_hierarchy = 'departure_time'
+    search_fields = ['^source_key', '^destination_key', '=driver__username']
+
+    def get_search_results(self, request, queryset, search_term):
+        # source_key/destination_key hold normalized names
+        return super().get_search_results(request, queryset, normalize_place(search_term))
 
 @admin.register(Vehicle)
 class VehicleAdmin(admin.ModelAdmin):
@@ -19,13 +35,203 @@ class VehicleAdmin(admin.ModelAdmin):
     search_fields = ['name', 'registration_number', 'driver__username']
 
 @admin.register(RideBooking)
-class RideBookingAdmin(admin.ModelAdmin):
-    list_display = ['id', 'ride', 'passenger', 'booked_at']
-    list_filter = ['booked_at']
-    search_fields = ['passenger__username', 'ride__source', 'ride__destination']
+class RideBookingAdmin(ScalableAdmin):
+    list_display = ['id', 'ride', 'driver', 'passenger', 'booked_at']
+    list_select_related = ['ride', 'ride__driver', 'passenger']
+    date_hierarchy = 'booked_at'
+    search_fields = ['=passenger__username', '=ride__id']
+
+    @admin.display(description='Driver')
+    def driver(self, obj):
+        return obj.ride.driver
+
+class HasErrorFilter(admin.SimpleListFilter):
+    # A plain list_filter on error_code runs SELECT DISTINCT over the table
+    title = 'error code'
+    parameter_name = 'has_error'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Has error'), ('no', 'No error')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(error_code__isnull=False)
+        if self.value() == 'no':
+            return queryset.filter(error_code__isnull=True)
+        return queryset
+
+@admin.register(VehicleHealth)
+class VehicleHealthAdmin(admin.ModelAdmin):
+    list_display = ['vehicle', 'score', 'rpm_speed_drift', 'fuel_burn_per_hour', 'fuel_burn_zscore', 'recurring_errors', 'records', 'computed_at']
+    list_select_related = ['vehicle']
+    search_fields = ['=vehicle__registration_number']
+    ordering = ['score']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 @admin.register(OBDRecord)
-class OBDRecordAdmin(admin.ModelAdmin):
-    list_display = ['vehicle', 'timestamp', 'speed', 'rpm', 'fuel_level', 'error_code']
-    list_filter = ['timestamp', 'error_code']
+class OBDRecordAdmin(ScalableAdmin):
+    list_display = ['id', 'vehicle', 'registration_number', 'timestamp', 'speed', 'rpm', 'fuel_level', 'error_code']
+    list_filter = [HasErrorFilter]
+    list_select_related = ['vehicle']
+    date_hierarchy = 'timestamp'
+    # Exact/prefix lookups on the vehicle table, never a LIKE '%...%' scan
+    search_fields = ['=vehicle__registration_number', '^vehicle__name', '=error_code']
+
+    @admin.display(description='Registration')
+    def registration_number(self, obj):
+        return obj.vehicle.registration_number
+
+@admin.register(Trip)
+class TripAdmin(admin.ModelAdmin):
+    list_display = ['id', 'vehicle', 'booking', 'started_at', 'ended_at', 'distance_km', 'max_speed', 'is_open']
+    list_filter = ['is_open', 'started_at']
+    list_select_related = ['vehicle', 'booking']
     search_fields = ['vehicle__name', 'vehicle__registration_number']
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'renter', 'vehicle', 'period_start', 'hours', 'total', 'issued_at']
+    list_filter = ['issued_at']
+    list_select_related = ['renter', 'vehicle']
+    search_fields = ['renter__username', 'vehicle__registration_number']
+
+@admin.register(Rating)
+class RatingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'rater', 'rated', 'score', 'ride_booking', 'vehicle_booking', 'created_at']
+    list_filter = ['score']
+    list_select_related = ['rater', 'rated']
+    search_fields = ['=rater__username', '=rated__username']
+
+    # Users' rating aggregates are kept in step by core.ratings only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'ride', 'availability', 'status', 'created_at', 'hold_expires_at']
+    list_filter = ['status']
+    list_select_related = ['user', 'ride', 'availability']
+    search_fields = ['user__username']
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['id', 'method', 'path', 'status_code', 'profiler', 'duration_ms', 'sql_count', 'sql_ms', 'memory_delta_kb', 'created_at']
+    list_filter = ['profiler', 'method', 'created_at']
+    list_select_related = ['user']
+    search_fields = ['path']
+    exclude = ['stacks', 'sql_timeline']
+    readonly_fields = ['flame_graph', 'sql_queries']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Flame graph')
+    def flame_graph(self, obj):
+        return mark_safe(flame_graph(obj.stacks) or 'No samples (request finished within one interval)')
+
+    @admin.display(description='SQL timeline')
+    def sql_queries(self, obj):
+        lines = [
+            f"{q['start_ms']:>9.2f} ms  +{q['duration_ms']:.2f} ms  [{q.get('database', 'default')}]  {q['sql']}"
+            for q in obj.sql_timeline
+        ]
+        return mark_safe('<pre style="white-space: pre-wrap">' + escape('\n'.join(lines)) + '</pre>')
+
+@admin.register(RouteDemand)
+class RouteDemandAdmin(admin.ModelAdmin):
+    # Served from the aggregates, never from Ride/RideBooking
+    list_display = ['source_key', 'destination_key', 'slot', 'rides_offered', 'rides_booked', 'waitlisted', 'fill_rate', 'average_fare']
+    list_filter = ['hour_of_week']
+    search_fields = ['source_key', 'destination_key']
+    ordering = ['-waitlisted']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            fill_rate_value=Cast('rides_booked', FloatField()) / NullIf('rides_offered', Value(0))
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Slot', ordering='hour_of_week')
+    def slot(self, obj):
+        return f"{['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'][obj.hour_of_week // 24]} {obj.hour_of_week % 24:02d}:00"
+
+    @admin.display(description='Fill rate', ordering='fill_rate_value')
+    def fill_rate(self, obj):
+        return f"{obj.fill_rate_value:.0%}" if obj.fill_rate_value is not None else '-'
+
+    @admin.display(description='Average fare')
+    def average_fare(self, obj):
+        return f"{obj.average_fare:.2f}" if obj.average_fare is not None else '-'
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'recipient', 'status', 'attempts', 'available_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'event']
+    list_select_related = ['recipient']
+    search_fields = ['=recipient__username']
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected messages now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboxMessage.SENT).update(
+            status=OutboxMessage.PENDING, available_at=now(), leased_until=None
+        )
+        self.message_user(request, f"{updated} messages queued for delivery.")
+
+@admin.register(AdminJob)
+class AdminJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'description', 'progress', 'created_by', 'created_at', 'finished_at', 'download']
+    list_filter = ['kind', 'status']
+    list_select_related = ['created_by']
+    exclude = ['selection']
+    readonly_fields = ['download']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        return f"{obj.processed} / ~{obj.estimated_rows}"
+
+    @admin.display(description='File')
+    def download(self, obj):
+        if obj.kind != AdminJob.EXPORT or obj.status != AdminJob.DONE:
+            return '-'
+        return format_html('<a href="{}">Download</a>', reverse('admin:core_adminjob_download', args=[obj.id]))
+
+    def get_urls(self):
+        return [
+            path('<int:job_id>/download/', self.admin_site.admin_view(self.download_view), name='core_adminjob_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, job_id):
+        job = AdminJob.objects.filter(id=job_id, kind=AdminJob.EXPORT, status=AdminJob.DONE).first()
+        if job is None or not self.has_view_permission(request, job) or not Path(job.output_file).exists():
+            raise Http404
+        return FileResponse(open(job.output_file, 'rb'), as_attachment=True, filename=Path(job.output_file).name)
@@ -0,0 +1,149 @@
+"""
+Admin changelists for tables too big to count or page through with OFFSET.
+
+ScalableAdmin shows an estimated count, pages with an `after` primary key
+cursor instead of page numbers, and replaces the synchronous bulk delete
+with purge/export actions that run as chunked AdminJobs.
+"""
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from . import adminjobs
+from .models import AdminJob
+
+CURSOR_VAR = "after"
+# Filtered results are counted up to this many rows, then shown as "N+"
+COUNT_CAP = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count never scans the whole table: an unfiltered
+    queryset is estimated from table statistics (PostgreSQL) or the id
+    range, a filtered one is counted up to COUNT_CAP + 1 rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _table_estimate(queryset)
+            if estimate is not None:
+                return estimate
+        return queryset.order_by()[: COUNT_CAP + 1].count()
+
+
+def _table_estimate(queryset):
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    # Both ends come straight from the primary key index
+    first = model._default_manager.using(queryset.db).order_by("pk").values_list("pk", flat=True).first()
+    last = model._default_manager.using(queryset.db).order_by("-pk").values_list("pk", flat=True).first()
+    if first is None:
+        return 0
+    if isinstance(first, int):
+        return last - first + 1
+    return None
+
+
+class KeysetChangeList(ChangeList):
+    """Newest rows first, paged with ?after=<pk> instead of ?p=<page>."""
+
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        queryset = self.queryset.order_by("-pk")
+        cursor = getattr(request, "keyset_cursor", None)
+        if cursor:
+            queryset = queryset.filter(pk__lt=cursor)
+        rows = list(queryset[: self.list_per_page + 1])
+
+        self.result_list = rows[: self.list_per_page]
+        self.next_cursor = self.result_list[-1].pk if len(rows) > self.list_per_page else None
+        self.cursor = cursor
+        self.result_count = paginator.count
+        self.count_capped = bool(self.queryset.query.where) and self.result_count > COUNT_CAP
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.next_cursor is not None or bool(cursor)
+        self.paginator = paginator
+
+    def get_ordering(self, request, queryset):
+        return ["-pk"]
+
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+    def first_page_url(self):
+        return self.get_query_string(remove=[CURSOR_VAR])
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    change_list_template = "admin/keyset_change_list.html"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Sorting by a column would need an index per column; rows stay in id order
+    sortable_by = ()
+    list_per_page = 100
+    actions = ["purge_selected", "export_selected"]
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def changelist_view(self, request, extra_context=None):
+        # The cursor isn't a field lookup, so ChangeList's filter parsing
+        # must not see it; get_results() reads it from the request instead
+        request.keyset_cursor = None
+        if CURSOR_VAR in request.GET:
+            query = request.GET.copy()
+            value = query.pop(CURSOR_VAR)[-1]
+            request.GET = query
+            if value.isdigit():
+                request.keyset_cursor = int(value)
+        return super().changelist_view(request, extra_context)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Deleting millions of rows inside one request would time out
+        actions.pop("delete_selected", None)
+        return actions
+
+    def _queue(self, request, queryset, kind):
+        estimate = EstimatedCountPaginator(queryset, 1).count
+        if request.POST.get("select_across", "0") != "0":
+            # Everything the changelist's filters and search match
+            selection = {"params": {key: request.GET.getlist(key) for key in request.GET}}
+        else:
+            selection = {"pks": list(queryset.values_list("pk", flat=True))}
+        job = adminjobs.queue(
+            kind,
+            self.model,
+            selection,
+            request.user,
+            description=f"{kind} of {estimate}{'+' if estimate > COUNT_CAP else ''} {self.opts.verbose_name_plural}",
+            estimated_rows=estimate,
+        )
+        self.message_user(
+            request,
+            f"Queued {job.get_kind_display().lower()} job #{job.id}; follow it under Admin jobs.", # type: ignore
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Purge selected rows (background job)", permissions=["delete"])
+    def purge_selected(self, request, queryset):
+        self._queue(request, queryset, AdminJob.PURGE)
+
+    @admin.action(description="Export selected rows to CSV (background job)", permissions=["view"])
+    def export_selected(self, request, queryset):
+        self._queue(request, queryset, AdminJob.EXPORT)
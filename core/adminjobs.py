@@ -0,0 +1,193 @@
+import csv
+import gzip
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.utils.timezone import now
+
+from .export import DATASETS
+from .models import AdminJob
+
+logger = logging.getLogger(__name__)
+
+# A run hands the scheduler thread back after this long; the job resumes
+# from its position on the next run
+TIME_BUDGET_SECONDS = 20
+
+
+def queue(kind, model, selection, user, description="", estimated_rows=0):
+    """
+    Record a bulk action and start working on it in the background. The
+    selection is stored as data, {"pks": [...]} or the changelist's
+    {"params": {...}}, and turned back into a queryset by each run.
+    """
+    job = AdminJob.objects.create(
+        kind=kind,
+        model=model._meta.label_lower,
+        selection=selection,
+        description=description[:255],
+        estimated_rows=estimated_rows,
+        created_by=user,
+    )
+    transaction.on_commit(start_worker)
+    return job
+
+
+def _changelist_queryset(model, params, user):
+    """The rows the model's admin changelist shows for the query `params`."""
+    from django.contrib import admin
+
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(mutable=True)
+    for key, values in params.items():
+        request.GET.setlist(key, values)
+    request.user = user or AnonymousUser()
+    model_admin = admin.site._registry[model]
+    return model_admin.get_changelist_instance(request).get_queryset(request)
+
+
+def _queryset(job):
+    model = apps.get_model(job.model)
+    if "pks" in job.selection:
+        queryset = model._default_manager.filter(pk__in=job.selection["pks"])
+    else:
+        queryset = _changelist_queryset(model, job.selection["params"], job.created_by)
+    return queryset.order_by("pk")
+
+
+def export_fields(model):
+    for dataset in DATASETS.values():
+        if dataset.model is model:
+            return dataset.fields
+    return tuple(field.attname for field in model._meta.concrete_fields)
+
+
+def _purge_chunk(job, queryset, chunk_size):
+    ids = list(queryset.filter(pk__gt=job.position).values_list("pk", flat=True)[:chunk_size])
+    if ids:
+        with transaction.atomic():
+            queryset.model._default_manager.filter(pk__in=ids).delete()
+            job.position = ids[-1]
+            job.processed += len(ids)
+            job.save(update_fields=["position", "processed"])
+    return len(ids)
+
+
+def _export_chunk(job, queryset, chunk_size):
+    fields = export_fields(queryset.model)
+    if "pk" not in fields and "id" not in fields:
+        fields = ("pk", *fields)
+    rows = list(queryset.filter(pk__gt=job.position).values_list(*fields)[:chunk_size])
+    if not rows:
+        return 0
+    path = Path(job.output_file)
+    # Each chunk appends a gzip member; concatenated members are one valid file
+    with gzip.open(path, "at", newline="") as file:
+        writer = csv.writer(file)
+        if not job.processed:
+            writer.writerow(fields)
+        writer.writerows(rows)
+    # A crash between the write and this save repeats the chunk in the file
+    job.position = rows[-1][0]
+    job.processed += len(rows)
+    job.save(update_fields=["position", "processed"])
+    return len(rows)
+
+
+def _run(job, deadline, chunk_size):
+    queryset = _queryset(job)
+    if job.kind == AdminJob.EXPORT and not job.output_file:
+        directory = Path(settings.ADMIN_JOB_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        job.output_file = str(directory / f"{job.model.replace('.', '-')}-{job.id}.csv.gz") # type: ignore
+        job.save(update_fields=["output_file"])
+    step = _purge_chunk if job.kind == AdminJob.PURGE else _export_chunk
+    while time.monotonic() < deadline:
+        if not step(job, queryset, chunk_size):
+            job.status = AdminJob.DONE
+            job.finished_at = now()
+            job.save(update_fields=["status", "finished_at"])
+            return True
+    return False
+
+
+def _claimable():
+    """Unfinished jobs nobody else is running."""
+    return AdminJob.objects.filter(status__in=[AdminJob.PENDING, AdminJob.RUNNING]).filter(
+        Q(leased_until__isnull=True) | Q(leased_until__lt=now())
+    )
+
+
+def _claim(time_budget):
+    """Lease the oldest claimable job."""
+    open_jobs = _claimable()
+    for job_id in open_jobs.order_by("created_at").values_list("id", flat=True)[:10]:
+        # The lease outlives the run by a margin so a slow chunk can't lose it
+        claimed = open_jobs.filter(id=job_id).update(
+            status=AdminJob.RUNNING, leased_until=now() + timedelta(seconds=time_budget * 2)
+        )
+        if claimed:
+            return AdminJob.objects.get(id=job_id)
+    return None
+
+
+def run_pending(chunk_size=None, time_budget=TIME_BUDGET_SECONDS):
+    """Work through queued admin jobs, oldest first, for up to `time_budget` seconds."""
+    chunk_size = chunk_size or settings.ADMIN_JOB_CHUNK_SIZE
+    deadline = time.monotonic() + time_budget
+    stats = {"finished": 0, "failed": 0}
+    while time.monotonic() < deadline:
+        job = _claim(time_budget)
+        if job is None:
+            break
+        try:
+            finished = _run(job, deadline, chunk_size)
+        except Exception:
+            logger.exception("Admin job %s failed", job.id) # type: ignore
+            job.status = AdminJob.FAILED
+            job.error = traceback.format_exc()
+            job.finished_at = now()
+            job.save(update_fields=["status", "error", "finished_at"])
+            stats["failed"] += 1
+            continue
+        finally:
+            AdminJob.objects.filter(id=job.id).update(leased_until=None) # type: ignore
+        if not finished:
+            break
+        stats["finished"] += 1
+    return stats
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _work():
+    try:
+        # A run stops at its time budget with the lease released, so this
+        # keeps going until every job is done or leased by another worker
+        while _claimable().exists():
+            run_pending()
+    finally:
+        close_old_connections()
+
+
+def start_worker():
+    """Run queued jobs in a thread now; the scheduler picks up anything left after a restart."""
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_work, name="admin-jobs", daemon=True)
+        _worker.start()
@@ -0,0 +1,121 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils.timezone import localtime
+
+from . import campus
+from .models import ArchivedRide, ArchivedRideBooking, Ride, RouteDemand
+from .places import normalize_place
+
+
+def hour_of_week(moment):
+    local = localtime(moment)
+    return local.weekday() * 24 + local.hour
+
+
+def _bump(source_key, destination_key, departure_time, **deltas):
+    """Add `deltas` to a route's counters, creating its row on first use."""
+    slot = {"source_key": source_key, "destination_key": destination_key, "hour_of_week": hour_of_week(departure_time)}
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    _observe_price(source_key, destination_key, slot["hour_of_week"], deltas)
+    if RouteDemand.objects.filter(**slot).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            RouteDemand.objects.create(**slot, **deltas)
+    except IntegrityError:
+        # Created concurrently by another request
+        RouteDemand.objects.filter(**slot).update(**updates)
+
+
+def _observe_price(source_key, destination_key, hour, deltas):
+    from . import pricing
+
+    pricing.observe_on_commit(
+        pricing.RIDES,
+        (source_key, destination_key),
+        hour,
+        offered=deltas.get("rides_offered", 0),
+        demand=deltas.get("rides_booked", 0) + deltas.get("waitlisted", 0),
+        price=float(deltas.get("fare_total", 0)),
+    )
+
+
+def ride_offered(ride, sign=1):
+    _bump(ride.source_key, ride.destination_key, ride.departure_time, rides_offered=sign, fare_total=sign * ride.fare)
+
+
+def ride_booked(ride, sign=1):
+    _bump(ride.source_key, ride.destination_key, ride.departure_time, rides_booked=sign)
+
+
+def ride_waitlisted(ride):
+    _bump(ride.source_key, ride.destination_key, ride.departure_time, waitlisted=1)
+
+
+def _accumulate(totals, source_key, destination_key, departure_time, fare, booked):
+    row = totals[(source_key, destination_key, hour_of_week(departure_time))]
+    row["rides_offered"] += 1
+    row["rides_booked"] += 1 if booked else 0
+    row["fare_total"] += fare
+
+
+def rebuild():
+    """
+    Recompute RouteDemand from live and archived rides, e.g. after
+    deploying it or if counters drifted. Waitlist counts are kept, since
+    past waitlist entries aren't a reliable history.
+    """
+    totals = defaultdict(lambda: {"rides_offered": 0, "rides_booked": 0, "fare_total": Decimal(0)})
+
+    for alias in campus.databases():
+        live = Ride.objects.using(alias).annotate(booking_count=Count("bookings")).values_list(
+            "source_key", "destination_key", "departure_time", "fare", "booking_count"
+        )
+        for source_key, destination_key, departure_time, fare, booking_count in live.iterator(chunk_size=2000):
+            _accumulate(totals, source_key, destination_key, departure_time, fare, booking_count)
+
+        booked_archived = set(
+            ArchivedRideBooking.objects.using(alias).values_list("ride_original_id", flat=True).distinct()
+        )
+        archived = ArchivedRide.objects.using(alias).values_list(
+            "original_id", "source", "destination", "departure_time", "fare"
+        )
+        for original_id, source, destination, departure_time, fare in archived.iterator(chunk_size=2000):
+            _accumulate(
+                totals,
+                normalize_place(source),
+                normalize_place(destination),
+                departure_time,
+                fare,
+                original_id in booked_archived,
+            )
+
+    waitlisted = {
+        (source_key, destination_key, hour): count
+        for source_key, destination_key, hour, count in RouteDemand.objects.filter(waitlisted__gt=0).values_list(
+            "source_key", "destination_key", "hour_of_week", "waitlisted"
+        )
+    }
+    empty = {"rides_offered": 0, "rides_booked": 0, "fare_total": Decimal(0)}
+    # Slots with only waitlist demand are kept too
+    slots = totals.keys() | waitlisted.keys()
+
+    with transaction.atomic():
+        RouteDemand.objects.all().delete()
+        RouteDemand.objects.bulk_create(
+            [
+                RouteDemand(
+                    source_key=slot[0],
+                    destination_key=slot[1],
+                    hour_of_week=slot[2],
+                    waitlisted=waitlisted.get(slot, 0),
+                    **totals.get(slot, empty),
+                )
+                for slot in slots
+            ],
+            batch_size=1000,
+        )
+    return {"routes": len(slots)}
@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from . import campus, places, sync
+
+        sync.connect()
+        places.connect()
+        campus.connect()
+
+        if settings.SCHEDULER_ENABLED:
+            from .scheduler import start_in_process
+            start_in_process()
+
+        if settings.OBD_WRITE_BEHIND:
+            from . import obdlog
+            obdlog.start_in_process()
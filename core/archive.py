@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+
+from . import campus
+from .models import (
+    ArchivedRide,
+    ArchivedRideBooking,
+    ArchivedVehicleAvailability,
+    ArchivedVehicleBooking,
+    JobRun,
+    RequestProfile,
+    Ride,
+    RideBooking,
+    VehicleAvailability,
+    VehicleBooking,
+)
+from .sync import prune_changes, record_changes
+
+RIDE_FIELDS = ("id", "driver_id", "source", "destination", "departure_time", "fare", "available_seats", "status", "created_at")
+RIDE_BOOKING_FIELDS = ("id", "ride_id", "passenger_id", "booked_at", "liability_accepted", "liability_accepted_at")
+AVAILABILITY_FIELDS = ("id", "vehicle_id", "pickup_point", "available_from", "available_to", "price_per_hour", "is_booked", "created_at")
+VEHICLE_BOOKING_FIELDS = ("id", "availability_id", "renter_id", "booked_at", "liability_accepted", "liability_accepted_at")
+
+
+def complete_departed_rides(batch_size):
+    completed = 0
+    while True:
+        rides = [
+            Ride(id=ride_id, campus=ride_campus)
+            for ride_id, ride_campus in Ride.objects.filter(status=Ride.OPEN, departure_time__lt=now()).values_list(
+                "id", "campus"
+            )[:batch_size]
+        ]
+        if not rides:
+            return completed
+        with campus.atomic():
+            completed += Ride.objects.filter(id__in=[ride.id for ride in rides]).update(status=Ride.COMPLETED)
+            record_changes(Ride, rides)
+
+
+def _move_rides(ids):
+    rides = Ride.objects.filter(id__in=ids).values(*RIDE_FIELDS)
+    bookings = list(RideBooking.objects.filter(ride_id__in=ids).values(*RIDE_BOOKING_FIELDS))
+    ArchivedRide.objects.bulk_create(
+        [ArchivedRide(original_id=row.pop("id"), **row) for row in rides], ignore_conflicts=True
+    )
+    ArchivedRideBooking.objects.bulk_create(
+        [ArchivedRideBooking(original_id=row.pop("id"), ride_original_id=row.pop("ride_id"), **row) for row in bookings],
+        ignore_conflicts=True,
+    )
+    RideBooking.objects.filter(ride_id__in=ids).delete()
+    Ride.objects.filter(id__in=ids).delete()
+    return len(bookings)
+
+
+def _move_availabilities(ids):
+    slots = VehicleAvailability.objects.filter(id__in=ids).values(*AVAILABILITY_FIELDS)
+    bookings = list(VehicleBooking.objects.filter(availability_id__in=ids).values(*VEHICLE_BOOKING_FIELDS))
+    ArchivedVehicleAvailability.objects.bulk_create(
+        [ArchivedVehicleAvailability(original_id=row.pop("id"), **row) for row in slots], ignore_conflicts=True
+    )
+    ArchivedVehicleBooking.objects.bulk_create(
+        [
+            ArchivedVehicleBooking(original_id=row.pop("id"), availability_original_id=row.pop("availability_id"), **row)
+            for row in bookings
+        ],
+        ignore_conflicts=True,
+    )
+    VehicleBooking.objects.filter(availability_id__in=ids).delete()
+    VehicleAvailability.objects.filter(id__in=ids).delete()
+    return len(bookings)
+
+
+def _drain(queryset, move, batch_size):
+    # Each batch commits on its own, so a long backlog never holds the
+    # database lock for more than one batch.
+    rows = related = 0
+    while True:
+        with campus.atomic():
+            ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return rows, related
+            related += move(ids)
+            rows += len(ids)
+
+
+@campus.each_database
+def archive_expired(batch_size=None):
+    """
+    Mark departed rides completed and move rows past the retention window
+    (and unbooked slots as soon as they end) into the archive tables.
+
+    Returns the number of rows moved per table.
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    stats = {"rides_completed": complete_departed_rides(batch_size)}
+
+    stats["rides"], stats["ride_bookings"] = _drain(
+        Ride.objects.filter(departure_time__lt=cutoff), _move_rides, batch_size
+    )
+    # Booked slots wait until they are invoiced, so billing never misses one
+    expired_slots = VehicleAvailability.objects.filter(
+        Q(is_booked=False, available_to__lt=now())
+        | Q(is_booked=True, available_to__lt=cutoff, booking__invoice__isnull=False)
+    )
+    stats["vehicle_availabilities"], stats["vehicle_bookings"] = _drain(
+        expired_slots, _move_availabilities, batch_size
+    )
+    stats["job_runs"], _ = JobRun.objects.filter(started_at__lt=cutoff).delete()
+    stats["request_profiles"], _ = RequestProfile.objects.filter(created_at__lt=cutoff).delete()
+    stats["change_log"] = prune_changes(cutoff)
+    return stats
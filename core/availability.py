@@ -0,0 +1,124 @@
+from bisect import bisect_left, insort
+
+from . import campus
+from .models import Vehicle, VehicleAvailability
+from .sync import record_changes
+
+
+class AvailabilityError(ValueError):
+    pass
+
+
+def _overlap_error(start, end):
+    return AvailabilityError(f"Overlaps existing slot {start:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M}")
+
+
+class AvailabilityCalendar:
+    """
+    Sorted, non-overlapping slots of one vehicle.
+
+    Because slots never overlap, ordering them by start also orders them by
+    end, so the only slot that can overlap [start, end) is the last one that
+    starts before `end`, found with a single bisect.
+    """
+
+    def __init__(self, intervals=()):
+        self._intervals = sorted(intervals)
+        self._starts = [interval[0] for interval in self._intervals]
+
+    @classmethod
+    def for_vehicle(cls, vehicle, start=None, end=None):
+        slots = VehicleAvailability.objects.filter(vehicle=vehicle)
+        if start is not None:
+            slots = slots.filter(available_to__gt=start)
+        if end is not None:
+            slots = slots.filter(available_from__lt=end)
+        return cls(slots.values_list("available_from", "available_to", "id"))
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def find_overlap(self, start, end):
+        i = bisect_left(self._starts, end) - 1
+        if i >= 0 and self._intervals[i][1] > start:
+            return self._intervals[i]
+        return None
+
+    def add(self, start, end, slot_id=None):
+        conflict = self.find_overlap(start, end)
+        if conflict is not None:
+            raise _overlap_error(conflict[0], conflict[1])
+        interval = (start, end, slot_id)
+        insort(self._intervals, interval)
+        self._starts.insert(bisect_left(self._starts, start), start)
+
+
+def lock_vehicle(vehicle):
+    # Slot writers for one vehicle queue on its row until their transaction
+    # ends, so two of them can't both pass the overlap check. Taken on the
+    # mirrored row in the slots' own database, inside campus.atomic().
+    Vehicle.objects.using(campus.database()).select_for_update().only("pk").get(pk=vehicle.pk)
+
+
+def find_conflict(vehicle, start, end, exclude_id=None):
+    # Same predecessor rule as AvailabilityCalendar, answered by the
+    # (vehicle, available_from) index without loading the calendar. Locks
+    # the vehicle first, so call it inside campus.atomic() with the write.
+    lock_vehicle(vehicle)
+    slots = VehicleAvailability.objects.filter(vehicle=vehicle, available_from__lt=end)
+    if exclude_id is not None:
+        slots = slots.exclude(id=exclude_id)
+    previous = slots.order_by("-available_from").first()
+    if previous is not None and previous.available_to > start:
+        return previous
+    return None
+
+
+def validate_window(vehicle, start, end):
+    if start >= end:
+        raise AvailabilityError("available_to must be after available_from")
+    if start < vehicle.available_from or end > vehicle.available_to:
+        raise AvailabilityError("Slot must fall within the vehicle's availability window")
+
+
+def create_slot(vehicle, **fields):
+    start, end = fields["available_from"], fields["available_to"]
+    validate_window(vehicle, start, end)
+    with campus.atomic():
+        conflict = find_conflict(vehicle, start, end)
+        if conflict is not None:
+            raise _overlap_error(conflict.available_from, conflict.available_to)
+        return VehicleAvailability.objects.create(vehicle=vehicle, **fields)
+
+
+def split_slot(availability, start, end):
+    """
+    Shrink `availability` to [start, end) and republish the uncovered parts
+    of the original window as new free slots.
+    """
+    if start >= end:
+        raise AvailabilityError("Booking end must be after its start")
+    if start < availability.available_from or end > availability.available_to:
+        raise AvailabilityError("Booking window must fall within the availability slot")
+
+    remainders = []
+    for piece_start, piece_end in ((availability.available_from, start), (end, availability.available_to)):
+        if piece_start < piece_end:
+            remainders.append(
+                VehicleAvailability(
+                    vehicle=availability.vehicle,
+                    pickup_point=availability.pickup_point,
+                    pickup_key=availability.pickup_key,
+                    campus=availability.campus,
+                    price_per_hour=availability.price_per_hour,
+                    available_from=piece_start,
+                    available_to=piece_end,
+                )
+            )
+
+    availability.available_from = start
+    availability.available_to = end
+    availability.save(update_fields=["available_from", "available_to"])
+    VehicleAvailability.objects.bulk_create(remainders)
+    record_changes(VehicleAvailability, remainders)
+    return remainders
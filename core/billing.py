@@ -0,0 +1,144 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import (
+    BigIntegerField, Case, DateTimeField, DecimalField, DurationField, ExpressionWrapper, F, FloatField, Func,
+    OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Floor, Round
+from django.utils.timezone import now
+
+from . import campus
+from .models import Invoice, Trip, VehicleBooking
+
+CENT = Decimal("0.01")
+
+# Invoice columns in the order the priced SELECT produces them
+INVOICE_COLUMNS = [
+    "booking_id", "renter_id", "vehicle_id", "period_start", "period_end", "hours", "rate_per_hour",
+    "distance_km", "rate_per_km", "time_amount", "usage_amount", "total", "issued_at",
+]
+
+
+class _Seconds(Func):
+    """Whole seconds of a duration expression, truncated."""
+
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite durations are integer microseconds
+        return self.as_sql(compiler, connection, template="(%(expressions)s / 1000000)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="FLOOR(EXTRACT(EPOCH FROM %(expressions)s))::bigint", **extra_context)
+
+
+def _integer(expression):
+    return ExpressionWrapper(expression, output_field=BigIntegerField())
+
+
+def _divide_half_up(numerator, denominator):
+    # Integer division on both backends, so amounts stay exact
+    return _integer((numerator * 2 + denominator) / (denominator * 2))
+
+
+def _amount(cents, decimal_places=2):
+    return ExpressionWrapper(cents * Value(Decimal(1).scaleb(-decimal_places)), output_field=DecimalField())
+
+
+def _trip_distance():
+    return (
+        Trip.objects.filter(booking=OuterRef("pk"))
+        .values("booking")
+        .annotate(total=Sum("distance_km"))
+        .values("total")
+    )
+
+
+def _trip_distances(ids):
+    # Trips stay in the default database, so bookings in a campus database
+    # get their distances from a second query, passed back in as literals
+    totals = (
+        Trip.objects.using(DEFAULT_DB_ALIAS).filter(booking_id__in=ids)
+        .values("booking")
+        .annotate(total=Sum("distance_km"))
+        .values_list("booking", "total")
+    )
+    whens = [When(pk=booking_id, then=Value(total)) for booking_id, total in totals]
+    return Case(*whens, default=Value(0.0), output_field=FloatField()) if whens else Value(0.0)
+
+
+def _priced(bookings, distance, rate_per_km, issued_at):
+    """
+    `bookings` as rows of INVOICE_COLUMNS, priced in the SELECT itself.
+
+    The arithmetic runs on integer seconds, cents and metres and rounds
+    half up once per amount, so totals never pick up float error.
+    """
+    seconds = _Seconds(
+        ExpressionWrapper(F("availability__available_to") - F("availability__available_from"), output_field=DurationField())
+    )
+    price_cents = Cast(Round(F("availability__price_per_hour") * 100), BigIntegerField())
+    metres = Cast(Floor(Coalesce(distance, Value(0.0)) * 1000 + Value(0.5)), BigIntegerField())
+    rate_cents = int(rate_per_km / CENT)
+    time_cents = _divide_half_up(seconds * price_cents, 3600)
+    usage_cents = _divide_half_up(metres * rate_cents, 1000)
+
+    columns = {
+        "booking_id": F("pk"),
+        "renter_id": F("renter_id"),
+        "vehicle_id": F("availability__vehicle_id"),
+        "period_start": F("availability__available_from"),
+        "period_end": F("availability__available_to"),
+        "hours": _amount(_divide_half_up(seconds * 100, 3600)),
+        "rate_per_hour": F("availability__price_per_hour"),
+        "distance_km": _amount(metres, 3),
+        "rate_per_km": Value(rate_per_km, output_field=DecimalField()),
+        "time_amount": _amount(time_cents),
+        "usage_amount": _amount(usage_cents),
+        "total": _amount(time_cents + usage_cents),
+        "issued_at": Value(issued_at, output_field=DateTimeField()),
+    }
+    # Prefixed, since annotations may not shadow VehicleBooking's own fields
+    return bookings.annotate(**{f"invoice_{name}": value for name, value in columns.items()}).values(
+        *(f"invoice_{name}" for name in INVOICE_COLUMNS)
+    )
+
+
+def _insert(rows):
+    """INSERT the priced rows; returns the totals, in cents, of those actually inserted."""
+    connection = connections[rows.db]
+    select, params = rows.query.sql_with_params()
+    table = connection.ops.quote_name(Invoice._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(Invoice._meta.get_field(name).column) for name in INVOICE_COLUMNS)
+    with connection.cursor() as cursor:
+        # Bookings invoiced meanwhile by an overlapping run hit the unique
+        # booking and are skipped; RETURNING only lists the rows written
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) {select} ON CONFLICT DO NOTHING RETURNING ROUND(total * 100)", params
+        )
+        return [int(cents) for cents, in cursor.fetchall()]
+
+
+@campus.each_database
+def settle_invoices(cutoff=None, batch_size=1000):
+    """Issue invoices for every finished booking that doesn't have one yet."""
+    cutoff = cutoff or now()
+    rate_per_km = Decimal(settings.BILLING_RATE_PER_KM).quantize(CENT)
+    pending = VehicleBooking.objects.filter(invoice__isnull=True, availability__available_to__lte=cutoff).order_by("id")
+
+    stats = {"invoices": 0, "total": Decimal("0.00")}
+    last_id = 0
+    while True:
+        ids = list(pending.filter(id__gt=last_id).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        batch = pending.filter(id__gt=last_id, id__lte=ids[-1])
+        distance = Subquery(_trip_distance(), output_field=FloatField()) if pending.db == DEFAULT_DB_ALIAS else _trip_distances(ids)
+        with campus.atomic():
+            totals = _insert(_priced(batch, distance, rate_per_km, now()))
+        stats["invoices"] += len(totals)
+        stats["total"] += sum(totals) * CENT
+        last_id = ids[-1]
+    return stats
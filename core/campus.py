@@ -0,0 +1,227 @@
+"""
+Campus partitioning.
+
+Every user belongs to a campus derived from their university_id, and rides
+and vehicle slots carry their owner's campus, so listings only scan their
+own campus through campus-leading indexes. `?campus=all` (or another
+campus's name) widens a listing on demand.
+
+Campuses named in CAMPUS_DATABASES keep their marketplace tables
+(PARTITIONED_MODELS) in a database of their own. CampusRouter sends those
+models to the database of the campus active for the request (set by the
+auth layer) or of the job loop (each_database). Users and vehicles stay
+authoritative in the default database and are mirrored into campus
+databases so foreign keys and joins resolve there.
+"""
+
+import functools
+import re
+from numbers import Number
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+DEFAULT_CAMPUS = "default"
+ALL = "all"
+
+PARTITIONED_MODELS = {
+    "core.ride",
+    "core.ridebooking",
+    "core.vehicleavailability",
+    "core.availabilityrule",
+    "core.vehiclebooking",
+    "core.waitlistentry",
+    "core.invoice",
+    "core.rating",
+    "core.notification",
+    "core.changelog",
+    "core.outboxmessage",
+    "core.idempotencykey",
+    "core.archivedride",
+    "core.archivedridebooking",
+    "core.archivedvehicleavailability",
+    "core.archivedvehiclebooking",
+}
+MIRRORED_MODELS = ("core.User", "core.Vehicle")
+
+_campus = ContextVar("campus", default=None)
+_database = ContextVar("campus_database", default=None)
+
+
+def campus_for(university_id):
+    """Campus code from a university id, e.g. "IITD-2021CS10" -> "iitd"."""
+    match = re.match(settings.CAMPUS_ID_PATTERN, (university_id or "").strip())
+    return match.group(1).lower()[:32] if match else DEFAULT_CAMPUS
+
+
+def activate(campus):
+    _campus.set(campus)
+
+
+def deactivate():
+    _campus.set(None)
+    _database.set(None)
+
+
+def database(campus=None):
+    """Alias of the database holding `campus` (the active campus by default)."""
+    forced = _database.get()
+    if campus is None and forced is not None:
+        return forced
+    return settings.CAMPUS_DATABASES.get(campus or _campus.get(), DEFAULT_DB_ALIAS)
+
+
+def databases():
+    """Every database holding partitioned tables, the default one first."""
+    return [DEFAULT_DB_ALIAS, *sorted(set(settings.CAMPUS_DATABASES.values()) - {DEFAULT_DB_ALIAS})]
+
+
+def atomic():
+    """transaction.atomic() on the active campus's database."""
+    return transaction.atomic(using=database())
+
+
+@contextmanager
+def using_database(alias):
+    token = _database.set(alias)
+    try:
+        yield
+    finally:
+        _database.reset(token)
+
+
+def each_database(job):
+    """Run a background job once per campus database, adding up numeric results."""
+
+    @functools.wraps(job)
+    def wrapper(*args, **kwargs):
+        totals = {}
+        for alias in databases():
+            with using_database(alias):
+                result = job(*args, **kwargs) or {}
+            for key, value in result.items():
+                totals[key] = totals[key] + value if key in totals and isinstance(value, Number) else value
+        return totals
+
+    return wrapper
+
+
+def fetch(queryset, campus, limit=None, key=None):
+    """
+    Evaluate a listing for one campus, or for every campus with ALL. With
+    campus databases, ALL merges each database's rows by `key`.
+    """
+    if campus == ALL:
+        parts = [queryset.using(alias) for alias in databases()]
+    else:
+        parts = [queryset.using(database(campus)).filter(campus=campus)]
+    rows = [row for part in parts for row in (part[:limit] if limit else part)]
+    if len(parts) > 1 and key is not None:
+        rows.sort(key=key)
+    return rows[:limit] if limit else rows
+
+
+class CampusRouter:
+    def _route(self, model, instance=None, **hints):
+        if model._meta.label_lower not in PARTITIONED_MODELS:
+            return None
+        # Related lookups from a partitioned row stay in that row's database
+        if instance is not None and instance._meta.label_lower in PARTITIONED_MODELS and instance._state.db:
+            return instance._state.db
+        return database()
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users and vehicles exist in every database (see mirror())
+        return True
+
+
+def _bind(chunks, campus, alias):
+    _campus.set(campus)
+    _database.set(alias)
+    try:
+        yield from chunks
+    finally:
+        deactivate()
+
+
+async def _bind_async(chunks, campus, alias):
+    _campus.set(campus)
+    _database.set(alias)
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        deactivate()
+
+
+class CampusMiddleware:
+    """
+    Clears the campus left over from a previous request on this thread.
+    Streaming bodies are produced after the view returns, so they get the
+    request's campus bound in for as long as they run.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        deactivate()
+        try:
+            response = self.get_response(request)
+            if response.streaming:
+                bind = _bind_async if response.is_async else _bind
+                response.streaming_content = bind(response.streaming_content, _campus.get(), _database.get())
+            return response
+        finally:
+            deactivate()
+
+
+def _mirror(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, update_fields=None, **kwargs):
+    # Only saves to the authoritative copy are mirrored
+    if raw or using != DEFAULT_DB_ALIAS:
+        return
+    owner = instance if sender._meta.label == "core.User" else instance.driver
+    alias = database(owner.campus)
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    if update_fields:
+        # Just the saved fields: the rest of `instance` may be stale, e.g.
+        # ratings both copies keep with F() updates
+        attnames = [sender._meta.get_field(name).attname for name in update_fields]
+        if sender._base_manager.using(alias).filter(pk=instance.pk).update(**{name: getattr(instance, name) for name in attnames}):
+            return
+        # Not mirrored yet, so copy the whole stored row
+        instance = sender._base_manager.using(DEFAULT_DB_ALIAS).get(pk=instance.pk)
+    fields = {field.attname: getattr(instance, field.attname) for field in sender._meta.concrete_fields if not field.primary_key}
+    sender._base_manager.using(alias).update_or_create(pk=instance.pk, defaults=fields)
+
+
+def mirror_all():
+    """Copy every user and vehicle into their campus database, e.g. after adding one."""
+    from django.apps import apps
+
+    copied = {}
+    for label in MIRRORED_MODELS:
+        model = apps.get_model(label)
+        campus_field = "campus" if label == "core.User" else "driver__campus"
+        for campus, alias in settings.CAMPUS_DATABASES.items():
+            rows = model._base_manager.filter(**{campus_field: campus}).order_by("pk")
+            for instance in rows.iterator(chunk_size=1000):
+                _mirror(model, instance)
+            copied[f"{label}:{campus}"] = rows.count()
+    return copied
+
+
+def connect():
+    from django.apps import apps
+    from django.db.models.signals import post_save
+
+    if not settings.CAMPUS_DATABASES:
+        return
+    for label in MIRRORED_MODELS:
+        post_save.connect(_mirror, sender=apps.get_model(label), dispatch_uid=f"campus_mirror_{label}")
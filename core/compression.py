@@ -0,0 +1,174 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+zstd and brotli are used when their packages (`zstandard`, `brotli`,
+see requirements-compression.txt) are installed, gzip always is; among
+the encodings the client accepts, the first in COMPRESSION_ENCODINGS
+wins. Only API data (JSON, NDJSON, CSV) is compressed: HTML such as the
+admin carries CSRF tokens, and compressing secrets next to reflected
+input exposes them to BREACH. Responses under COMPRESSION_MIN_BYTES and
+already encoded ones are passed through. Streaming responses are compressed chunk by chunk and
+flushed after each chunk, so clients keep receiving rows as they are
+produced instead of waiting for the whole body.
+"""
+
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv")
+# Levels favour encoding speed; past these the ratio gains little on JSON
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        import zstandard
+
+        self._zstandard = zstandard
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(self._zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+CODECS = {"zstd": ("zstandard", _Zstd), "br": ("brotli", _Brotli), "gzip": (None, _Gzip)}
+
+
+def available_encodings():
+    """COMPRESSION_ENCODINGS minus those whose package isn't installed."""
+    from importlib.util import find_spec
+
+    return [
+        name for name in settings.COMPRESSION_ENCODINGS
+        if name in CODECS and (CODECS[name][0] is None or find_spec(CODECS[name][0]) is not None)
+    ]
+
+
+def accepted_encodings(header):
+    """Encodings in an Accept-Encoding header with a non-zero q-value."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def negotiate(header, encodings):
+    accepted = accepted_encodings(header)
+    for name in encodings:
+        if name in accepted or "*" in accepted:
+            return name
+    return None
+
+
+def compress_stream(codec, chunks):
+    for chunk in chunks:
+        data = codec.compress(chunk) + codec.flush()
+        if data:
+            yield data
+    yield codec.finish()
+
+
+async def compress_async_stream(codec, chunks):
+    async for chunk in chunks:
+        data = codec.compress(chunk) + codec.flush()
+        if data:
+            yield data
+    yield codec.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = available_encodings()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not self.encodings or response.status_code in (204, 206, 304):
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES):
+            return response
+        # Responses differ by Accept-Encoding even when this one isn't compressed
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encodings)
+        if encoding is None:
+            return response
+        codec = CODECS[encoding][1]()
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(codec, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(codec, response.streaming_content)
+            # The length isn't known until the stream ends
+            del response["Content-Length"]
+        else:
+            compressed = codec.compress(response.content) + codec.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The body differs byte for byte, so a strong ETag no longer holds
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,132 @@
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import OBDRecord, Ride, RideBooking, VehicleBooking
+
+FORMATS = {"csv": ("text/csv", "csv"), "ndjson": ("application/x-ndjson", "ndjson"), "columns": ("application/x-ndjson", "columns.ndjson")}
+PAGE_SIZE = 5000
+# Encoded output is handed on once it grows past this
+WRITE_SIZE = 64 * 1024
+
+
+class Dataset:
+    def __init__(self, model, fields, time_field, owner_field):
+        self.model = model
+        self.fields = fields
+        self.time_field = time_field
+        self.owner_field = owner_field
+
+    def queryset(self, user=None, start=None, end=None, **filters):
+        """Rows in [start, end), limited to `user`'s own unless staff or None."""
+        queryset = self.model.objects.filter(**filters)
+        if user is not None and not user.is_staff:
+            queryset = queryset.filter(**{self.owner_field: user})
+        if start:
+            queryset = queryset.filter(**{f"{self.time_field}__gte": start})
+        if end:
+            queryset = queryset.filter(**{f"{self.time_field}__lt": end})
+        return queryset
+
+
+DATASETS = {
+    "obd": Dataset(
+        OBDRecord,
+        ("id", "vehicle_id", "timestamp", "speed", "rpm", "fuel_level", "error_code", "location_lat", "location_lng", "device_seq"),
+        "timestamp",
+        "vehicle__driver",
+    ),
+    "rides": Dataset(
+        Ride,
+        ("id", "driver_id", "source", "destination", "departure_time", "fare", "available_seats", "status", "created_at"),
+        "departure_time",
+        "driver",
+    ),
+    "ride_bookings": Dataset(
+        RideBooking,
+        ("id", "ride_id", "passenger_id", "booked_at", "liability_accepted", "liability_accepted_at"),
+        "booked_at",
+        "passenger",
+    ),
+    "vehicle_bookings": Dataset(
+        VehicleBooking,
+        (
+            "id", "availability_id", "renter_id", "availability__vehicle_id", "availability__available_from",
+            "availability__available_to", "availability__price_per_hour", "booked_at", "liability_accepted",
+        ),
+        "booked_at",
+        "renter",
+    ),
+}
+
+
+def pages(queryset, fields, page_size=PAGE_SIZE):
+    """
+    Yield lists of row tuples in id order; the first field must be "id".
+
+    Each page is its own short query (keyset on id) read through
+    iterator(chunk_size=...), so memory stays flat and, on SQLite, the
+    read lock is dropped between pages instead of blocking writers for
+    the whole export.
+    """
+    last_id = 0
+    while True:
+        rows = queryset.filter(id__gt=last_id).order_by("id").values_list(*fields)[:page_size]
+        page = list(rows.iterator(chunk_size=page_size))
+        if not page:
+            return
+        yield page
+        last_id = page[-1][0]
+
+
+def encode_csv(fields, pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for page in pages:
+        writer.writerows(page)
+        if buffer.tell() >= WRITE_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def encode_ndjson(fields, pages):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for page in pages:
+        yield "".join(encoder.encode(dict(zip(fields, row))) + "\n" for row in page).encode()
+
+
+def encode_columns(fields, pages):
+    """
+    Column-major NDJSON: a header line, then one line per page holding
+    each field's values as an array. Loads straight into dataframes
+    without pulling in a Parquet library.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    yield (encoder.encode({"fields": list(fields)}) + "\n").encode()
+    for page in pages:
+        columns = dict(zip(fields, (list(column) for column in zip(*page))))
+        yield (encoder.encode({"rows": len(page), "columns": columns}) + "\n").encode()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "columns": encode_columns}
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream(dataset, fmt, queryset, gzip=False):
+    """Encoded export of `queryset` as a generator of bytes."""
+    fields = DATASETS[dataset].fields
+    chunks = ENCODERS[fmt](fields, pages(queryset, fields))
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,51 @@
+"""
+Sparse fieldsets for list routes: `?fields=id,departure_time`.
+
+A FieldSet maps each output field of a response schema to the model
+columns it reads and a function producing its value. Its keys are the
+allow-list for `fields=`; a projection loads only the listed fields'
+columns (and joins) and serializes only those fields.
+"""
+
+
+class FieldSetError(ValueError):
+    pass
+
+
+class FieldSet:
+    def __init__(self, schema, fields):
+        unknown = set(fields) - set(schema.model_fields)
+        if unknown:
+            raise ValueError(f"{schema.__name__} has no fields {', '.join(sorted(unknown))}")
+        self.schema = schema
+        self.fields = fields
+
+    def parse(self, value):
+        """Field names from a fields= parameter; None (everything) when it's empty."""
+        names = list(dict.fromkeys(name.strip() for name in (value or "").split(",") if name.strip()))
+        if not names:
+            return None
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldSetError(
+                f"Unknown fields: {', '.join(unknown)}; expected any of: {', '.join(self.fields)}"
+            )
+        return names
+
+    def only(self, queryset, names, also=()):
+        """
+        Narrow `queryset` to the columns behind `names`, plus `also` (columns
+        read by the caller, e.g. to merge results). Joins are kept only for
+        the relations those columns go through.
+        """
+        if names is None:
+            return queryset
+        columns = {column for name in names for column in self.fields[name][0]} | set(also)
+        relations = {column.rsplit("__", 1)[0] for column in columns if "__" in column}
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
+
+    def serialize(self, obj, names=None):
+        return {name: self.fields[name][1](obj) for name in (names or self.fields)}
@@ -0,0 +1,199 @@
+"""
+Predictive-maintenance scores from OBD history.
+
+score_vehicles() streams the last HEALTH_WINDOW_DAYS of telemetry ordered
+by (vehicle, timestamp) into numpy arrays, a chunk at a time, and scores
+each vehicle from rolling-window statistics:
+
+- rpm/speed drift: the latest rolling mean of rpm per km/h against the
+  vehicle's typical (median) rolling mean. A slipping clutch or
+  transmission shows up as the engine turning faster for the same speed.
+- fuel burn: % of tank per hour over rolling windows of consecutive
+  samples (refuels and gaps skipped); the latest window is compared with
+  the vehicle's own distribution as a z-score.
+- recurring error codes: codes reported at least ERROR_RECURRENCE times.
+
+Results are upserted into VehicleHealth.
+"""
+
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Count, FloatField, Func
+from django.utils.timezone import now
+
+from . import campus
+from .models import OBDRecord, Vehicle, VehicleHealth
+
+# Samples per rolling window
+WINDOW = 50
+# Below this speed the rpm/speed ratio is dominated by idling
+MIN_SPEED_KMH = 5.0
+# Consecutive samples further apart than this aren't used for fuel burn
+MAX_GAP_HOURS = 0.25
+ERROR_RECURRENCE = 3
+
+# Points taken off 100 per unit, and the most each signal can take off
+DRIFT_PENALTY = (100.0, 40.0)  # per 1.0 relative drift
+FUEL_PENALTY = (10.0, 30.0)  # per standard deviation beyond the first
+ERROR_PENALTY = (10.0, 30.0)  # per recurring code
+
+
+class Epoch(Func):
+    """Seconds since 1970 as a float, so timestamps load without datetime parsing."""
+
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="EXTRACT(EPOCH FROM %(expressions)s)", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="UNIX_TIMESTAMP(%(expressions)s)", **extra_context)
+
+
+def _rolling_sum(values, window):
+    import numpy as np
+
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums[window - 1 :]
+
+
+def rpm_speed_drift(speed, rpm, window=WINDOW):
+    import numpy as np
+
+    moving = (speed > MIN_SPEED_KMH) & np.isfinite(rpm)
+    ratio = rpm[moving] / speed[moving]
+    if len(ratio) < 2 * window:
+        return None
+    rolling = _rolling_sum(ratio, window) / window
+    baseline = np.median(rolling)
+    return float(abs(rolling[-1] / baseline - 1)) if baseline > 0 else None
+
+
+def fuel_burn(seconds, fuel, window=WINDOW):
+    """(latest % per hour, its z-score against earlier windows), or (None, None)."""
+    import numpy as np
+
+    usable = np.isfinite(fuel)
+    hours = np.diff(seconds[usable]) / 3600
+    burned = -np.diff(fuel[usable])
+    # Rising fuel level is a refuel; long gaps are the vehicle parked or offline
+    valid = (hours > 0) & (hours <= MAX_GAP_HOURS) & (burned >= 0)
+    if valid.sum() < 2 * window:
+        return None, None
+    rate = _rolling_sum(burned[valid], window) / _rolling_sum(hours[valid], window)
+    std = rate.std()
+    zscore = float((rate[-1] - rate.mean()) / std) if std > 0 else 0.0
+    return float(rate[-1]), zscore
+
+
+def health_score(drift, fuel_zscore, recurring_errors):
+    score = 100.0
+    if drift is not None:
+        score -= min(drift * DRIFT_PENALTY[0], DRIFT_PENALTY[1])
+    if fuel_zscore is not None:
+        score -= min(max(fuel_zscore - 1, 0) * FUEL_PENALTY[0], FUEL_PENALTY[1])
+    score -= min(len(recurring_errors) * ERROR_PENALTY[0], ERROR_PENALTY[1])
+    return round(score, 1)
+
+
+def vehicle_series(since, chunk_size=50_000):
+    """
+    Yield (vehicle_id, columns) per vehicle with telemetry since `since`,
+    where columns is a (4, n) array of seconds, speed, rpm and fuel level
+    in time order. Rows arrive in chunks; a vehicle cut by a chunk boundary
+    is carried over to the next one, so memory stays at one chunk plus one
+    vehicle.
+    """
+    import numpy as np
+
+    rows = (
+        OBDRecord.objects.filter(timestamp__gte=since)
+        .order_by("vehicle_id", "timestamp")
+        .values_list("vehicle_id", Epoch("timestamp"), "speed", "rpm", "fuel_level")
+        .iterator(chunk_size=chunk_size)
+    )
+    carried = None
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # None (missing reading) becomes NaN
+        block = np.array(chunk, dtype=float)
+        if carried is not None:
+            block = np.concatenate([carried, block])
+        starts = [0, *(np.flatnonzero(np.diff(block[:, 0])) + 1).tolist()]
+        for begin, end in zip(starts, starts[1:]):
+            yield int(block[begin, 0]), block[begin:end, 1:].T
+        # The last vehicle may continue in the next chunk
+        carried = block[starts[-1]:]
+    if carried is not None:
+        yield int(carried[0, 0]), carried[:, 1:].T
+
+
+def _recurring_errors(since):
+    errors = {}
+    counts = (
+        OBDRecord.objects.filter(timestamp__gte=since, error_code__isnull=False)
+        .values_list("vehicle_id", "error_code")
+        .annotate(occurrences=Count("id"))
+        .order_by()
+    )
+    for vehicle_id, code, occurrences in counts:
+        if occurrences >= ERROR_RECURRENCE:
+            errors.setdefault(vehicle_id, {})[code] = occurrences
+    return errors
+
+
+def score_vehicles(window_days=None, chunk_size=50_000):
+    """Score every vehicle with telemetry in the window and store the results."""
+    since = now() - timedelta(days=window_days or settings.HEALTH_WINDOW_DAYS)
+    computed_at = now()
+    errors = _recurring_errors(since)
+    results = {}
+    records = 0
+
+    for vehicle_id, (seconds, speed, rpm, fuel) in vehicle_series(since, chunk_size):
+        drift = rpm_speed_drift(speed, rpm)
+        burn, zscore = fuel_burn(seconds, fuel)
+        recurring = errors.get(vehicle_id, {})
+        results[vehicle_id] = dict(
+            vehicle_id=vehicle_id,
+            score=health_score(drift, zscore, recurring),
+            rpm_speed_drift=drift,
+            fuel_burn_per_hour=burn,
+            fuel_burn_zscore=zscore,
+            recurring_errors=recurring,
+            records=len(seconds),
+            computed_at=computed_at,
+        )
+        records += len(seconds)
+
+    # Campus databases get a copy for the vehicles mirrored into them, so
+    # listings there can join the score like the default database does
+    stored = [_store(alias, results, computed_at) for alias in campus.databases()]
+    # Counts are the default database's, which has every vehicle
+    vehicles, stale = stored[0]
+    return {"vehicles": vehicles, "records": records, "removed": stale}
+
+
+def _store(alias, results, computed_at):
+    # Skip vehicles deleted while the job ran
+    existing = set(Vehicle.objects.using(alias).filter(id__in=results).values_list("id", flat=True))
+    VehicleHealth.objects.using(alias).bulk_create(
+        [VehicleHealth(**fields) for vehicle_id, fields in results.items() if vehicle_id in existing],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["vehicle"],
+        update_fields=[
+            "score", "rpm_speed_drift", "fuel_burn_per_hour", "fuel_burn_zscore", "recurring_errors", "records", "computed_at"
+        ],
+    )
+    # Vehicles that went quiet keep no stale score
+    stale, _ = VehicleHealth.objects.using(alias).filter(computed_at__lt=computed_at).delete()
+    return len(existing), stale
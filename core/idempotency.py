@@ -0,0 +1,109 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils.timezone import now
+from ninja.errors import HttpError
+
+from . import campus
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 64
+# A claim left in progress this long belongs to a request that died
+STALE_AFTER = timedelta(minutes=1)
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.get_full_path()}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Create the in-progress record for `key`, or return the existing one."""
+    current = now()
+    try:
+        with campus.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=fingerprint,
+                expires_at=current + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.get(user=user, key=key)
+    abandoned = record.status_code is None and record.created_at < current - STALE_AFTER
+    if record.expires_at <= current or abandoned:
+        # Take the key over; the filter makes sure only one retry wins
+        taken = IdempotencyKey.objects.filter(id=record.id, created_at=record.created_at).update(
+            request_hash=fingerprint,
+            status_code=None,
+            response=None,
+            created_at=current,
+            expires_at=current + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        )
+        if taken:
+            record.refresh_from_db()
+            return record, True
+        record.refresh_from_db()
+    return record, False
+
+
+def idempotent(view):
+    """
+    Make a write safe to retry with an Idempotency-Key header.
+
+    The first request with a key runs the view and stores its response in
+    the same transaction as the view's writes; retries with the same key
+    and body get the stored response back instead of writing again.
+    Requests without the header are not affected.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise HttpError(400, f"{HEADER} must be at most {MAX_KEY_LENGTH} characters")
+
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+        if not claimed:
+            if record.request_hash != fingerprint:
+                raise HttpError(422, f"{HEADER} was already used for a different request")
+            if record.status_code is None:
+                raise HttpError(409, "A request with this Idempotency-Key is still in progress")
+            response = JsonResponse(record.response, status=record.status_code, safe=False)
+            response["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            with campus.atomic():
+                result = view(request, *args, **kwargs)
+                record.status_code = 200
+                record.response = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+                record.save(update_fields=["status_code", "response"])
+        except Exception:
+            # Failed requests can be retried with the same key
+            IdempotencyKey.objects.filter(id=record.id).delete()
+            raise
+        return result
+
+    return wrapper
+
+
+@campus.each_database
+def purge_expired():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now()).delete()
+    return {"deleted": deleted}
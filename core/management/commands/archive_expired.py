@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_expired
+
+
+class Command(BaseCommand):
+    help = "Complete departed rides and move expired rides, slots and bookings to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        stats = archive_expired(batch_size=options["batch_size"])
+        for table, count in stats.items():
+            self.stdout.write(f"{table}: {count}")
+        self.stdout.write(self.style.SUCCESS("Archive run complete"))
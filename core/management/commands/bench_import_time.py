@@ -0,0 +1,58 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+class Command(BaseCommand):
+    # core.tests.ImportTimeTests holds the budget; this breaks a run down by hand
+    help = "Measure cold-start import time (python -X importtime) of a fresh worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Report the fastest of N fresh processes")
+        parser.add_argument("--api-only", action="store_true", help="Measure with API_ONLY=true")
+        parser.add_argument("--top", type=int, default=15, help="Show the N slowest top-level imports")
+        parser.add_argument("--budget-ms", type=float, default=None, help="Fail if the fastest run exceeds this")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+        if options["api_only"]:
+            env["API_ONLY"] = "true"
+        code = f"import django; django.setup(); import {settings.ROOT_URLCONF}"
+
+        best = None
+        for _ in range(options["runs"]):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True, text=True
+            )
+            wall = (time.perf_counter() - start) * 1000
+            if result.returncode:
+                raise CommandError(result.stderr.strip().splitlines()[-1])
+            if best is None or wall < best[0]:
+                best = (wall, result.stderr)
+
+        wall, report = best
+        # Top-level entries have no indentation; their cumulative times add
+        # up to the whole import cost
+        top_level = [
+            (int(cumulative), name)
+            for _, cumulative, indent, name in LINE.findall(report)
+            if not indent
+        ]
+        imports_ms = sum(cumulative for cumulative, _ in top_level) / 1000
+        self.stdout.write(f"Process start to URLconf loaded: {wall:.0f} ms (imports {imports_ms:.0f} ms)")
+        for cumulative, name in sorted(top_level, reverse=True)[: options["top"]]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        budget = options["budget_ms"]
+        if budget is not None:
+            if wall > budget:
+                raise CommandError(f"Cold start {wall:.0f} ms is over the {budget:.0f} ms budget")
+            self.stdout.write(self.style.SUCCESS(f"Within the {budget:.0f} ms budget"))
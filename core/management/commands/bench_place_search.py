@@ -0,0 +1,69 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Place
+from core.places import normalize_place, search_places
+
+WORDS = ["gate", "hostel", "library", "block", "canteen", "station", "market", "metro", "campus", "sector", "road", "park"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _place_name(rng):
+    return f"{rng.choice(WORDS)} {''.join(rng.choices(string.ascii_lowercase, k=6))} {rng.randint(1, 999)}"
+
+
+def _typo(text, rng):
+    i = rng.randrange(len(text))
+    return text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1:]
+
+
+class Command(BaseCommand):
+    help = "Time place autocomplete against N synthetic places (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--budget-ms", type=float, default=10.0, help="Fail if p95 exceeds this")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        try:
+            with transaction.atomic():
+                names = {normalize_place(_place_name(rng)) for _ in range(options["rows"])}
+                Place.objects.bulk_create(
+                    [Place(key=name, name=name, usage_count=rng.randint(1, 50)) for name in names], batch_size=5000
+                )
+                report = self._run(rng, sorted(names), options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        for label, p50, p95, worst in report:
+            self.stdout.write(f"{label:>8}: p50 {p50:.2f} ms, p95 {p95:.2f} ms, max {worst:.2f} ms")
+        if any(p95 > options["budget_ms"] for _, _, p95, _ in report):
+            raise CommandError(f"p95 above {options['budget_ms']} ms budget")
+        self.stdout.write(self.style.SUCCESS(f"All p95 latencies within {options['budget_ms']} ms"))
+
+    def _run(self, rng, names, options):
+        samples = rng.sample(names, options["queries"])
+        workloads = {
+            "prefix": [name[: rng.randint(2, 8)] for name in samples],
+            "typo": [_typo(name[:12], rng) for name in samples],
+        }
+        report = []
+        for label, queries in workloads.items():
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                search_places(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            report.append((label, timings[len(timings) // 2], timings[int(len(timings) * 0.95)], timings[-1]))
+        return report
@@ -0,0 +1,61 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import pricing
+
+
+class Command(BaseCommand):
+    help = "Time fare suggestions for a batch of quotes against the in-memory price index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quotes", type=int, default=10_000)
+        parser.add_argument("--routes", type=int, default=2_000, help="Synthetic routes when not using --from-db")
+        parser.add_argument("--from-db", action="store_true", help="Build the ride index from RouteDemand instead")
+        parser.add_argument("--budget-ms", type=float, default=50.0, help="Fail if one-by-one quoting of the batch exceeds this")
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        rng = random.Random(0)
+        start = time.perf_counter()
+        if options["from_db"]:
+            index = pricing.build(pricing.RIDES)
+            if not index.keys:
+                raise CommandError("RouteDemand is empty; run rebuild_route_demand first")
+        else:
+            cells = []
+            for route in range(options["routes"]):
+                fare = rng.uniform(20, 120)
+                for hour in rng.sample(range(pricing.HOURS), 20):
+                    offered = rng.randint(1, 30)
+                    cells.append(((f"s{route}", f"d{route}"), hour, offered, rng.randint(0, offered + 3), fare * offered))
+            index = pricing.PriceIndex.from_cells(cells)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        keys = list(index.keys)
+        # A tenth of the quotes are for routes with no history
+        quotes = [
+            (rng.choice(keys) if rng.random() < 0.9 else ("unknown", str(i)), rng.randrange(pricing.HOURS))
+            for i in range(options["quotes"])
+        ]
+
+        start = time.perf_counter()
+        for key, hour in quotes:
+            index.quote(key, hour)
+        single_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rows = np.fromiter((index.row(key) for key, _ in quotes), dtype=np.intp, count=len(quotes))
+        hours = np.fromiter((hour for _, hour in quotes), dtype=np.intp, count=len(quotes))
+        index.quote_many(rows, hours)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        count = len(quotes)
+        self.stdout.write(f"Index of {len(keys)} keys built in {build_ms:.1f} ms")
+        self.stdout.write(f"{count} quotes one by one: {single_ms:.2f} ms ({single_ms / count * 1000:.2f} µs per quote)")
+        self.stdout.write(f"{count} quotes vectorized: {batch_ms:.2f} ms ({batch_ms / count * 1000:.3f} µs per quote)")
+        if single_ms > options["budget_ms"]:
+            raise CommandError(f"Above {options['budget_ms']} ms budget")
+        self.stdout.write(self.style.SUCCESS(f"Within {options['budget_ms']} ms budget"))
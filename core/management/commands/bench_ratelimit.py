@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core import ratelimit
+
+
+class Command(BaseCommand):
+    help = "Time the in-process rate limiter's per-request overhead"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=500_000)
+        parser.add_argument("--keys", type=int, default=10_000, help="Distinct users/vehicles to spread calls over")
+        parser.add_argument("--budget-us", type=float, default=3.0, help="Fail if the mean exceeds this")
+
+    def handle(self, *args, **options):
+        calls, keys = options["calls"], options["keys"]
+        # Generous enough that no call is rejected: we time the common path
+        limits = {"bench": (1e9, 1_000_000)}
+        with override_settings(RATE_LIMITS=limits, RATE_LIMIT_BACKEND="local"):
+            ratelimit.reset()
+            check = ratelimit.check
+            start = time.perf_counter()
+            for i in range(calls):
+                check("bench", i % keys)
+            elapsed = time.perf_counter() - start
+            ratelimit.reset()
+
+        mean_us = elapsed / calls * 1e6
+        self.stdout.write(f"{calls} checks over {keys} keys: {mean_us:.2f} µs per check")
+        if mean_us > options["budget_us"]:
+            raise CommandError(f"Mean above {options['budget_us']} µs budget")
+        self.stdout.write(self.style.SUCCESS(f"Within {options['budget_us']} µs budget"))
@@ -0,0 +1,72 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+
+from core.health import score_vehicles
+from core.models import OBDRecord, Vehicle
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time the vehicle health job over synthetic OBD history (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=1_000_000)
+        parser.add_argument("--vehicles", type=int, default=200)
+        parser.add_argument("--budget-seconds", type=float, default=10.0, help="Fail if scoring exceeds this")
+
+    def handle(self, *args, **options):
+        records, vehicles = options["records"], options["vehicles"]
+        try:
+            with transaction.atomic():
+                elapsed, stats = self._run(records, vehicles)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            f"Scored {stats['vehicles']} vehicles from {stats['records']} records in {elapsed:.2f} s "
+            f"({stats['records'] / elapsed / 1e6:.2f} M records/s)"
+        )
+        if elapsed > options["budget_seconds"]:
+            raise CommandError(f"Above {options['budget_seconds']} s budget")
+        self.stdout.write(self.style.SUCCESS(f"Within {options['budget_seconds']} s budget"))
+
+    def _run(self, records, vehicles):
+        rng = random.Random(0)
+        driver = get_user_model().objects.create_user(f"bench-{time.time_ns()}", university_id=f"bench-{time.time_ns()}")
+        fleet = Vehicle.objects.bulk_create(
+            Vehicle(driver=driver, name=f"Bench {i}", registration_number=f"BENCH{i}", available_from=now(), available_to=now())
+            for i in range(vehicles)
+        )
+        per_vehicle = records // vehicles
+        start_at = now() - timedelta(seconds=per_vehicle * 10)
+        self.stdout.write(f"Inserting {per_vehicle * vehicles} records...")
+        for vehicle in fleet:
+            fuel, rows = 100.0, []
+            for i in range(per_vehicle):
+                speed = max(rng.gauss(40, 15), 0)
+                fuel = 100.0 if fuel < 5 else fuel - rng.uniform(0, 0.02)
+                rows.append(
+                    OBDRecord(
+                        vehicle=vehicle,
+                        timestamp=start_at + timedelta(seconds=i * 10),
+                        speed=speed,
+                        rpm=int(speed * 45 + rng.gauss(800, 50)),
+                        fuel_level=fuel,
+                        error_code="P0300" if rng.random() < 0.0005 else None,
+                    )
+                )
+            OBDRecord.objects.bulk_create(rows, batch_size=5000)
+
+        start = time.perf_counter()
+        stats = score_vehicles()
+        return time.perf_counter() - start, stats
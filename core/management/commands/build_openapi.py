@@ -0,0 +1,21 @@
+import json
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Write the API's OpenAPI schema to settings.OPENAPI_SCHEMA_FILE for API-only workers to serve"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", default=None)
+
+    def handle(self, *args, **options):
+        # Works whether or not this process serves a prebuilt schema itself
+        api = import_module(settings.ROOT_URLCONF).api
+        schema = api.get_openapi_schema(path_prefix="/api/")
+        output = options["output"] or settings.OPENAPI_SCHEMA_FILE
+        with open(output, "w") as file:
+            json.dump(schema, file, separators=(",", ":"))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(schema['paths'])} paths to {output}"))
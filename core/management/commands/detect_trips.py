@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.trips import detect_trips
+
+
+class Command(BaseCommand):
+    help = "Group new OBD records into trips, resuming from the last watermark"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        stats = detect_trips(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {stats['records']} records: {stats['opened']} trips opened, {stats['closed']} closed"
+            )
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.waitlist import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Expire lapsed waitlist offers and offer the spot to the next user"
+
+    def handle(self, *args, **options):
+        stats = expire_holds()
+        self.stdout.write(self.style.SUCCESS(f"Expired {stats['expired']} holds, made {stats['offered']} new offers"))
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from core import export
+
+
+class Command(BaseCommand):
+    help = "Stream a dataset (obd, rides, ride_bookings, vehicle_bookings) to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(export.DATASETS))
+        parser.add_argument("--format", choices=list(export.FORMATS), default="csv")
+        parser.add_argument("--start", help="ISO datetime, inclusive")
+        parser.add_argument("--end", help="ISO datetime, exclusive")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--output", "-o", help="File to write; stdout if omitted")
+
+    def handle(self, *args, **options):
+        start, end = (self._parse(options[name]) for name in ("start", "end"))
+        dataset = export.DATASETS[options["dataset"]]
+        queryset = dataset.queryset(None, start, end)
+        chunks = export.stream(options["dataset"], options["format"], queryset, gzip=options["gzip"])
+
+        out = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if options["output"]:
+                out.close()
+        if options["output"]:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
+
+    def _parse(self, value):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Not an ISO datetime: {value}")
+        return parsed
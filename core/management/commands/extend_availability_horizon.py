@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.recurrence import extend_horizons
+
+
+class Command(BaseCommand):
+    help = "Materialize recurring availability rules up to the rolling horizon"
+
+    def handle(self, *args, **options):
+        stats = extend_horizons()
+        self.stdout.write(self.style.SUCCESS(f"Extended {stats['rules']} rules, created {stats['slots']} slots"))
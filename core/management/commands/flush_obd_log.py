@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.obdlog import flush, metrics
+
+
+class Command(BaseCommand):
+    help = "Move pending write-behind OBD log segments into OBDRecord (e.g. after a crash)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        stats = flush(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Flushed {stats['records']} records from {stats['segments']} segments"
+        ))
+        pending = metrics()["pending_segments"]
+        if pending:
+            self.stdout.write(f"{pending} segments still in use by running processes")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.campus import mirror_all
+
+
+class Command(BaseCommand):
+    help = "Copy users and vehicles into their campus databases (run after adding one to CAMPUS_DATABASES)"
+
+    def handle(self, *args, **options):
+        for name, count in mirror_all().items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Campus databases are up to date"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.ratings import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute users' rating aggregates from the stored ratings"
+
+    def handle(self, *args, **options):
+        stats = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Corrected the rating aggregates of {stats['users']} users"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute route demand aggregates from live and archived rides"
+
+    def handle(self, *args, **options):
+        stats = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt demand for {stats['routes']} route slots"))
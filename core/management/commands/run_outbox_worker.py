@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Deliver what is due now and exit")
+        parser.add_argument("--batch-size", type=int, default=None, help="Defaults to OUTBOX_BATCH_SIZE")
+        parser.add_argument("--idle-seconds", type=float, default=1.0, help="Poll interval when nothing is due")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            totals = {"sent": 0, "retried": 0, "failed": 0}
+            while (stats := outbox.run_batch(options["batch_size"])) is not None:
+                for key, value in stats.items():
+                    totals[key] += value
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}"
+            ))
+            return
+
+        self.stdout.write("Delivering outbox messages, press Ctrl+C to stop")
+        try:
+            outbox.run_worker(options["batch_size"], options["idle_seconds"])
+        except KeyboardInterrupt:
+            pass
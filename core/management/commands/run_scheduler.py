@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.scheduler import PeriodicRunner
+
+
+class Command(BaseCommand):
+    help = "Run the scheduled background jobs in the foreground"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run every job once and exit")
+
+    def handle(self, *args, **options):
+        runner = PeriodicRunner()
+        if options["once"]:
+            for name, func, _ in runner.jobs:
+                run = runner.run_job(name, func)
+                self.stdout.write(f"{name}: {run.error.splitlines()[-1] if run.error else run.result}")
+            return
+
+        self.stdout.write(f"Running {len(runner.jobs)} jobs, press Ctrl+C to stop")
+        try:
+            runner.run()
+        except KeyboardInterrupt:
+            runner.stop()
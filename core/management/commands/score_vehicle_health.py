@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.health import score_vehicles
+
+
+class Command(BaseCommand):
+    help = "Score every vehicle's health from recent OBD history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window-days", type=int, default=None, help="Defaults to HEALTH_WINDOW_DAYS")
+        parser.add_argument("--chunk-size", type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        stats = score_vehicles(window_days=options["window_days"], chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scored {stats['vehicles']} vehicles from {stats['records']} records, removed {stats['removed']} stale scores"
+            )
+        )
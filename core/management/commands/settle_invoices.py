@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.billing import settle_invoices
+
+
+class Command(BaseCommand):
+    help = "Issue invoices for finished vehicle bookings (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        stats = settle_invoices(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Issued {stats['invoices']} invoices totalling {stats['total']}"))
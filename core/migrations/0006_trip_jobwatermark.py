@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_ridebooking_liability_accepted_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('is_open', models.BooleanField(default=True)),
+                ('distance_km', models.FloatField(default=0)),
+                ('max_speed', models.FloatField(blank=True, null=True)),
+                ('fuel_start', models.FloatField(blank=True, null=True)),
+                ('fuel_end', models.FloatField(blank=True, null=True)),
+                ('record_count', models.IntegerField(default=0)),
+                ('last_lat', models.FloatField(blank=True, null=True)),
+                ('last_lng', models.FloatField(blank=True, null=True)),
+                ('last_record_id', models.BigIntegerField(default=0)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trips', to='core.vehiclebooking')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehicle', 'started_at'], name='core_trip_vehicle_2cf9a6_idx')],
+            },
+        ),
+    ]
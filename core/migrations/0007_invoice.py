@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_trip_jobwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('hours', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('rate_per_hour', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('distance_km', models.DecimalField(decimal_places=3, default=0, max_digits=10)),
+                ('rate_per_km', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('time_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('usage_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('issued_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoice', to='core.vehiclebooking')),
+                ('renter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoices', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='core.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['renter', 'issued_at'], name='core_invoic_renter__67ea56_idx')],
+            },
+        ),
+    ]
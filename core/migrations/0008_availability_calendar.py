@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:45
+
+from django.db import migrations, models
+
+
+def fill_pickup_key(apps, schema_editor):
+    VehicleAvailability = apps.get_model('core', 'VehicleAvailability')
+    for availability in VehicleAvailability.objects.only('id', 'pickup_point').iterator():
+        VehicleAvailability.objects.filter(id=availability.id).update(
+            pickup_key=' '.join(availability.pickup_point.lower().split())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_invoice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicleavailability',
+            name='pickup_key',
+            field=models.CharField(default='', max_length=200),
+        ),
+        migrations.RunPython(fill_pickup_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vehicleavailability',
+            index=models.Index(fields=['vehicle', 'available_from'], name='core_vehicl_vehicle_f83942_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleavailability',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['pickup_key', 'available_from'], name='free_slot_pickup_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_availability_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pickup_point', models.CharField(max_length=200)),
+                ('price_per_hour', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('weekdays', models.CharField(max_length=13)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('starts_on', models.DateField()),
+                ('ends_on', models.DateField()),
+                ('materialized_until', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_rules', to='core.vehicle')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vehicleavailability',
+            name='rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slots', to='core.availabilityrule'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_availability_rule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='core_notifi_user_id_7862c3_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('accepted', 'Accepted'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], default='waiting', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('offered_at', models.DateTimeField(blank=True, null=True)),
+                ('hold_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('availability', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='core.vehicleavailability')),
+                ('ride', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='core.ride')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ride', 'status', 'created_at'], name='core_waitli_ride_id_a9a888_idx'), models.Index(fields=['availability', 'status', 'created_at'], name='core_waitli_availab_bc82d2_idx'), models.Index(fields=['status', 'hold_expires_at'], name='core_waitli_status_d8ff22_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('availability__isnull', True), ('ride__isnull', False)), models.Q(('availability__isnull', False), ('ride__isnull', True)), _connector='OR'), name='waitlist_single_target'), models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'offered'])), fields=('user', 'ride'), name='waitlist_unique_open_ride'), models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'offered'])), fields=('user', 'availability'), name='waitlist_unique_open_availability')],
+            },
+        ),
+    ]
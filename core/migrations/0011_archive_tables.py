@@ -0,0 +1,112 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_waitlist_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRide',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('source', models.CharField(max_length=100)),
+                ('destination', models.CharField(max_length=100)),
+                ('departure_time', models.DateTimeField(db_index=True)),
+                ('fare', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('available_seats', models.IntegerField()),
+                ('status', models.CharField(max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedRideBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('ride_original_id', models.BigIntegerField(db_index=True)),
+                ('booked_at', models.DateTimeField()),
+                ('liability_accepted', models.BooleanField(default=False)),
+                ('liability_accepted_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedVehicleAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('pickup_point', models.CharField(max_length=200)),
+                ('available_from', models.DateTimeField(db_index=True)),
+                ('available_to', models.DateTimeField()),
+                ('price_per_hour', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('is_booked', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedVehicleBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('availability_original_id', models.BigIntegerField(db_index=True)),
+                ('booked_at', models.DateTimeField()),
+                ('liability_accepted', models.BooleanField(default=False)),
+                ('liability_accepted_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ride',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('completed', 'Completed')], default='open', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['status', 'departure_time'], name='core_ride_status_b1422a_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedride',
+            name='driver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_rides', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedridebooking',
+            name='passenger',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedvehicleavailability',
+            name='vehicle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_availabilities', to='core.vehicle'),
+        ),
+        migrations.AddField(
+            model_name='archivedvehiclebooking',
+            name='renter',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_vehicle_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['name', 'started_at'], name='core_jobrun_name_f17312_idx'),
+        ),
+    ]
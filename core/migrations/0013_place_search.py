@@ -0,0 +1,95 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:52
+
+from collections import Counter
+
+from django.db import migrations, models
+
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE core_place_fts USING fts5(key, content='core_place', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER core_place_fts_ai AFTER INSERT ON core_place BEGIN "
+    "INSERT INTO core_place_fts(rowid, key) VALUES (new.id, new.key); END",
+    "CREATE TRIGGER core_place_fts_ad AFTER DELETE ON core_place BEGIN "
+    "INSERT INTO core_place_fts(core_place_fts, rowid, key) VALUES ('delete', old.id, old.key); END",
+    "CREATE TRIGGER core_place_fts_au AFTER UPDATE OF key ON core_place BEGIN "
+    "INSERT INTO core_place_fts(core_place_fts, rowid, key) VALUES ('delete', old.id, old.key); "
+    "INSERT INTO core_place_fts(rowid, key) VALUES (new.id, new.key); END",
+]
+
+FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_place_fts_au",
+    "DROP TRIGGER IF EXISTS core_place_fts_ad",
+    "DROP TRIGGER IF EXISTS core_place_fts_ai",
+    "DROP TABLE IF EXISTS core_place_fts",
+]
+
+
+def normalize(name):
+    return ' '.join(name.lower().split())
+
+
+def create_fts(apps, schema_editor):
+    # Fuzzy search uses SQLite FTS5; other databases fall back to LIKE
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_DROP_SQL:
+        schema_editor.execute(sql)
+
+
+def fill_places(apps, schema_editor):
+    Ride = apps.get_model('core', 'Ride')
+    VehicleAvailability = apps.get_model('core', 'VehicleAvailability')
+    Place = apps.get_model('core', 'Place')
+
+    names = {}
+    usage = Counter()
+    for ride in Ride.objects.only('id', 'source', 'destination').iterator():
+        source_key, destination_key = normalize(ride.source), normalize(ride.destination)
+        Ride.objects.filter(id=ride.id).update(source_key=source_key, destination_key=destination_key)
+        for key, name in ((source_key, ride.source), (destination_key, ride.destination)):
+            names.setdefault(key, name.strip())
+            usage[key] += 1
+    for pickup_point in VehicleAvailability.objects.values_list('pickup_point', flat=True).iterator():
+        key = normalize(pickup_point)
+        names.setdefault(key, pickup_point.strip())
+        usage[key] += 1
+    Place.objects.bulk_create(
+        [Place(key=key, name=name, usage_count=usage[key]) for key, name in names.items() if key]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_sync_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('usage_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ride',
+            name='destination_key',
+            field=models.CharField(db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='ride',
+            name='source_key',
+            field=models.CharField(db_index=True, default='', max_length=100),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(fill_places, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_idempotency'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='obdrecord',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_obd_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status_code', models.SmallIntegerField(blank=True, null=True)),
+                ('profiler', models.CharField(choices=[('cprofile', 'Deterministic (cProfile)'), ('sampling', 'Sampling')], max_length=10)),
+                ('duration_ms', models.FloatField()),
+                ('sql_count', models.IntegerField(default=0)),
+                ('sql_ms', models.FloatField(default=0)),
+                ('memory_delta_kb', models.FloatField(blank=True, null=True)),
+                ('memory_peak_kb', models.FloatField(blank=True, null=True)),
+                ('stats', models.TextField(blank=True)),
+                ('stacks', models.JSONField(blank=True, default=dict)),
+                ('sql_timeline', models.JSONField(blank=True, default=list)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
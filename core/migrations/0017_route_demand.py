@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteDemand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_key', models.CharField(max_length=100)),
+                ('destination_key', models.CharField(max_length=100)),
+                ('hour_of_week', models.PositiveSmallIntegerField()),
+                ('rides_offered', models.IntegerField(default=0)),
+                ('rides_booked', models.IntegerField(default=0)),
+                ('waitlisted', models.IntegerField(default=0)),
+                ('fare_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour_of_week'], name='core_routed_hour_of_d2abae_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source_key', 'destination_key', 'hour_of_week'), name='route_demand_unique_slot')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_route_demand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('purge', 'Purge'), ('export', 'Export')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('model', models.CharField(max_length=100)),
+                ('query', models.TextField()),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('estimated_rows', models.BigIntegerField(default=0)),
+                ('processed', models.BigIntegerField(default=0)),
+                ('position', models.BigIntegerField(default=0)),
+                ('output_file', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='ridebooking',
+            name='booked_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='obdrecord',
+            index=models.Index(fields=['timestamp'], name='obd_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='obdrecord',
+            index=models.Index(fields=['vehicle', 'timestamp'], name='obd_vehicle_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='obdrecord',
+            index=models.Index(condition=models.Q(('error_code__isnull', False)), fields=['timestamp'], name='obd_error_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['departure_time'], name='core_ride_departu_dd3cc5_idx'),
+        ),
+        migrations.AddField(
+            model_name='adminjob',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='adminjob',
+            index=models.Index(fields=['status', 'created_at'], name='core_adminj_status_37eea5_idx'),
+        ),
+    ]
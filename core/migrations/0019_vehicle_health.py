@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_admin_scale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(db_index=True)),
+                ('rpm_speed_drift', models.FloatField(blank=True, null=True)),
+                ('fuel_burn_per_hour', models.FloatField(blank=True, null=True)),
+                ('fuel_burn_zscore', models.FloatField(blank=True, null=True)),
+                ('recurring_errors', models.JSONField(default=dict)),
+                ('records', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='health', to='core.vehicle')),
+            ],
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.campus import DEFAULT_CAMPUS, campus_for
+
+
+def fill_campus(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Ride = apps.get_model('core', 'Ride')
+    VehicleAvailability = apps.get_model('core', 'VehicleAvailability')
+    db = schema_editor.connection.alias
+    campuses = {}
+    for user_id, university_id in User.objects.using(db).values_list('id', 'university_id').iterator():
+        campuses.setdefault(campus_for(university_id), []).append(user_id)
+    for campus, user_ids in campuses.items():
+        if campus == DEFAULT_CAMPUS:
+            continue
+        for start in range(0, len(user_ids), 500):
+            batch = user_ids[start:start + 500]
+            User.objects.using(db).filter(id__in=batch).update(campus=campus)
+            Ride.objects.using(db).filter(driver_id__in=batch).update(campus=campus)
+            VehicleAvailability.objects.using(db).filter(vehicle__driver_id__in=batch).update(campus=campus)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ride',
+            name='campus',
+            field=models.CharField(default='default', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='campus',
+            field=models.CharField(db_index=True, default='default', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='vehicleavailability',
+            name='campus',
+            field=models.CharField(default='default', max_length=32),
+        ),
+        migrations.RunPython(fill_campus, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='trip',
+            name='booking',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trips', to='core.vehiclebooking'),
+        ),
+        migrations.AddIndex(
+            model_name='ride',
+            index=models.Index(fields=['campus', 'status', 'departure_time'], name='core_ride_campus_e40f70_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleavailability',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['campus', 'available_to'], name='free_slot_campus_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleavailability',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['campus', 'pickup_key', 'available_from'], name='free_slot_campus_pickup_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:50
+
+from django.db import migrations, models
+from django.utils.timezone import now
+
+
+def fail_queued_jobs(apps, schema_editor):
+    # Their pickled selections are dropped with the query column
+    AdminJob = apps.get_model('core', 'AdminJob')
+    AdminJob.objects.using(schema_editor.connection.alias).filter(status__in=['pending', 'running']).update(
+        status='failed', error='Queued before this upgrade; queue the action again.', finished_at=now(), leased_until=None
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_ratings'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_queued_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='adminjob',
+            name='query',
+        ),
+        migrations.AddField(
+            model_name='adminjob',
+            name='selection',
+            field=models.JSONField(default=dict),
+        ),
+    ]
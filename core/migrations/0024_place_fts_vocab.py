@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_vocab(apps, schema_editor):
+    # Per-trigram document counts for core_place_fts, see core.places
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("CREATE VIRTUAL TABLE core_place_fts_vocab USING fts5vocab(core_place_fts, row)")
+
+
+def drop_vocab(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_place_fts_vocab")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_admin_job_selection'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_vocab, drop_vocab),
+    ]
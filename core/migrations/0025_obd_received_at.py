@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_place_fts_vocab'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='obdrecord',
+            name='received_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_obd_received_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='campus',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
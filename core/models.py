@@ -1,28 +1,74 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from .campus import DEFAULT_CAMPUS, campus_for
+from .places import normalize_place
 
 
 class User(AbstractUser):
     university_id = models.CharField(max_length=50, unique=True, blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    # Derived from university_id; see core.campus
+    campus = models.CharField(max_length=32, default=DEFAULT_CAMPUS, db_index=True)
+    # Ratings received, maintained by core.ratings on every new rating.
+    # rating_score is the average shrunk towards RATING_PRIOR_MEAN as if
+    # the user also had RATING_PRIOR_WEIGHT ratings of that value.
+    RATING_PRIOR_MEAN = 4.0
+    RATING_PRIOR_WEIGHT = 5
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_score = models.FloatField(default=RATING_PRIOR_MEAN, db_index=True)
+
+    def save(self, *args, **kwargs):
+        self.campus = campus_for(self.university_id)
+        super().save(*args, **kwargs)
 
 class Ride(models.Model):
+    OPEN = "open"
+    COMPLETED = "completed"
+    STATUS_CHOICES = [
+        (OPEN, "Open"),
+        (COMPLETED, "Completed"),
+    ]
+
     driver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rides_offered")
     source = models.CharField(max_length=100)
     destination = models.CharField(max_length=100)
+    # Normalized source/destination, matched against Place.key
+    source_key = models.CharField(max_length=100, default="", db_index=True)
+    destination_key = models.CharField(max_length=100, default="", db_index=True)
     departure_time = models.DateTimeField()
     fare = models.DecimalField(max_digits=6, decimal_places=2, default=0.00) # type: ignore
     available_seats = models.IntegerField(default=1)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    campus = models.CharField(max_length=32, default=DEFAULT_CAMPUS)  # the driver's
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "departure_time"]),
+            models.Index(fields=["departure_time"]),
+            models.Index(fields=["campus", "status", "departure_time"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.campus = self.driver.campus
+        self.source_key = normalize_place(self.source)
+        self.destination_key = normalize_place(self.destination)
+        super().save(*args, **kwargs)
 
 class RideBooking(models.Model):
     ride = models.ForeignKey(Ride, on_delete=models.CASCADE, related_name="bookings")
     passenger = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookings")
-    booked_at = models.DateTimeField(auto_now_add=True)
+    booked_at = models.DateTimeField(auto_now_add=True, db_index=True)
     liability_accepted = models.BooleanField(default=False)
     liability_accepted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 class Vehicle(models.Model):
     driver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="vehicles")
@@ -31,18 +77,72 @@ class Vehicle(models.Model):
     price_per_hour = models.DecimalField(max_digits=6, decimal_places=2, default=0.00) # type: ignore
     available_from = models.DateTimeField()
     available_to = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.registration_number}"
 
+class AvailabilityRule(models.Model):
+    # Weekly recurring availability, expanded into VehicleAvailability slots
+    # only up to a rolling horizon (see core.recurrence).
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="availability_rules")
+    pickup_point = models.CharField(max_length=200)
+    price_per_hour = models.DecimalField(max_digits=6, decimal_places=2)
+    weekdays = models.CharField(max_length=13)  # e.g. "0,1,2,3,4" for Monday-Friday
+    start_time = models.TimeField()
+    end_time = models.TimeField()  # at or before start_time means the next day
+    starts_on = models.DateField()
+    ends_on = models.DateField()
+    materialized_until = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def weekday_set(self):
+        return {int(day) for day in self.weekdays.split(",") if day}
+
+    def __str__(self):
+        return f"{self.vehicle.name} on {self.weekdays} {self.start_time}-{self.end_time}"
+
 class VehicleAvailability(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="availabilities")
+    rule = models.ForeignKey(AvailabilityRule, on_delete=models.SET_NULL, null=True, blank=True, related_name="slots")
     pickup_point = models.CharField(max_length=200)
+    pickup_key = models.CharField(max_length=200, default="")  # normalized pickup_point
     available_from = models.DateTimeField()
     available_to = models.DateTimeField()
     price_per_hour = models.DecimalField(max_digits=6, decimal_places=2)
     is_booked = models.BooleanField(default=False)
+    campus = models.CharField(max_length=32, default=DEFAULT_CAMPUS)  # the vehicle owner's
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Slots of a vehicle never overlap, so this orders them by start and end
+            models.Index(fields=["vehicle", "available_from"]),
+            models.Index(
+                fields=["pickup_key", "available_from"],
+                condition=models.Q(is_booked=False),
+                name="free_slot_pickup_idx",
+            ),
+            models.Index(
+                fields=["campus", "available_to"],
+                condition=models.Q(is_booked=False),
+                name="free_slot_campus_idx",
+            ),
+            models.Index(
+                fields=["campus", "pickup_key", "available_from"],
+                condition=models.Q(is_booked=False),
+                name="free_slot_campus_pickup_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.campus = self.vehicle.driver.campus
+        self.pickup_key = normalize_place(self.pickup_point)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.vehicle.name} at {self.pickup_point} ({self.available_from} - {self.available_to})"
@@ -53,6 +153,7 @@ class VehicleBooking(models.Model):
     booked_at = models.DateTimeField(auto_now_add=True)
     liability_accepted = models.BooleanField(default=False)
     liability_accepted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.renter.username} booked {self.availability.vehicle.name}"
@@ -60,13 +161,467 @@ class VehicleBooking(models.Model):
 
 class OBDRecord(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="obd_records")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set by the caller when ingest is write-behind, so rows keep their push time
+    timestamp = models.DateTimeField(default=timezone.now)
     speed = models.FloatField(null=True, blank=True)   # km/h
     rpm = models.IntegerField(null=True, blank=True)
     fuel_level = models.FloatField(null=True, blank=True)  # %
     error_code = models.CharField(max_length=50, null=True, blank=True)
     location_lat = models.FloatField(null=True, blank=True)
     location_lng = models.FloatField(null=True, blank=True)
+    # Sequence number assigned by the dongle, used to drop retried uploads
+    device_seq = models.BigIntegerField(null=True, blank=True)
+    # Insert time, so core.trips can tell rows that may still be overtaken
+    # by a lower id; null for rows stored before the column existed
+    received_at = models.DateTimeField(auto_now_add=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["vehicle", "device_seq"], name="obd_unique_device_seq"),
+        ]
+        indexes = [
+            # Admin date drill-down, alone and per vehicle
+            models.Index(fields=["timestamp"], name="obd_timestamp_idx"),
+            models.Index(fields=["vehicle", "timestamp"], name="obd_vehicle_timestamp_idx"),
+            models.Index(fields=["timestamp"], name="obd_error_timestamp_idx", condition=models.Q(error_code__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f"OBD @ {self.timestamp} for {self.vehicle.name}"
+
+class VehicleHealth(models.Model):
+    # Latest predictive-maintenance score from core.health, kept apart from
+    # the telemetry so listings can show it with a join
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, related_name="health")
+    score = models.FloatField(db_index=True)  # 100 = nothing unusual
+    rpm_speed_drift = models.FloatField(null=True, blank=True)  # relative change of rpm/speed
+    fuel_burn_per_hour = models.FloatField(null=True, blank=True)  # % of tank, latest window
+    fuel_burn_zscore = models.FloatField(null=True, blank=True)
+    recurring_errors = models.JSONField(default=dict)  # error code -> occurrences
+    records = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.vehicle_id}: {self.score:.0f}" # type: ignore
+
+class JobWatermark(models.Model):
+    # Last processed position of an incremental background job, so a run
+    # resumes where the previous one stopped instead of rescanning history.
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class Trip(models.Model):
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="trips")
+    # No database constraint: bookings may live in a campus database (see core.campus)
+    booking = models.ForeignKey(
+        VehicleBooking, on_delete=models.SET_NULL, null=True, blank=True, related_name="trips", db_constraint=False
+    )
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    is_open = models.BooleanField(default=True)
+    distance_km = models.FloatField(default=0)
+    max_speed = models.FloatField(null=True, blank=True)  # km/h
+    fuel_start = models.FloatField(null=True, blank=True)  # %
+    fuel_end = models.FloatField(null=True, blank=True)  # %
+    record_count = models.IntegerField(default=0)
+    # Last fix seen, needed to extend an open trip across detector runs
+    last_lat = models.FloatField(null=True, blank=True)
+    last_lng = models.FloatField(null=True, blank=True)
+    last_record_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["vehicle", "started_at"]),
+        ]
+
+    @property
+    def duration_seconds(self):
+        return int((self.ended_at - self.started_at).total_seconds())
+
+    @property
+    def fuel_used(self):
+        if self.fuel_start is None or self.fuel_end is None:
+            return None
+        return round(self.fuel_start - self.fuel_end, 2)
+
+    def __str__(self):
+        return f"Trip of {self.vehicle.name} from {self.started_at}"
+
+
+class Invoice(models.Model):
+    # Totals are computed once by the billing job; the booking link is kept
+    # nullable so invoices outlive the bookings they were issued for.
+    booking = models.OneToOneField(VehicleBooking, on_delete=models.SET_NULL, null=True, blank=True, related_name="invoice")
+    renter = models.ForeignKey(User, on_delete=models.CASCADE, related_name="invoices")
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.SET_NULL, null=True, blank=True, related_name="invoices")
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    hours = models.DecimalField(max_digits=8, decimal_places=2)
+    rate_per_hour = models.DecimalField(max_digits=6, decimal_places=2)
+    distance_km = models.DecimalField(max_digits=10, decimal_places=3, default=0)
+    rate_per_km = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    time_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    usage_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    issued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["renter", "issued_at"]),
+        ]
+
+    def __str__(self):
+        return f"Invoice #{self.pk} for {self.renter.username}: {self.total}"
+
+
+class WaitlistEntry(models.Model):
+    WAITING = "waiting"
+    OFFERED = "offered"
+    ACCEPTED = "accepted"
+    EXPIRED = "expired"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (WAITING, "Waiting"),
+        (OFFERED, "Offered"),
+        (ACCEPTED, "Accepted"),
+        (EXPIRED, "Expired"),
+        (CANCELLED, "Cancelled"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="waitlist_entries")
+    ride = models.ForeignKey(Ride, on_delete=models.CASCADE, null=True, blank=True, related_name="waitlist")
+    availability = models.ForeignKey(VehicleAvailability, on_delete=models.CASCADE, null=True, blank=True, related_name="waitlist")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    offered_at = models.DateTimeField(null=True, blank=True)
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Queue order per target: the head is the oldest entry with a given status
+            models.Index(fields=["ride", "status", "created_at"]),
+            models.Index(fields=["availability", "status", "created_at"]),
+            models.Index(fields=["status", "hold_expires_at"]),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(ride__isnull=False, availability__isnull=True)
+                | models.Q(ride__isnull=True, availability__isnull=False),
+                name="waitlist_single_target",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "ride"],
+                condition=models.Q(status__in=["waiting", "offered"]),
+                name="waitlist_unique_open_ride",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "availability"],
+                condition=models.Q(status__in=["waiting", "offered"]),
+                name="waitlist_unique_open_availability",
+            ),
+        ]
+
+    def __str__(self):
+        target = f"ride {self.ride_id}" if self.ride_id else f"slot {self.availability_id}" # type: ignore
+        return f"{self.user.username} waiting for {target} ({self.status})"
+
+
+class Rating(models.Model):
+    # One party of a finished booking rating the other. The booking links
+    # are cleared when bookings are archived; the rating and the rated
+    # user's aggregates stay.
+    rater = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ratings_given")
+    rated = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ratings_received")
+    score = models.PositiveSmallIntegerField()  # 1-5
+    comment = models.CharField(max_length=500, blank=True, default="")
+    ride_booking = models.ForeignKey(RideBooking, on_delete=models.SET_NULL, null=True, blank=True, related_name="ratings")
+    vehicle_booking = models.ForeignKey(
+        VehicleBooking, on_delete=models.SET_NULL, null=True, blank=True, related_name="ratings"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["rated", "created_at"]),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(score__gte=1, score__lte=5), name="rating_score_range"),
+            models.UniqueConstraint(fields=["rater", "ride_booking"], name="rating_unique_ride_booking"),
+            models.UniqueConstraint(fields=["rater", "vehicle_booking"], name="rating_unique_vehicle_booking"),
+        ]
+
+    def __str__(self):
+        return f"{self.rater.username} rated {self.rated.username} {self.score}/5"
+
+
+class Notification(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"To {self.user.username}: {self.message}"
+
+
+class JobRun(models.Model):
+    # One row per scheduled job execution, with the counts it reported
+    name = models.CharField(max_length=50)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} @ {self.started_at}"
+
+
+# ------------------
+# Archive tables: expired rows moved out of the live tables by core.archive
+# ------------------
+class ArchivedRide(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    driver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_rides")
+    source = models.CharField(max_length=100)
+    destination = models.CharField(max_length=100)
+    departure_time = models.DateTimeField(db_index=True)
+    fare = models.DecimalField(max_digits=6, decimal_places=2)
+    available_seats = models.IntegerField()
+    status = models.CharField(max_length=10)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+class ArchivedRideBooking(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    ride_original_id = models.BigIntegerField(db_index=True)
+    passenger = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_bookings")
+    booked_at = models.DateTimeField()
+    liability_accepted = models.BooleanField(default=False)
+    liability_accepted_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+class ArchivedVehicleAvailability(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="archived_availabilities")
+    pickup_point = models.CharField(max_length=200)
+    available_from = models.DateTimeField(db_index=True)
+    available_to = models.DateTimeField()
+    price_per_hour = models.DecimalField(max_digits=6, decimal_places=2)
+    is_booked = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+class ArchivedVehicleBooking(models.Model):
+    original_id = models.BigIntegerField(unique=True)
+    availability_original_id = models.BigIntegerField(db_index=True)
+    renter = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_vehicle_bookings")
+    booked_at = models.DateTimeField()
+    liability_accepted = models.BooleanField(default=False)
+    liability_accepted_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+
+class ChangeLog(models.Model):
+    # Append-only feed behind GET /sync. The id is the client's cursor and a
+    # "delete" row is the tombstone of a removed object.
+    UPSERT = "upsert"
+    DELETE = "delete"
+    OP_CHOICES = [
+        (UPSERT, "Upsert"),
+        (DELETE, "Delete"),
+    ]
+
+    model = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+    # Only this user sees the change; null means everyone does
+    audience = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    # Only this campus's listings show the row; null means every campus's do
+    campus = models.CharField(max_length=32, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["audience", "id"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.op} {self.model} {self.object_id}"
+
+
+class Place(models.Model):
+    # Every distinct ride endpoint / pickup point, indexed for autocomplete.
+    # On SQLite an FTS5 trigram table (core_place_fts) mirrors `key`, with
+    # its per-trigram counts in core_place_fts_vocab.
+    key = models.CharField(max_length=200, unique=True)
+    name = models.CharField(max_length=200)
+    usage_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class IdempotencyKey(models.Model):
+    # Response of a write made with an Idempotency-Key header, replayed when
+    # the client retries with the same key until expires_at.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=64)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.SmallIntegerField(null=True, blank=True)  # null while in progress
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_unique_user_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'in progress'})"
+
+
+class RequestProfile(models.Model):
+    # A request run under the profiler; browsable in the admin
+    CPROFILE = "cprofile"
+    SAMPLING = "sampling"
+    PROFILER_CHOICES = [(CPROFILE, "Deterministic (cProfile)"), (SAMPLING, "Sampling")]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.SmallIntegerField(null=True, blank=True)
+    profiler = models.CharField(max_length=10, choices=PROFILER_CHOICES)
+    duration_ms = models.FloatField()
+    sql_count = models.IntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    memory_delta_kb = models.FloatField(null=True, blank=True)
+    memory_peak_kb = models.FloatField(null=True, blank=True)
+    stats = models.TextField(blank=True)  # pstats report, cProfile only
+    stacks = models.JSONField(default=dict, blank=True)  # folded stack -> samples
+    sql_timeline = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class RouteDemand(models.Model):
+    # Rides offered and booked per route and hour of the week, kept up to
+    # date by core.analytics as rides and bookings come and go
+    source_key = models.CharField(max_length=100)
+    destination_key = models.CharField(max_length=100)
+    hour_of_week = models.PositiveSmallIntegerField()  # 0 = Monday 00:00-01:00, local time
+    rides_offered = models.IntegerField(default=0)
+    rides_booked = models.IntegerField(default=0)
+    waitlisted = models.IntegerField(default=0)
+    fare_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source_key", "destination_key", "hour_of_week"], name="route_demand_unique_slot"),
+        ]
+        indexes = [
+            models.Index(fields=["hour_of_week"]),
+        ]
+
+    @property
+    def fill_rate(self):
+        return self.rides_booked / self.rides_offered if self.rides_offered else None
+
+    @property
+    def average_fare(self):
+        return self.fare_total / self.rides_offered if self.rides_offered else None
+
+    def __str__(self):
+        return f"{self.source_key} → {self.destination_key} @ {self.hour_of_week}"
+
+
+class AdminJob(models.Model):
+    # A bulk admin action (purge or export of a selection) that runs in
+    # chunks in the background instead of inside the admin request
+    PURGE = "purge"
+    EXPORT = "export"
+    KIND_CHOICES = [(PURGE, "Purge"), (EXPORT, "Export")]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    model = models.CharField(max_length=100)  # app_label.model_name
+    # {"pks": [...]} for picked rows, {"params": {...}} for a whole filtered changelist
+    selection = models.JSONField(default=dict)
+    description = models.CharField(max_length=255, blank=True)
+    estimated_rows = models.BigIntegerField(default=0)
+    processed = models.BigIntegerField(default=0)
+    position = models.BigIntegerField(default=0)  # last primary key handled
+    output_file = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    # Set while a worker is running the job, so two workers never share one
+    leased_until = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.model} #{self.id}" # type: ignore
+
+
+class OutboxMessage(models.Model):
+    # A notification written in the same transaction as the change it is
+    # about; core.outbox delivers it to the configured channels afterwards
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    event = models.CharField(max_length=50)  # e.g. "ride.booked"
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="outbox_messages")
+    message = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    # Channels that already took the message, so a retry doesn't repeat them
+    delivered_to = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)  # next attempt
+    # Set while a worker holds the message in a batch
+    claimed_by = models.CharField(max_length=32, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+            models.Index(fields=["claimed_by"]),
+        ]
 
     def __str__(self):
-        return f"OBD @ {self.timestamp} for {self.vehicle.name}"
\ No newline at end of file
+        return f"{self.event} to {self.recipient_id}" # type: ignore
@@ -0,0 +1,270 @@
+"""
+Write-behind OBD ingest.
+
+Pushes are appended to a local log and acknowledged once fsynced; a
+flusher thread moves them into OBDRecord in bulk. The log is a directory
+of segment files, one JSON entry per line. Each process appends to its
+own active segment (held with flock) and rotates it before every flush,
+so the flusher only ever reads segments nobody is writing to. Segments
+left behind by a crashed process are unlocked and get flushed like any
+other. How far a segment has been applied is kept in JobWatermark and
+committed with the rows, so a crash mid-flush never inserts twice.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from .models import JobWatermark, OBDRecord, Vehicle
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_PREFIX = "obd_log:"
+
+
+def _lock(file, blocking=True):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        return True
+    except BlockingIOError:
+        return False
+
+
+class OBDLog:
+    """Append side of the log, shared by all request threads of a process."""
+
+    def __init__(self, directory, group_commit_seconds):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.group_commit_seconds = group_commit_seconds
+        self._cond = threading.Condition()
+        self._appended = 0  # entries written by this process
+        self._durable = 0  # entries covered by an fsync
+        self._syncing = False
+        self._file = None
+        self._segment_entries = 0
+        self._open_segment()
+
+    def _open_segment(self):
+        path = self.directory / f"obd-{time.time_ns()}-{os.getpid()}.log"
+        if fcntl is None:
+            self._file = open(path, "ab")
+        else:
+            # Created under a name flushers skip and renamed once locked, or
+            # another process could drain and unlink it before we hold it
+            staging = path.with_name(path.name + ".tmp")
+            self._file = open(staging, "ab")
+            _lock(self._file)
+            os.rename(staging, path)
+        self._segment_entries = 0
+        self.active = path
+
+    def append(self, entry):
+        """Write one entry and return once it is on disk."""
+        line = json.dumps(entry, cls=DjangoJSONEncoder, separators=(",", ":")).encode() + b"\n"
+        with self._cond:
+            self._file.write(line)
+            self._appended += 1
+            self._segment_entries += 1
+            seq = self._appended
+            while self._durable < seq and self._syncing:
+                self._cond.wait()
+            if self._durable >= seq:
+                return
+            self._syncing = True
+
+        # Group commit: wait briefly so concurrent pushes share one fsync
+        time.sleep(self.group_commit_seconds)
+        with self._cond:
+            self._file.flush()
+            target = self._appended
+            fd = self._file.fileno()
+        try:
+            os.fsync(fd)
+        except OSError:
+            with self._cond:
+                self._syncing = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._durable = max(self._durable, target)
+            self._syncing = False
+            self._cond.notify_all()
+
+    def rotate(self):
+        """Seal the active segment so the flusher can read it."""
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            if not self._segment_entries:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()  # releases the flock
+            self._open_segment()
+
+    @property
+    def appended(self):
+        return self._appended
+
+
+def _segments(directory):
+    return sorted(Path(directory).glob("obd-*.log"))
+
+
+def _to_record(entry, vehicle_ids):
+    if entry["vehicle_id"] not in vehicle_ids:
+        return None
+    entry["timestamp"] = parse_datetime(entry["timestamp"])
+    return OBDRecord(**entry)
+
+
+def _apply(entries, watermark, position):
+    vehicle_ids = set(Vehicle.objects.filter(id__in={entry["vehicle_id"] for entry in entries}).values_list("id", flat=True))
+    records = [record for record in (_to_record(entry, vehicle_ids) for entry in entries) if record is not None]
+    with transaction.atomic():
+        # ignore_conflicts drops uploads whose device_seq is already stored
+        OBDRecord.objects.bulk_create(records, ignore_conflicts=True)
+        JobWatermark.objects.update_or_create(name=watermark, defaults={"position": position})
+    return len(records)
+
+
+def _drain_segment(path, batch_size):
+    """Apply one unlocked segment and delete it; None if it is still in use."""
+    watermark = WATERMARK_PREFIX + path.name
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with file:
+        # Another flusher may have drained and unlinked it while we waited
+        if not _lock(file, blocking=False) or not path.exists():
+            return None
+        position = JobWatermark.objects.filter(name=watermark).values_list("position", flat=True).first() or 0
+        stored = 0
+        batch = []
+        for line_no, raw in enumerate(file, start=1):
+            if line_no <= position:
+                continue
+            try:
+                batch.append(json.loads(raw))
+            except ValueError:
+                # A torn last line from a crash mid-write; it was never acknowledged
+                break
+            position = line_no
+            if len(batch) >= batch_size:
+                stored += _apply(batch, watermark, position)
+                batch = []
+        if batch:
+            stored += _apply(batch, watermark, position)
+        path.unlink()
+    JobWatermark.objects.filter(name=watermark).delete()
+    return stored
+
+
+_log = None
+_log_lock = threading.Lock()
+_stats = {"flushed": 0, "last_flush_at": None, "last_flush_seconds": None}
+
+
+def get_log():
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = OBDLog(settings.OBD_LOG_DIR, settings.OBD_LOG_GROUP_COMMIT_MS / 1000)
+    return _log
+
+
+def append(vehicle_id, fields):
+    get_log().append({"vehicle_id": vehicle_id, "timestamp": now(), **fields})
+
+
+def flush(batch_size=None):
+    """Move every sealed or abandoned segment into OBDRecord."""
+    batch_size = batch_size or settings.OBD_FLUSH_BATCH_SIZE
+    started = time.monotonic()
+    if _log is not None:
+        _log.rotate()
+    stats = {"segments": 0, "records": 0}
+    for path in _segments(settings.OBD_LOG_DIR):
+        if _log is not None and path == _log.active:
+            continue
+        stored = _drain_segment(path, batch_size)
+        if stored is not None:
+            stats["segments"] += 1
+            stats["records"] += stored
+    _stats["flushed"] += stats["records"]
+    _stats["last_flush_at"] = now()
+    _stats["last_flush_seconds"] = round(time.monotonic() - started, 4)
+    return stats
+
+
+def metrics():
+    # An idle process keeps an empty active segment around; it holds nothing
+    segments = [path for path in _segments(settings.OBD_LOG_DIR) if path.stat().st_size]
+    # Segment names start with their creation time, so the oldest one
+    # bounds how long the oldest pending entry has waited
+    oldest_ns = min((int(path.name.split("-")[1]) for path in segments), default=None)
+    appended = _log.appended if _log is not None else 0
+    return {
+        "enabled": settings.OBD_WRITE_BEHIND,
+        # Approximate when several processes flush the same directory
+        "queue_depth": max(appended - _stats["flushed"], 0),
+        "pending_segments": len(segments),
+        "pending_bytes": sum(path.stat().st_size for path in segments),
+        "flush_lag_seconds": round((time.time_ns() - oldest_ns) / 1e9, 3) if oldest_ns else 0.0,
+        "last_flush_at": _stats["last_flush_at"],
+        "last_flush_seconds": _stats["last_flush_seconds"],
+    }
+
+
+class Flusher(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name="obd-log-flusher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            close_old_connections()
+            try:
+                flush()
+            except Exception:
+                logger.exception("Flushing the OBD log failed")
+        close_old_connections()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_flusher = None
+
+
+def start_in_process():
+    """Open the log and start the flusher; segments from a crash are flushed on its first pass."""
+    global _flusher
+    from .scheduler import serves_requests
+
+    if _flusher is not None or not serves_requests():
+        return None
+    get_log()
+    _flusher = Flusher(settings.OBD_FLUSH_INTERVAL_SECONDS)
+    _flusher.start()
+    return _flusher
@@ -0,0 +1,341 @@
+"""
+Transactional outbox for user notifications.
+
+Request handlers call enqueue() inside the transaction that books or
+cancels, so a message exists exactly when the change committed and no
+delivery happens on the request path. `manage.py run_outbox_worker`
+claims due messages in batches, hands each batch to every channel in
+OUTBOX_CHANNELS and retries failures with exponential backoff.
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models import Min, Q
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from . import campus
+from .models import Notification, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# A claimed batch must be finished within this long or another worker takes it over
+LEASE_SECONDS = 60
+MAX_BACKOFF_SECONDS = 60 * 60
+
+
+def enqueue(event, messages, **payload):
+    """
+    Record notifications for one event; call inside the transaction making
+    the change. `messages` maps recipient user id to text.
+    """
+    OutboxMessage.objects.bulk_create(
+        [
+            OutboxMessage(event=event, recipient_id=user_id, message=text[:255], payload=payload)
+            for user_id, text in messages.items()
+        ]
+    )
+
+
+def _ride(ride):
+    return f"ride {ride.source} → {ride.destination} at {ride.departure_time:%Y-%m-%d %H:%M}"
+
+
+def _slot(availability):
+    return f"{availability.vehicle.name} at {availability.pickup_point} from {availability.available_from:%Y-%m-%d %H:%M}"
+
+
+def ride_booked(booking):
+    ride = booking.ride
+    enqueue("ride.booked", {
+        booking.passenger_id: f"You booked the {_ride(ride)}.",
+        ride.driver_id: f"{booking.passenger.username} booked your {_ride(ride)}.",
+    }, ride_id=ride.id, booking_id=booking.id)
+
+
+def ride_booking_cancelled(booking):
+    ride = booking.ride
+    enqueue("ride.booking_cancelled", {
+        booking.passenger_id: f"Your booking for the {_ride(ride)} is cancelled.",
+        ride.driver_id: f"{booking.passenger.username} cancelled their booking for your {_ride(ride)}.",
+    }, ride_id=ride.id, booking_id=booking.id)
+
+
+def vehicle_booked(booking):
+    availability = booking.availability
+    enqueue("vehicle.booked", {
+        booking.renter_id: f"You rented {_slot(availability)}.",
+        availability.vehicle.driver_id: f"{booking.renter.username} rented your {_slot(availability)}.",
+    }, availability_id=availability.id, booking_id=booking.id)
+
+
+def vehicle_booking_cancelled(booking):
+    availability = booking.availability
+    enqueue("vehicle.booking_cancelled", {
+        booking.renter_id: f"Your rental of {_slot(availability)} is cancelled.",
+        availability.vehicle.driver_id: f"{booking.renter.username} cancelled their rental of your {_slot(availability)}.",
+    }, availability_id=availability.id, booking_id=booking.id)
+
+
+def waitlist_offered(entry):
+    if entry.ride_id:
+        target, ids = _ride(entry.ride), {"ride_id": entry.ride_id}
+    else:
+        target, ids = _slot(entry.availability), {"availability_id": entry.availability_id}
+    enqueue("waitlist.offered", {
+        entry.user_id: f"A spot opened up on {target}. It is held for you until {entry.hold_expires_at:%H:%M}.",
+    }, waitlist_entry_id=entry.id, **ids)
+
+
+# ------------------
+# Channels
+# ------------------
+class Channel(ABC):
+    """Delivers a batch of messages."""
+
+    name = "channel"
+
+    @abstractmethod
+    def send_batch(self, messages):
+        """Deliver `messages`; returns {message id: error} for the ones that failed."""
+
+
+class MessageChannel(Channel):
+    """A channel whose transport takes one message at a time, e.g. SMTP."""
+
+    def send_batch(self, messages):
+        failures = {}
+        for message in messages:
+            try:
+                self.send(message)
+            except Exception as e:
+                failures[message.id] = f"{type(e).__name__}: {e}"
+        return failures
+
+    @abstractmethod
+    def send(self, message):
+        """Deliver one message, raising on failure."""
+
+
+class InAppChannel(Channel):
+    """Shows the message under GET /notifications."""
+
+    name = "inapp"
+
+    def send_batch(self, messages):
+        Notification.objects.bulk_create(
+            [Notification(user_id=message.recipient_id, message=message.message) for message in messages]
+        )
+        return {}
+
+
+class ConsoleChannel(Channel):
+    """Stand-in for SMS/push in development: one line per message on stdout."""
+
+    name = "console"
+
+    def send_batch(self, messages):
+        sys.stdout.write("".join(f"[{m.event}] to user {m.recipient_id}: {m.message}\n" for m in messages))
+        sys.stdout.flush()
+        return {}
+
+
+class FileChannel(Channel):
+    """Stand-in for email in development and tests: appends NDJSON to OUTBOX_FILE."""
+
+    name = "file"
+
+    def send_batch(self, messages):
+        path = Path(settings.OUTBOX_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [
+            json.dumps({
+                "id": m.id,
+                "event": m.event,
+                "recipient_id": m.recipient_id,
+                "message": m.message,
+                "payload": m.payload,
+                "created_at": m.created_at.isoformat(),
+            })
+            for m in messages
+        ]
+        with open(path, "a") as file:
+            file.write("\n".join(lines) + "\n")
+        return {}
+
+
+_channels = None
+
+
+def channels():
+    global _channels
+    if _channels is None:
+        _channels = [import_string(path)() for path in settings.OUTBOX_CHANNELS]
+    return _channels
+
+
+def _on_setting_changed(setting, **kwargs):
+    global _channels
+    if setting == "OUTBOX_CHANNELS":
+        _channels = None
+
+
+setting_changed.connect(_on_setting_changed)
+
+
+# ------------------
+# Worker
+# ------------------
+def _due():
+    current = now()
+    return OutboxMessage.objects.filter(status=OutboxMessage.PENDING, available_at__lte=current).filter(
+        Q(leased_until__isnull=True) | Q(leased_until__lt=current)
+    )
+
+
+def claim(batch_size, worker_id):
+    """Lease up to `batch_size` due messages, oldest first, for this worker."""
+    ids = list(_due().order_by("available_at", "id").values_list("id", flat=True)[:batch_size])
+    if not ids:
+        return []
+    # The conditional update decides races: rows another worker leased
+    # in between no longer match _due()
+    _due().filter(id__in=ids).update(claimed_by=worker_id, leased_until=now() + timedelta(seconds=LEASE_SECONDS))
+    return list(OutboxMessage.objects.filter(claimed_by=worker_id, id__in=ids).order_by("id"))
+
+
+def backoff(attempts):
+    base = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    # Jitter spreads retries of a batch that failed together
+    return min(base, MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+
+
+def deliver(messages):
+    """
+    Send claimed messages through every channel and record the outcome.
+    Delivery is at least once: a crash before the outcome is saved resends
+    the batch once the lease runs out.
+    """
+    errors = {}
+    for channel in channels():
+        todo = [m for m in messages if channel.name not in m.delivered_to]
+        if not todo:
+            continue
+        try:
+            failures = channel.send_batch(todo)
+        except Exception as e:
+            logger.exception("Outbox channel %s failed", channel.name)
+            failures = {m.id: f"{type(e).__name__}: {e}" for m in todo}
+        for message in todo:
+            if message.id in failures:
+                errors.setdefault(message.id, []).append(f"{channel.name}: {failures[message.id]}")
+            else:
+                message.delivered_to.append(channel.name)
+
+    current = now()
+    stats = {"sent": 0, "retried": 0, "failed": 0}
+    for message in messages:
+        message.claimed_by = ""
+        message.leased_until = None
+        if message.id not in errors:
+            message.status = OutboxMessage.SENT
+            message.sent_at = current
+            stats["sent"] += 1
+            continue
+        message.attempts += 1
+        message.last_error = "\n".join(errors[message.id])
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboxMessage.FAILED
+            stats["failed"] += 1
+        else:
+            message.available_at = current + timedelta(seconds=backoff(message.attempts))
+            stats["retried"] += 1
+    OutboxMessage.objects.bulk_update(
+        messages,
+        ["status", "sent_at", "attempts", "last_error", "available_at", "delivered_to", "claimed_by", "leased_until"],
+    )
+    return stats
+
+
+def run_batch(batch_size=None, worker_id=None):
+    """Deliver a batch from every campus database; None when nothing was due."""
+    worker_id = worker_id or uuid.uuid4().hex
+    stats = None
+    for alias in campus.databases():
+        with campus.using_database(alias):
+            messages = claim(batch_size or settings.OUTBOX_BATCH_SIZE, worker_id)
+            if messages:
+                delivered = deliver(messages)
+                stats = {key: (stats or {}).get(key, 0) + count for key, count in delivered.items()}
+    return stats
+
+
+def run_worker(batch_size=None, idle_seconds=1.0, stop=lambda: False):
+    """Deliver batches until `stop()`; sleeps `idle_seconds` when nothing is due."""
+    worker_id = uuid.uuid4().hex
+    while not stop():
+        close_old_connections()
+        stats = run_batch(batch_size, worker_id)
+        if stats is None:
+            time.sleep(idle_seconds)
+        elif stats["retried"] or stats["failed"]:
+            logger.warning("Outbox batch: %s", stats)
+
+
+# ------------------
+# Metrics
+# ------------------
+def metrics(window_minutes=60):
+    """Queue depth and delivery lag; lag is created-to-sent time of recent messages."""
+    current = now()
+    counts = {"pending": 0, "retrying": 0, "failed": 0}
+    oldest = None
+    lags = []
+    for alias in campus.databases():
+        messages = OutboxMessage.objects.using(alias)
+        pending = messages.filter(status=OutboxMessage.PENDING)
+        counts["pending"] += pending.count()
+        counts["retrying"] += pending.filter(attempts__gt=0).count()
+        counts["failed"] += messages.filter(status=OutboxMessage.FAILED).count()
+        created = pending.aggregate(oldest=Min("created_at"))["oldest"]
+        if created is not None and (oldest is None or created < oldest):
+            oldest = created
+        recent = (
+            messages.filter(status=OutboxMessage.SENT, sent_at__gte=current - timedelta(minutes=window_minutes))
+            .order_by("-sent_at")
+            .values_list("created_at", "sent_at")[:5000]
+        )
+        lags.extend((sent_at - created_at).total_seconds() for created_at, sent_at in recent)
+    lags.sort()
+
+    def percentile(p):
+        return round(lags[min(int(len(lags) * p), len(lags) - 1)], 3) if lags else None
+
+    return {
+        **counts,
+        "oldest_pending_seconds": round((current - oldest).total_seconds(), 3) if oldest else 0,
+        "sent_last_window": len(lags),
+        "lag_p50_seconds": percentile(0.5),
+        "lag_p95_seconds": percentile(0.95),
+        "lag_max_seconds": lags[-1] if lags else None,
+        "channels": [channel.name for channel in channels()],
+    }
+
+
+@campus.each_database
+def purge_sent():
+    """Delete delivered messages past OUTBOX_RETENTION_DAYS."""
+    cutoff = now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    deleted, _ = OutboxMessage.objects.filter(status=OutboxMessage.SENT, sent_at__lt=cutoff).delete()
+    return {"deleted": deleted}
@@ -0,0 +1,168 @@
+from difflib import SequenceMatcher
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import post_save
+
+FTS_CANDIDATES = 30
+PREFIX_CANDIDATES = 200
+MIN_SIMILARITY = 0.5
+# Keys up to this long also search the trigrams of their transpositions
+TRANSPOSED_MAX_LENGTH = 6
+# Trigrams are counted rarest first until their places add up to this;
+# common ones ("ate", "ost") say little and would dominate the cost
+TRIGRAM_POSTINGS = 5000
+
+
+def normalize_place(name):
+    """Lower-cased, whitespace-collapsed form used to match place names."""
+    return " ".join(name.lower().split())
+
+
+def remember(name):
+    """Record a use of a place name so it shows up in autocomplete."""
+    from .models import Place
+
+    key = normalize_place(name)
+    if not key:
+        return
+    if Place.objects.filter(key=key).update(usage_count=F("usage_count") + 1):
+        return
+    try:
+        with transaction.atomic():
+            Place.objects.create(key=key, name=name.strip(), usage_count=1)
+    except IntegrityError:
+        # Created concurrently by another request
+        Place.objects.filter(key=key).update(usage_count=F("usage_count") + 1)
+
+
+def _on_ride_saved(sender, instance, created, **kwargs):
+    if created:
+        remember(instance.source)
+        remember(instance.destination)
+
+
+def _on_place_saved(sender, instance, created, **kwargs):
+    if created:
+        remember(instance.pickup_point)
+
+
+def connect():
+    from .models import AvailabilityRule, Ride, VehicleAvailability
+
+    post_save.connect(_on_ride_saved, sender=Ride, dispatch_uid="places_ride")
+    post_save.connect(_on_place_saved, sender=VehicleAvailability, dispatch_uid="places_availability")
+    post_save.connect(_on_place_saved, sender=AvailabilityRule, dispatch_uid="places_rule")
+
+
+def _prefix_matches(key, limit):
+    from .models import Place
+
+    # A range on the unique key index instead of LIKE, which SQLite can't
+    # serve from an index when it is case-insensitive. Only the first
+    # PREFIX_CANDIDATES keys are ranked by popularity, so a one-letter
+    # prefix doesn't sort half the table.
+    candidates = list(
+        Place.objects.filter(key__gte=key, key__lt=key + "\uffff")
+        .order_by("key")
+        .values_list("id", "key", "name", "usage_count")[:PREFIX_CANDIDATES]
+    )
+    candidates.sort(key=lambda place: -place[3])
+    return [place[:3] for place in candidates[:limit]]
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _trigrams(key):
+    """
+    Trigrams of `key`. Short keys add those of each adjacent transposition
+    ("mian" -> "main"): a swap in four letters leaves no trigram intact.
+    """
+    variants = {key}
+    if len(key) <= TRANSPOSED_MAX_LENGTH:
+        variants |= {key[:i] + key[i + 1] + key[i] + key[i + 2:] for i in range(len(key) - 1)}
+    return sorted({variant[i:i + 3] for variant in variants for i in range(len(variant) - 2)})
+
+
+def _trigram_candidates(key):
+    """
+    Places sharing the most trigrams with `key`. Ranking by how many of
+    them hit, rather than requiring particular ones, keeps places with a
+    typo or transposition anywhere in the query.
+    """
+    from .models import Place
+
+    trigrams = _trigrams(key)
+    if connection.vendor != "sqlite":
+        hits = sum((Case(When(key__contains=trigram, then=1), default=0) for trigram in trigrams), Value(0))
+        return list(
+            Place.objects.annotate(hits=hits).filter(hits__gt=0).order_by("-hits")
+            .values_list("id", "key", "name")[:FTS_CANDIDATES]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT term, doc FROM core_place_fts_vocab WHERE term IN ({', '.join(['%s'] * len(trigrams))}) ORDER BY doc",
+            trigrams,
+        )
+        trigrams, postings = [], 0
+        for trigram, places in cursor.fetchall():
+            if trigrams and postings + places > TRIGRAM_POSTINGS:
+                break
+            trigrams.append(trigram)
+            postings += places
+        if not trigrams:
+            return []
+
+        # Each trigram is a separate MATCH, so a place is counted once per hit.
+        # No bm25: re-ranking the candidates by similarity afterwards is cheaper.
+        matches = " UNION ALL ".join(["SELECT rowid FROM core_place_fts WHERE core_place_fts MATCH %s"] * len(trigrams))
+        cursor.execute(
+            "SELECT p.id, p.key, p.name FROM ("
+            f"SELECT rowid, COUNT(*) AS hits FROM ({matches}) GROUP BY rowid ORDER BY hits DESC LIMIT %s"
+            ") h JOIN core_place p ON p.id = h.rowid",
+            [*(_quote(trigram) for trigram in trigrams), FTS_CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _similarity(matcher, text):
+    matcher.set_seq1(text)
+    # quick_ratio() is an upper bound of ratio() and much cheaper
+    if matcher.quick_ratio() < MIN_SIMILARITY:
+        return 0.0
+    return matcher.ratio()
+
+
+def search_places(query, limit=10):
+    """
+    Places matching `query`, best first, as (key, name, score) tuples.
+
+    Prefix matches come first (score 1.0). If they don't fill `limit`,
+    the query is also treated as misspelt: places sharing trigrams with it
+    are ranked by similarity.
+    """
+    key = normalize_place(query)
+    if not key:
+        return []
+
+    results = [(place_key, name, 1.0) for _, place_key, name in _prefix_matches(key, limit)]
+    if len(results) >= limit or len(key) < 3:
+        return results
+
+    seen = {place_key for place_key, _, _ in results}
+    # The query is the cached side, compared against every candidate
+    matcher = SequenceMatcher(None, "", key)
+    fuzzy = []
+    for _, place_key, name in _trigram_candidates(key):
+        if place_key in seen:
+            continue
+        # Compare against the start of the place too, so "libary" still
+        # ranks "library block b" highly
+        score = max(_similarity(matcher, place_key), _similarity(matcher, place_key[: len(key)]))
+        if score >= MIN_SIMILARITY:
+            fuzzy.append((place_key, name, round(score, 3)))
+    fuzzy.sort(key=lambda match: -match[2])
+    return results + fuzzy[: limit - len(results)]
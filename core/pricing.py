@@ -0,0 +1,263 @@
+"""
+Fare suggestions from booking history.
+
+Each market (ride routes, rental pickup points) is held in memory as
+(keys, 168) arrays of offered/booked counts and price totals per hour of
+the week. Suggestions are precomputed for every cell, so a quote is a dict
+lookup plus an array read. Sparse cells borrow from neighbouring hours and
+are shrunk towards the key's and then the market's average; the result is
+nudged up or down by how much of the supply gets booked.
+
+Indexes load lazily on first use and take this process's new offers and
+bookings incrementally via observe(); every PRICING_REFRESH_SECONDS a
+background thread rebuilds them to pick up other workers' writes. numpy
+is only imported once pricing is used, keeping it out of cold starts.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.timezone import now
+
+from . import campus
+from .analytics import hour_of_week
+from .models import RouteDemand, VehicleAvailability
+from .places import normalize_place
+
+HOURS = 168
+# Observations a cell needs before its own history outweighs the fallback
+PRIOR = 3.0
+# Share of offered seats/slots that should get booked at the suggested price
+TARGET_DEMAND = 0.7
+ELASTICITY = 0.5
+MULTIPLIER_RANGE = (0.8, 1.25)
+# Suggestions are rounded to this step
+PRICE_STEP = 0.5
+
+RIDES = "rides"
+RENTALS = "rentals"
+
+
+class PriceIndex:
+    """
+    Raw totals plus derived suggestions per (key, hour of week). The last
+    row of every derived array is the market-wide fallback for unknown keys.
+    """
+
+    def __init__(self, keys, offered, demand, price):
+        self.keys = keys
+        self.offered = offered
+        self.demand = demand
+        self.price = price
+        self.built_at = time.monotonic()
+        self._derive()
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Build from (key, hour, offered, demand, price) tuples; keys may repeat."""
+        import numpy as np
+
+        keys = {}
+        rows, hours, offered, demand, price = [], [], [], [], []
+        for key, hour, cell_offered, cell_demand, cell_price in cells:
+            rows.append(keys.setdefault(key, len(keys)))
+            hours.append(hour)
+            offered.append(cell_offered)
+            demand.append(cell_demand)
+            price.append(cell_price)
+
+        arrays = [np.zeros((len(keys), HOURS)) for _ in range(3)]
+        index = (np.array(rows, dtype=np.intp), np.array(hours, dtype=np.intp))
+        for array, values in zip(arrays, (offered, demand, price)):
+            np.add.at(array, index, np.array(values, dtype=float))
+        return cls(keys, *arrays)
+
+    def _derive(self):
+        import numpy as np
+
+        self.totals = [self.offered.sum(), self.demand.sum(), self.price.sum()]
+        market_price, market_demand = self._market()
+
+        offered, demand, price = _smooth(self.offered), _smooth(self.demand), _smooth(self.price)
+        hourly_price = (price.sum(0) + PRIOR * market_price) / (offered.sum(0) + PRIOR)
+        hourly_demand = (demand.sum(0) + PRIOR * market_demand) / (offered.sum(0) + PRIOR)
+        key_price = (self.price.sum(1) + PRIOR * market_price) / (self.offered.sum(1) + PRIOR)
+        key_demand = (self.demand.sum(1) + PRIOR * market_demand) / (self.offered.sum(1) + PRIOR)
+
+        self.samples = np.vstack([offered, offered.sum(0)])
+        self.typical = np.vstack([(price + PRIOR * key_price[:, None]) / (offered + PRIOR), hourly_price])
+        self.demand_ratio = np.vstack([(demand + PRIOR * key_demand[:, None]) / (offered + PRIOR), hourly_demand])
+        self.suggested = np.empty_like(self.typical)
+        self._suggest(slice(None))
+
+    def _market(self):
+        import numpy as np
+
+        total_offered, total_demand, total_price = self.totals
+        if not total_offered:
+            return np.nan, TARGET_DEMAND
+        return total_price / total_offered, total_demand / total_offered
+
+    def _derive_row(self, row):
+        # Like _derive() for one key; other keys and the market row wait for the next rebuild
+        market_price, market_demand = self._market()
+        offered, demand, price = _smooth(self.offered[row]), _smooth(self.demand[row]), _smooth(self.price[row])
+        key_offered = self.offered[row].sum()
+        key_price = (self.price[row].sum() + PRIOR * market_price) / (key_offered + PRIOR)
+        key_demand = (self.demand[row].sum() + PRIOR * market_demand) / (key_offered + PRIOR)
+
+        self.samples[row] = offered
+        self.typical[row] = (price + PRIOR * key_price) / (offered + PRIOR)
+        self.demand_ratio[row] = (demand + PRIOR * key_demand) / (offered + PRIOR)
+        self._suggest(row)
+
+    def _suggest(self, rows):
+        import numpy as np
+
+        multiplier = np.clip(1 + ELASTICITY * (self.demand_ratio[rows] - TARGET_DEMAND), *MULTIPLIER_RANGE)
+        self.suggested[rows] = np.round(self.typical[rows] * multiplier / PRICE_STEP) * PRICE_STEP
+
+    def row(self, key):
+        """Row number for quote_many(); unknown keys map to the market row."""
+        return self.keys.get(key, len(self.keys))
+
+    def quote(self, key, hour):
+        """Suggestion for one key and hour of week, or None without any history."""
+        row = self.keys.get(key)
+        known = row is not None
+        if not known:
+            row = len(self.keys)
+        suggested = float(self.suggested[row, hour])
+        if suggested != suggested:  # NaN: nothing recorded in this market yet
+            return None
+        return {
+            "suggested": suggested,
+            "typical": round(float(self.typical[row, hour]), 2),
+            "demand_ratio": round(float(self.demand_ratio[row, hour]), 3),
+            "samples": round(float(self.samples[row, hour]), 1),
+            "basis": "history" if known else "market",
+        }
+
+    def quote_many(self, rows, hours):
+        """Vectorized suggestions for arrays of row numbers and hours of week."""
+        return self.suggested[rows, hours]
+
+    def observe(self, key, hour, offered=0, demand=0, price=0):
+        import numpy as np
+
+        row = self.keys.get(key)
+        if row is None:
+            # New key: grow the arrays and recompute everything (rare)
+            row = len(self.keys)
+            self.offered, self.demand, self.price = (
+                np.vstack([array, np.zeros((1, HOURS))]) for array in (self.offered, self.demand, self.price)
+            )
+        self.offered[row, hour] += offered
+        self.demand[row, hour] += demand
+        self.price[row, hour] += price
+        for i, delta in enumerate((offered, demand, price)):
+            self.totals[i] += delta
+        if row == len(self.keys):
+            self.keys[key] = row
+            self._derive()
+        else:
+            self._derive_row(row)
+
+
+def _smooth(array):
+    import numpy as np
+
+    # Half weight to the neighbouring hours, wrapping around the week
+    return 0.5 * np.roll(array, 1, axis=-1) + array + 0.5 * np.roll(array, -1, axis=-1)
+
+
+def _ride_cells():
+    rows = RouteDemand.objects.values_list(
+        "source_key", "destination_key", "hour_of_week", "rides_offered", "rides_booked", "waitlisted", "fare_total"
+    )
+    for source_key, destination_key, hour, offered, booked, waitlisted, fare_total in rows.iterator(chunk_size=2000):
+        # Waitlisted riders are demand the supply didn't meet
+        yield (source_key, destination_key), hour, offered, booked + waitlisted, float(fare_total)
+
+
+def _rental_cells():
+    since = now() - timedelta(days=settings.PRICING_HISTORY_DAYS)
+    for alias in campus.databases():
+        rows = VehicleAvailability.objects.using(alias).filter(available_from__gte=since).values_list(
+            "pickup_key", "available_from", "price_per_hour", "is_booked"
+        )
+        for pickup_key, available_from, price_per_hour, is_booked in rows.iterator(chunk_size=2000):
+            yield pickup_key, hour_of_week(available_from), 1, int(is_booked), float(price_per_hour)
+
+
+LOADERS = {RIDES: _ride_cells, RENTALS: _rental_cells}
+
+_indexes = {}
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def build(market):
+    return PriceIndex.from_cells(LOADERS[market]())
+
+
+def _refresh(market):
+    try:
+        index = build(market)
+        with _lock:
+            _indexes[market] = index
+    finally:
+        _refreshing.discard(market)
+        close_old_connections()
+
+
+def get_index(market):
+    """The market's index; built on first use, refreshed in the background once stale."""
+    index = _indexes.get(market)
+    if index is None:
+        with _lock:
+            index = _indexes.get(market)
+            if index is None:
+                index = _indexes[market] = build(market)
+    elif time.monotonic() - index.built_at > settings.PRICING_REFRESH_SECONDS and market not in _refreshing:
+        # Keep answering from the old index while the new one is built
+        _refreshing.add(market)
+        threading.Thread(target=_refresh, args=(market,), name=f"pricing-{market}", daemon=True).start()
+    return index
+
+
+def observe(market, key, hour, **deltas):
+    """Apply a new offer or booking to the loaded index, if any."""
+    index = _indexes.get(market)
+    if index is not None:
+        with _lock:
+            index.observe(key, hour, **deltas)
+
+
+def observe_on_commit(market, key, hour, **deltas):
+    transaction.on_commit(lambda: observe(market, key, hour, **deltas), using=campus.database())
+
+
+def slot_offered(availability, sign=1):
+    observe_on_commit(
+        RENTALS,
+        availability.pickup_key,
+        hour_of_week(availability.available_from),
+        offered=sign,
+        price=sign * float(availability.price_per_hour),
+    )
+
+
+def slot_booked(availability, sign=1):
+    observe_on_commit(RENTALS, availability.pickup_key, hour_of_week(availability.available_from), demand=sign)
+
+
+def suggest_fare(source, destination, departure_time):
+    return get_index(RIDES).quote((normalize_place(source), normalize_place(destination)), hour_of_week(departure_time))
+
+
+def suggest_price_per_hour(pickup_point, available_from):
+    return get_index(RENTALS).quote(normalize_place(pickup_point), hour_of_week(available_from))
@@ -0,0 +1,233 @@
+"""
+Opt-in request profiling.
+
+Staff send `X-Profile: sampling` (or `cprofile`) to profile one request;
+PROFILING_SAMPLE_RATE profiles a random share of all requests. Results
+are stored as RequestProfile rows and shown in the admin with a flame
+graph. With PROFILING_ENABLED off the middleware removes itself.
+"""
+
+import io
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from html import escape
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+MAX_SQL = 500
+MAX_SQL_LENGTH = 500
+
+
+class StackSampler(threading.Thread):
+    """Record the target thread's stack every `interval` seconds as folded stacks."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                stack = ";".join(reversed(names))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class SqlTimeline:
+    """execute_wrapper recording when each query ran and how long it took."""
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+        self.count = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total += duration
+            if len(self.queries) < MAX_SQL:
+                self.queries.append({
+                    "start_ms": round((start - self.started) * 1000, 3),
+                    "duration_ms": round(duration, 3),
+                    "database": context["connection"].alias,
+                    "sql": sql[:MAX_SQL_LENGTH],
+                })
+
+
+def _staff_user(request):
+    # The API authenticates per route, after middleware runs, so check
+    # the bearer token here; only done when the header is present
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken
+
+    if getattr(request, "user", None) is not None and request.user.is_authenticated:
+        return request.user if request.user.is_staff else None
+    try:
+        validated = JWTAuthentication().authenticate(request)
+    except InvalidToken:
+        return None
+    if validated is None or not validated[0].is_staff:
+        return None
+    return validated[0]
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode, user = None, None
+        requested = request.headers.get(HEADER)
+        if requested:
+            user = _staff_user(request)
+            if user is not None:
+                mode = RequestProfile.CPROFILE if requested == RequestProfile.CPROFILE else RequestProfile.SAMPLING
+        elif settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            mode = RequestProfile.SAMPLING
+        if mode is None:
+            return self.get_response(request)
+        return self._profile(request, mode, user)
+
+    def _profile(self, request, mode, user):
+        import cProfile
+        import pstats
+
+        tracing = settings.PROFILING_TRACE_MEMORY and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0] if tracing else None
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+        profiler = cProfile.Profile() if mode == RequestProfile.CPROFILE else None
+        started = time.perf_counter()
+        timeline = SqlTimeline(started)
+        sampler.start()
+        if profiler:
+            profiler.enable()
+        try:
+            # Every alias, since campus reads and writes go to campus databases
+            with ExitStack() as wrappers:
+                for alias_connection in connections.all():
+                    wrappers.enter_context(alias_connection.execute_wrapper(timeline))
+                response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            sampler.stop()
+            duration = (time.perf_counter() - started) * 1000
+            memory = tracemalloc.get_traced_memory() if tracing else None
+            if tracing:
+                tracemalloc.stop()
+
+        stats = ""
+        if profiler:
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(60)
+            stats = output.getvalue()
+        try:
+            profile = RequestProfile.objects.create(
+                user=user,
+                method=request.method,
+                path=request.get_full_path()[:500],
+                status_code=response.status_code,
+                profiler=mode,
+                duration_ms=round(duration, 3),
+                sql_count=timeline.count,
+                sql_ms=round(timeline.total, 3),
+                memory_delta_kb=round((memory[0] - memory_before) / 1024, 1) if memory else None,
+                memory_peak_kb=round(memory[1] / 1024, 1) if memory else None,
+                stats=stats,
+                stacks=sampler.stacks,
+                sql_timeline=timeline.queries,
+            )
+        except Exception:
+            logger.exception("Could not store the request profile")
+            return response
+        if user is not None:
+            response["X-Profile-Id"] = str(profile.id)
+        return response
+
+
+def _color(name):
+    # Stable warm colour per function, like the classic flame graph palette
+    value = sum(map(ord, name))
+    return f"rgb({205 + value % 50},{value % 230},{(value * 7) % 55})"
+
+
+def flame_graph(stacks, width=1200, row_height=16):
+    """Render folded stacks as an SVG flame graph (root at the bottom)."""
+    total = sum(stacks.values())
+    if not total:
+        return ""
+
+    tree = {}
+    for stack, count in stacks.items():
+        node = tree
+        for name in stack.split(";"):
+            entry = node.setdefault(name, [0, {}])
+            entry[0] += count
+            node = entry[1]
+
+    rects = []
+    depth_max = 0
+
+    def walk(node, x, depth):
+        nonlocal depth_max
+        depth_max = max(depth_max, depth)
+        for name, (count, children) in sorted(node.items()):
+            w = count / total * width
+            if w >= 0.5:
+                rects.append((x, depth, w, name, count))
+                walk(children, x, depth + 1)
+            x += w
+
+    walk(tree, 0.0, 0)
+    height = (depth_max + 1) * row_height
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">']
+    for x, depth, w, name, count in rects:
+        y = height - (depth + 1) * row_height
+        label = escape(name)
+        parts.append(
+            f'<g><title>{label} ({count} samples, {count / total:.1%})</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" fill="{_color(name)}"/>'
+        )
+        if w > 40:
+            chars = int(w / 7)
+            text = escape(name if len(name) <= chars else name[: chars - 2] + "..")
+            parts.append(f'<text x="{x + 3:.1f}" y="{y + row_height - 4}">{text}</text>')
+        parts.append("</g>")
+    parts.append("</svg>")
+    return "".join(parts)
@@ -0,0 +1,155 @@
+import math
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+
+# Buckets are dropped once this many keys are tracked; an idle bucket is
+# full again anyway, so forgetting it changes nothing.
+MAX_KEYS = 100_000
+
+
+class RateLimited(Exception):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class LocalBuckets:
+    """
+    Token buckets kept in this process, stored as one float per key.
+
+    Uses GCRA: instead of a token count each key remembers the time at
+    which its bucket will be full again, so a check is one dict read and
+    one dict write and needs no lock. Concurrent threads can at worst let
+    a request or two over the limit.
+    """
+
+    def __init__(self):
+        self._full_at = {}
+
+    def take(self, key, rate, burst):
+        current = time.monotonic()
+        interval = 1.0 / rate
+        full_at = max(self._full_at.get(key, current), current) + interval
+        wait = full_at - current - burst * interval
+        if wait > 0:
+            return wait
+        if len(self._full_at) >= MAX_KEYS:
+            self._prune(current)
+        self._full_at[key] = full_at
+        return 0.0
+
+    def _prune(self, current):
+        self._full_at = {key: full_at for key, full_at in self._full_at.items() if full_at > current}
+
+    def reset(self):
+        self._full_at.clear()
+
+
+class CacheBuckets:
+    """
+    Limits shared by every worker through Django's cache.
+
+    The cache API has no compare-and-set, so this counts requests in fixed
+    windows of burst / rate seconds with the atomic add() and incr().
+    """
+
+    def take(self, key, rate, burst):
+        window = burst / rate
+        current = time.time()
+        slot = int(current // window)
+        cache_key = "ratelimit:{}:{}:{}".format(*key, slot)
+        if cache.add(cache_key, 1, timeout=math.ceil(window) + 1):
+            return 0.0
+        try:
+            count = cache.incr(cache_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.add(cache_key, 1, timeout=math.ceil(window) + 1)
+            return 0.0
+        if count > burst:
+            return (slot + 1) * window - current
+        return 0.0
+
+    def reset(self):
+        pass
+
+
+_local = LocalBuckets()
+_shared = CacheBuckets()
+_allowed = defaultdict(int)
+_rejected = defaultdict(int)
+
+
+# (buckets, limits) resolved from settings on first use; reading settings
+# costs more than the check itself
+_config = None
+
+
+def _load_config():
+    global _config
+    buckets = _shared if settings.RATE_LIMIT_BACKEND == "cache" else _local
+    _config = (buckets, dict(settings.RATE_LIMITS))
+    return _config
+
+
+def _on_setting_changed(setting, **kwargs):
+    global _config
+    if setting in ("RATE_LIMITS", "RATE_LIMIT_BACKEND"):
+        _config = None
+
+
+setting_changed.connect(_on_setting_changed)
+
+
+def check(scope, identity):
+    """Take a token from `scope`'s bucket for `identity` or raise RateLimited."""
+    buckets, limits = _config or _load_config()
+    rate, burst = limits[scope]
+    wait = buckets.take((scope, identity), rate, burst)
+    if wait > 0:
+        _rejected[scope] += 1
+        raise RateLimited(scope, wait)
+    _allowed[scope] += 1
+
+
+def _identity(per, request, kwargs):
+    if per == "user":
+        return request.user.id
+    if per == "vehicle":
+        # Keyed on the caller too, so other users can't drain a driver's bucket
+        return f"{request.user.id}:{kwargs['vehicle_id']}"
+    return "*"
+
+
+def rate_limit(scope, per="user"):
+    """
+    Limit a view with the bucket settings.RATE_LIMITS[scope], keyed per
+    "user", per "vehicle" (the caller and the view's vehicle_id) or per
+    "route" (one bucket shared by all callers).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            check(scope, _identity(per, request, kwargs))
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot():
+    return {scope: {"allowed": _allowed[scope], "rejected": _rejected[scope]} for scope in {*_allowed, *_rejected}}
+
+
+def reset():
+    _local.reset()
+    _allowed.clear()
+    _rejected.clear()
@@ -0,0 +1,71 @@
+"""
+Ratings between the two parties of a finished booking.
+
+The rated user's rating_count, rating_sum and Bayesian rating_score are
+updated in the same transaction as the new rating with one UPDATE of F()
+expressions, so concurrent ratings never lose an increment and listings
+sort and filter on the indexed rating_score without aggregating.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast
+
+from . import campus
+from .models import Rating, User
+
+
+class RatingError(ValueError):
+    pass
+
+
+def bayesian_score(count, total):
+    return (total + User.RATING_PRIOR_WEIGHT * User.RATING_PRIOR_MEAN) / (count + User.RATING_PRIOR_WEIGHT)
+
+
+def _apply(user_id, score):
+    updates = {
+        "rating_count": F("rating_count") + 1,
+        "rating_sum": F("rating_sum") + score,
+        # Right-hand F()s read the values from before this update
+        "rating_score": Cast(
+            F("rating_sum") + score + User.RATING_PRIOR_WEIGHT * User.RATING_PRIOR_MEAN, FloatField()
+        ) / (F("rating_count") + 1 + User.RATING_PRIOR_WEIGHT),
+    }
+    # The campus database's copy of the user is what its listings join
+    for alias in {DEFAULT_DB_ALIAS, campus.database()}:
+        User.objects.using(alias).filter(id=user_id).update(**updates)
+
+
+def rate(rater, rated, score, comment="", **booking):
+    """Record `rater`'s rating of `rated` for one ride_booking= or vehicle_booking=."""
+    if not 1 <= score <= 5:
+        raise RatingError("score must be between 1 and 5")
+    try:
+        with campus.atomic(), transaction.atomic():
+            rating = Rating.objects.create(rater=rater, rated=rated, score=score, comment=comment, **booking)
+            _apply(rated.id, score)
+    except IntegrityError:
+        raise RatingError("You already rated this booking")
+    return rating
+
+
+def rebuild():
+    """Recompute every user's aggregates from the stored ratings, e.g. if they drifted."""
+    totals = {}
+    for alias in campus.databases():
+        rows = Rating.objects.using(alias).values("rated").annotate(count=Count("id"), total=Sum("score")).order_by()
+        for row in rows:
+            count, total = totals.get(row["rated"], (0, 0))
+            totals[row["rated"]] = (count + row["count"], total + row["total"])
+
+    users = []
+    for user in User.objects.only("id", "rating_count", "rating_sum", "rating_score").iterator(chunk_size=2000):
+        count, total = totals.get(user.id, (0, 0))
+        score = bayesian_score(count, total)
+        if (user.rating_count, user.rating_sum) != (count, total) or abs(user.rating_score - score) > 1e-9:
+            user.rating_count, user.rating_sum, user.rating_score = count, total, score
+            users.append(user)
+    for alias in campus.databases():
+        User.objects.using(alias).bulk_update(users, ["rating_count", "rating_sum", "rating_score"], batch_size=1000)
+    return {"users": len(users)}
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.timezone import localdate, make_aware
+
+from . import campus
+from .availability import AvailabilityCalendar, AvailabilityError, lock_vehicle, validate_window
+from .models import AvailabilityRule, VehicleAvailability
+from .places import normalize_place
+from .sync import record_changes
+
+
+def horizon_end():
+    return localdate() + timedelta(days=settings.AVAILABILITY_HORIZON_DAYS)
+
+
+def occurrences(rule, first_day, last_day):
+    weekdays = rule.weekday_set
+    overnight = rule.end_time <= rule.start_time
+    day = first_day
+    while day <= last_day:
+        if day.weekday() in weekdays:
+            start = make_aware(datetime.combine(day, rule.start_time))
+            end_day = day + timedelta(days=1) if overnight else day
+            yield start, make_aware(datetime.combine(end_day, rule.end_time))
+        day += timedelta(days=1)
+
+
+def expand_rule(rule, until=None, strict=False):
+    """
+    Materialize the slots of `rule` between its last expansion and `until`
+    (the rolling horizon by default).
+
+    Existing slots in the range are loaded with one query and every new
+    window is checked against them in memory. With `strict`, the first
+    conflict raises AvailabilityError and nothing is written; otherwise
+    conflicting windows are skipped.
+    """
+    until = min(until or horizon_end(), rule.ends_on)
+    first_day = max(rule.starts_on, localdate())
+    if rule.materialized_until is not None:
+        first_day = max(first_day, rule.materialized_until + timedelta(days=1))
+    if first_day > until:
+        return []
+
+    windows = list(occurrences(rule, first_day, until))
+    slots = []
+    with campus.atomic():
+        if windows:
+            vehicle = rule.vehicle
+            lock_vehicle(vehicle)
+            calendar = AvailabilityCalendar.for_vehicle(vehicle, windows[0][0], windows[-1][1])
+            pickup_key = normalize_place(rule.pickup_point)
+            owner_campus = vehicle.driver.campus
+            for start, end in windows:
+                try:
+                    validate_window(vehicle, start, end)
+                    calendar.add(start, end)
+                except AvailabilityError:
+                    if strict:
+                        raise
+                    continue
+                slots.append(
+                    VehicleAvailability(
+                        vehicle=vehicle,
+                        rule=rule,
+                        pickup_point=rule.pickup_point,
+                        pickup_key=pickup_key,
+                        campus=owner_campus,
+                        price_per_hour=rule.price_per_hour,
+                        available_from=start,
+                        available_to=end,
+                    )
+                )
+
+        VehicleAvailability.objects.bulk_create(slots)
+        record_changes(VehicleAvailability, slots)
+        rule.materialized_until = until
+        rule.save(update_fields=["materialized_until"])
+    return slots
+
+
+@campus.each_database
+def extend_horizons():
+    """Roll every active rule forward to the current horizon."""
+    until = horizon_end()
+    rules = (
+        AvailabilityRule.objects.filter(is_active=True, ends_on__gte=localdate())
+        .filter(Q(materialized_until__isnull=True) | (Q(materialized_until__lt=until) & Q(materialized_until__lt=F("ends_on"))))
+        .select_related("vehicle__driver")
+    )
+    stats = {"rules": 0, "slots": 0}
+    for rule in rules.iterator():
+        stats["rules"] += 1
+        stats["slots"] += len(expand_rule(rule, until))
+    return stats
@@ -1,19 +1,34 @@
 from ninja import Router
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
 from ninja.errors import HttpError
 from ninja.security import HttpBearer
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
 from .schemas import SignUpSchema, LoginSchema, RideOut, RideIn
-from .models import OBDRecord, Ride, Vehicle, VehicleAvailability, VehicleBooking
+from .models import AvailabilityRule, ChangeLog, Rating, RouteDemand, Invoice, JobRun, Notification, OBDRecord, Ride, Trip, Vehicle, VehicleAvailability, VehicleBooking, WaitlistEntry
 from .models import Ride, RideBooking
-from .schemas import RideOut, RideIn,OBDIn,OBDOut,VehicleIn,VehicleOut,VehicleAvailabilityIn,VehicleAvailabilityOut,VehicleBookingIn,VehicleBookingOut
-from datetime import timedelta
+from .schemas import RideOut, RideIn,OBDIn,OBDOut,VehicleIn,VehicleOut,VehicleAvailabilityIn,VehicleAvailabilityOut,VehicleBookingIn,VehicleBookingOut,TripOut,InvoiceOut,AvailabilityRuleIn,AvailabilityRuleOut,WaitlistOut,NotificationOut,PlaceOut,RouteDemandOut,PriceSuggestionOut,RatingIn,RatingOut,UserRatingOut
+from .availability import AvailabilityError, create_slot, split_slot
+from .fieldsets import FieldSet, FieldSetError
+from . import analytics, export, obdlog, outbox, pricing, ratings
+from . import campus as campuses
+from .idempotency import idempotent
+from .ratelimit import rate_limit, snapshot as rate_limit_snapshot
+from .places import normalize_place, search_places
+from .ratings import RatingError
+from .recurrence import expand_rule
+from .sync import pruned_before, settled_before
+from .waitlist import active_hold, mark_accepted, offer_next, release
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, NullIf
 from django.utils.timezone import now
+import hashlib
+import json
 import random
-import requests # type: ignore
 
 # ------------------
 # Auth Middleware
@@ -21,6 +36,9 @@ import requests # type: ignore
 class AuthBearer(HttpBearer):
     def authenticate(self, request, token):
         from django.contrib.auth.models import AnonymousUser
+        # Imported here: simplejwt pulls in DRF, which cold starts don't need until a request arrives
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from rest_framework_simplejwt.exceptions import InvalidToken
         
         # Set the Authorization header for JWT authentication
         request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
@@ -32,6 +50,8 @@ class AuthBearer(HttpBearer):
                 raise HttpError(401, "Invalid JWT")
             user, jwt_token = validated
             request.user = user
+            # Routes partitioned tables to the user's campus database
+            campuses.activate(user.campus)
             return user
         except InvalidToken:
             raise HttpError(401, "Invalid Token")
@@ -59,6 +79,8 @@ def signup(request, data: SignUpSchema):
         university_id=data.university_id, # type: ignore
         phone_number=data.phone_number, # type: ignore
     )
+    from rest_framework_simplejwt.tokens import RefreshToken
+
     refresh = RefreshToken.for_user(user)
     return {
         "access": str(refresh.access_token),
@@ -75,7 +97,9 @@ def login(request, data: LoginSchema):
     if user is None:
         raise HttpError(400, "Invalid credentials")
 
-    refresh = RefreshToken.for_user(user)  
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    refresh = RefreshToken.for_user(user)
     return {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
@@ -84,41 +108,106 @@ def login(request, data: LoginSchema):
         "phone_number": user.phone_number, # type: ignore
     }
 
+def _me_out(user):
+    return {"id": user.id, "username": user.username}
+
 @router.get("/me", auth=auth)
 def get_me(request):
-    return {"id": request.user.id, "username": request.user.username}
+    return _me_out(request.user)
 
 # ------------------
 # Ride Routes
 # ------------------
+def _rating(user):
+    # Unrated users have no rating to show, though they sort at the prior
+    return round(user.rating_score, 2) if user.rating_count else None
+
+# Output field -> (columns it reads, value); the keys are what fields= accepts
+RIDE_FIELDS = FieldSet(RideOut, {
+    "id": (("id",), lambda ride: ride.id),
+    "driver": (("driver__username",), lambda ride: ride.driver.username),
+    "source": (("source",), lambda ride: ride.source),
+    "destination": (("destination",), lambda ride: ride.destination),
+    "departure_time": (("departure_time",), lambda ride: ride.departure_time),
+    "available_seats": (("available_seats",), lambda ride: ride.available_seats),
+    "fare": (("fare",), lambda ride: float(ride.fare)),
+    "campus": (("campus",), lambda ride: ride.campus),
+    "driver_rating": (("driver__rating_score", "driver__rating_count"), lambda ride: _rating(ride.driver)),
+    "driver_rating_count": (("driver__rating_count",), lambda ride: ride.driver.rating_count),
+})
+
+def _ride_out(ride):
+    return RIDE_FIELDS.serialize(ride)
+
+def _projection(fieldset, fields):
+    try:
+        return fieldset.parse(fields)
+    except FieldSetError as e:
+        raise HttpError(400, str(e))
+
+def _listing(fieldset, rows, names):
+    if names is None:
+        return [fieldset.serialize(row) for row in rows]
+    # A projection doesn't match the response schema, so it is sent as is
+    return JsonResponse([fieldset.serialize(row, names) for row in rows], safe=False, encoder=DjangoJSONEncoder)
+
+def _listing_campus(request, campus):
+    # Listings show the caller's campus unless another campus, or "all", is asked for
+    return campus.lower() if campus else request.user.campus
+
+def _row_campus(request, campus):
+    """
+    Campus of the ride or slot a write addresses. Rows are identified by
+    (campus, id): ids repeat across campus databases, so a row from a
+    ?campus=all listing is only found again with its campus.
+    """
+    campus = campus.lower() if campus else request.user.campus
+    if campuses.database(campus) != campuses.database():
+        raise HttpError(400, f"Rides and vehicles of campus {campus} can't be booked from your campus")
+    return campus
+
+def _by_rating(queryset, owner, sort, min_rating):
+    """
+    Apply min_rating and sort=rating to a listing, both served by the
+    index on User.rating_score. Returns the queryset and whether it sorts
+    by rating.
+    """
+    if sort not in (None, "rating"):
+        raise HttpError(400, "sort must be 'rating' or omitted")
+    if min_rating is not None:
+        queryset = queryset.filter(**{f"{owner}__rating_score__gte": min_rating})
+    if sort == "rating":
+        queryset = queryset.order_by(f"-{owner}__rating_score", *queryset.query.order_by)
+    return queryset, sort == "rating"
+
 @router.get("/rides", response=list[RideOut], auth=auth)
-def list_rides(request):
-    rides = Ride.objects.all()
-    return [
-        {
-            "id": ride.id, # type: ignore
-            "driver": ride.driver.username,
-            "source": ride.source,
-            "destination": ride.destination,
-            "departure_time": ride.departure_time,
-            "available_seats": ride.available_seats,
-            "fare": float(ride.fare),
-        }
-        for ride in rides
-    ]
+def list_rides(
+    request,
+    campus: str | None = None,
+    sort: str | None = None,
+    min_rating: float | None = None,
+    fields: str | None = None,
+):
+    names = _projection(RIDE_FIELDS, fields)
+    rides, by_rating = _by_rating(
+        Ride.objects.filter(status=Ride.OPEN, departure_time__gt=now()).select_related("driver").order_by("departure_time"),
+        "driver",
+        sort,
+        min_rating,
+    )
+    rides = campuses.fetch(
+        RIDE_FIELDS.only(rides, names, also=["departure_time", *(["driver__rating_score"] if by_rating else [])]),
+        _listing_campus(request, campus),
+        key=lambda ride: (-ride.driver.rating_score if by_rating else 0, ride.departure_time),
+    )
+    return _listing(RIDE_FIELDS, rides, names)
 
 @router.post("/rides", response=RideOut, auth=auth)
 def create_ride(request, data: RideIn):
-    ride = Ride.objects.create(driver=request.user, **data.dict())
-    return {
-        "id": ride.id, # type: ignore
-        "driver": ride.driver.username,
-        "source": ride.source,
-        "destination": ride.destination,
-        "departure_time": ride.departure_time,
-        "available_seats": ride.available_seats,
-        "fare": float(ride.fare),
-    }
+    with campuses.atomic():
+        ride = Ride.objects.create(driver=request.user, **data.dict())
+        analytics.ride_offered(ride)
+    return _ride_out(ride)
 
 @router.delete("/rides/{ride_id}", auth=auth)
 def delete_ride(request, ride_id: int):
@@ -131,7 +220,9 @@ def delete_ride(request, ride_id: int):
     if RideBooking.objects.filter(ride=ride).exists():
         raise HttpError(400, "Cannot delete ride with existing bookings")
     
-    ride.delete()
+    with campuses.atomic():
+        ride.delete()
+        analytics.ride_offered(ride, sign=-1)
     return {"message": "Ride deleted successfully"}
 
 # =====================
@@ -140,37 +231,27 @@ def delete_ride(request, ride_id: int):
 
 # View rides created by the logged-in user
 @router.get("/my-rides", response=list[RideOut], auth=auth)
-def my_rides(request):
-    rides = Ride.objects.filter(driver=request.user)
-    return [
-        {
-            "id": ride.id, # type: ignore
-            "driver": ride.driver.username,
-            "source": ride.source,
-            "destination": ride.destination,
-            "departure_time": ride.departure_time,
-            "available_seats": ride.available_seats,
-            "fare": float(ride.fare),
-        }
-        for ride in rides
-    ]
+def my_rides(request, fields: str | None = None):
+    names = _projection(RIDE_FIELDS, fields)
+    rides = RIDE_FIELDS.only(Ride.objects.filter(driver=request.user).select_related("driver"), names)
+    return _listing(RIDE_FIELDS, rides, names)
 
 
+def _ride_booking_out(b):
+    return {
+        "booking_id": b.id, # type: ignore
+        "ride_id": b.ride.id, # type: ignore
+        "source": b.ride.source,
+        "destination": b.ride.destination,
+        "departure_time": b.ride.departure_time,
+        "driver": b.ride.driver.username,
+    }
+
 # View rides booked by the logged-in user
 @router.get("/my-bookings", auth=auth)
 def my_bookings(request):
-    bookings = RideBooking.objects.filter(passenger=request.user).select_related("ride")
-    return [
-        {
-            "booking_id": b.id, # type: ignore
-            "ride_id": b.ride.id, # type: ignore
-            "source": b.ride.source,
-            "destination": b.ride.destination,
-            "departure_time": b.ride.departure_time,
-            "driver": b.ride.driver.username,
-        }
-        for b in bookings
-    ]
+    bookings = RideBooking.objects.filter(passenger=request.user).select_related("ride__driver")
+    return [_ride_booking_out(b) for b in bookings]
 
 from datetime import timedelta
 from django.utils.timezone import now
@@ -182,7 +263,7 @@ from django.utils.timezone import now
 @router.delete("/bookings/{booking_id}/cancel", auth=auth)
 def cancel_booking(request, booking_id: int):
     try:
-        booking = RideBooking.objects.select_related("ride").get(
+        booking = RideBooking.objects.select_related("ride", "passenger").get(
             id=booking_id, passenger=request.user
         )
     except RideBooking.DoesNotExist:
@@ -195,7 +276,12 @@ def cancel_booking(request, booking_id: int):
     if time_left < timedelta(minutes=30):
         raise HttpError(400, "Cannot cancel within 30 minutes of departure")
 
-    booking.delete()
+    with campuses.atomic():
+        outbox.ride_booking_cancelled(booking)
+        booking.delete()
+        analytics.ride_booked(ride, sign=-1)
+        # Hand the seat to the first passenger on the waitlist
+        offer_next(ride=ride)
 
     return {
         "message": "Booking cancelled",
@@ -203,9 +289,10 @@ def cancel_booking(request, booking_id: int):
     }
 
 @router.post("/rides/{ride_id}/book", auth=auth)
-def book_ride(request, ride_id: int):
+@idempotent
+def book_ride(request, ride_id: int, campus: str | None = None):
     try:
-        ride = Ride.objects.get(id=ride_id)
+        ride = Ride.objects.get(id=ride_id, campus=_row_campus(request, campus))
     except Ride.DoesNotExist:
         raise HttpError(404, "Ride not found")
 
@@ -222,7 +309,16 @@ def book_ride(request, ride_id: int):
     if RideBooking.objects.filter(ride=ride).exists():
         raise HttpError(400, "This ride is already booked by another passenger")
 
-    booking = RideBooking.objects.create(ride=ride, passenger=request.user)
+    # A freed seat is reserved for the waitlisted passenger it was offered to
+    hold = active_hold(ride=ride)
+    if hold is not None and hold.user_id != request.user.id: # type: ignore
+        raise HttpError(400, "This ride is on hold for a waitlisted passenger")
+
+    with campuses.atomic():
+        booking = RideBooking.objects.create(ride=ride, passenger=request.user)
+        analytics.ride_booked(ride)
+        mark_accepted(request.user, ride=ride)
+        outbox.ride_booked(booking)
 
     return {
         "message": "Ride booked successfully",
@@ -233,24 +329,12 @@ def book_ride(request, ride_id: int):
 # ------------------
 # Vehicle Routes
 # ------------------
-@router.get("/vehicles", response=list[VehicleOut], auth=auth)
-def list_vehicles(request):
-    vehicles = Vehicle.objects.filter(driver=request.user)
-    return [
-        {
-            "id": vehicle.id, # type: ignore
-            "name": vehicle.name,
-            "registration_number": vehicle.registration_number,
-            "price_per_hour": float(vehicle.price_per_hour),
-            "available_from": vehicle.available_from,
-            "available_to": vehicle.available_to,
-        }
-        for vehicle in vehicles
-    ]
+def _health_score(vehicle):
+    # Scored by core.health; None until the vehicle has telemetry in the window
+    health = getattr(vehicle, "health", None)
+    return health.score if health is not None else None
 
-@router.post("/vehicles", response=VehicleOut, auth=auth)
-def create_vehicle(request, data: VehicleIn):
-    vehicle = Vehicle.objects.create(driver=request.user, **data.dict())
+def _vehicle_out(vehicle):
     return {
         "id": vehicle.id, # type: ignore
         "name": vehicle.name,
@@ -258,43 +342,108 @@ def create_vehicle(request, data: VehicleIn):
         "price_per_hour": float(vehicle.price_per_hour),
         "available_from": vehicle.available_from,
         "available_to": vehicle.available_to,
+        "health_score": _health_score(vehicle),
     }
 
+@router.get("/vehicles", response=list[VehicleOut], auth=auth)
+def list_vehicles(request):
+    vehicles = Vehicle.objects.filter(driver=request.user).select_related("health")
+    return [_vehicle_out(vehicle) for vehicle in vehicles]
+
+@router.post("/vehicles", response=VehicleOut, auth=auth)
+def create_vehicle(request, data: VehicleIn):
+    vehicle = Vehicle.objects.create(driver=request.user, **data.dict())
+    return _vehicle_out(vehicle)
+
 # ------------------
 # OBD Routes
 # ------------------
+OBD_FIELDS = FieldSet(OBDOut, {
+    "timestamp": (("timestamp",), lambda record: record.timestamp.isoformat()),
+    "speed": (("speed",), lambda record: record.speed),
+    "rpm": (("rpm",), lambda record: record.rpm),
+    "fuel_level": (("fuel_level",), lambda record: record.fuel_level),
+    "error_code": (("error_code",), lambda record: record.error_code),
+    "location_lat": (("location_lat",), lambda record: record.location_lat),
+    "location_lng": (("location_lng",), lambda record: record.location_lng),
+})
+
 @router.get("/vehicles/{vehicle_id}/obd", response=list[OBDOut], auth=auth)
-def get_obd_data(request, vehicle_id: int):
+def get_obd_data(request, vehicle_id: int, fields: str | None = None):
+    names = _projection(OBD_FIELDS, fields)
     try:
         vehicle = Vehicle.objects.get(id=vehicle_id, driver=request.user)
     except Vehicle.DoesNotExist:
         raise HttpError(404, "Vehicle not found or not owned by you")
 
-    records = OBDRecord.objects.filter(vehicle=vehicle).order_by("-timestamp")[:10]
-    return [
-        {
-            "timestamp": record.timestamp.isoformat(),
-            "speed": record.speed,
-            "rpm": record.rpm,
-            "fuel_level": record.fuel_level,
-            "error_code": record.error_code,
-            "location_lat": record.location_lat,
-            "location_lng": record.location_lng,
-        }
-        for record in records
-    ]
+    records = OBD_FIELDS.only(OBDRecord.objects.filter(vehicle=vehicle), names).order_by("-timestamp")[:10]
+    return _listing(OBD_FIELDS, records, names)
 
 @router.post("/vehicles/{vehicle_id}/obd", auth=auth)
+@idempotent
+@rate_limit("obd_push", per="vehicle")
 def push_obd_data(request, vehicle_id: int, data: OBDIn):
     try:
         vehicle = Vehicle.objects.get(id=vehicle_id, driver=request.user)
     except Vehicle.DoesNotExist:
         raise HttpError(404, "Vehicle not found or not owned by you")
 
-    record = OBDRecord.objects.create(vehicle=vehicle, **data.dict())
+    fields = data.dict(exclude={"seq"})
+    if settings.OBD_WRITE_BEHIND:
+        # Acknowledged once it is in the local log; the flusher inserts it
+        obdlog.append(vehicle.id, {**fields, "device_seq": data.seq}) # type: ignore
+        return {"message": "OBD data queued", "record_id": None}
+
+    if data.seq is None:
+        record = OBDRecord.objects.create(vehicle=vehicle, **fields)
+        return {"message": "OBD data stored", "record_id": record.id} # type: ignore
+
+    # Dongles retry uploads; a sequence number we already have is a replay
+    try:
+        with transaction.atomic():
+            record = OBDRecord.objects.create(vehicle=vehicle, device_seq=data.seq, **fields)
+    except IntegrityError:
+        record_id = OBDRecord.objects.filter(vehicle=vehicle, device_seq=data.seq).values_list("id", flat=True).get()
+        return {"message": "OBD data already stored", "record_id": record_id}
     return {"message": "OBD data stored", "record_id": record.id} # type: ignore
 
 
+def _trip_out(trip):
+    return {
+        "id": trip.id, # type: ignore
+        "vehicle_id": trip.vehicle_id, # type: ignore
+        "booking_id": trip.booking_id, # type: ignore
+        "started_at": trip.started_at,
+        "ended_at": trip.ended_at,
+        "is_open": trip.is_open,
+        "duration_seconds": trip.duration_seconds,
+        "distance_km": round(trip.distance_km, 3),
+        "max_speed": trip.max_speed,
+        "fuel_used": trip.fuel_used,
+    }
+
+@router.get("/vehicles/{vehicle_id}/trips", response=list[TripOut], auth=auth)
+def get_vehicle_trips(request, vehicle_id: int):
+    if not Vehicle.objects.filter(id=vehicle_id, driver=request.user).exists():
+        raise HttpError(404, "Vehicle not found or not owned by you")
+
+    trips = Trip.objects.filter(vehicle_id=vehicle_id).order_by("-started_at")[:50]
+    return [_trip_out(trip) for trip in trips]
+
+@router.get("/vehicle-booking/{booking_id}/trips", response=list[TripOut], auth=auth)
+def get_booking_trips(request, booking_id: int):
+    # Visible to both the renter and the vehicle owner
+    try:
+        booking = VehicleBooking.objects.select_related("availability__vehicle").get(id=booking_id)
+    except VehicleBooking.DoesNotExist:
+        raise HttpError(404, "Booking not found")
+    if request.user.id not in (booking.renter_id, booking.availability.vehicle.driver_id): # type: ignore
+        raise HttpError(404, "Booking not found")
+
+    trips = Trip.objects.filter(booking=booking).order_by("started_at")
+    return [_trip_out(trip) for trip in trips]
+
+
 # @router.get("/vehicles/{vehicle_id}/obd", response=list[OBDOut], auth=auth)
 # def get_obd_data(request, vehicle_id: int):
 #     try:
@@ -305,6 +454,7 @@ def push_obd_data(request, vehicle_id: int, data: OBDIn):
 #     return OBDRecord.objects.filter(vehicle=vehicle).order_by("-timestamp")[:10]
 
 @router.post("/vehicles/create-test", auth=auth)
+@rate_limit("create_test_vehicle", per="user")
 def create_test_vehicle(request):
     from django.utils.timezone import now
     from datetime import timedelta
@@ -326,6 +476,7 @@ def create_test_vehicle(request):
     }
 
 @router.post("/vehicles/{vehicle_id}/obd/mock", auth=auth)
+@rate_limit("obd_mock", per="user")
 def mock_obd_data(request, vehicle_id: int):
     try:
         vehicle = Vehicle.objects.get(id=vehicle_id, driver=request.user)
@@ -351,6 +502,8 @@ GEMINI_MODEL = "gemini-1.5-flash"  # fast model for chatbot
 
 @router.post("/chatbot", auth=auth)
 def chatbot(request, query: str):
+    import requests # type: ignore  # only the chatbot needs an HTTP client
+
     if not GEMINI_API_KEY:
         raise HttpError(500, "Gemini API key not configured")
 
@@ -397,6 +550,27 @@ Please provide a helpful, well-structured response:"""
 # ------------------
 # Vehicle Availability Routes
 # ------------------
+AVAILABILITY_FIELDS = FieldSet(VehicleAvailabilityOut, {
+    "id": (("id",), lambda avail: avail.id),
+    "vehicle_name": (("vehicle__name",), lambda avail: avail.vehicle.name),
+    "vehicle_registration": (("vehicle__registration_number",), lambda avail: avail.vehicle.registration_number),
+    "pickup_point": (("pickup_point",), lambda avail: avail.pickup_point),
+    "available_from": (("available_from",), lambda avail: avail.available_from),
+    "available_to": (("available_to",), lambda avail: avail.available_to),
+    "price_per_hour": (("price_per_hour",), lambda avail: float(avail.price_per_hour)),
+    "is_booked": (("is_booked",), lambda avail: avail.is_booked),
+    "vehicle_health_score": (("vehicle__health__score",), lambda avail: _health_score(avail.vehicle)),
+    "campus": (("campus",), lambda avail: avail.campus),
+    "owner_rating": (
+        ("vehicle__driver__rating_score", "vehicle__driver__rating_count"),
+        lambda avail: _rating(avail.vehicle.driver),
+    ),
+    "owner_rating_count": (("vehicle__driver__rating_count",), lambda avail: avail.vehicle.driver.rating_count),
+})
+
+def _availability_out(avail):
+    return AVAILABILITY_FIELDS.serialize(avail)
+
 @router.post("/vehicle-availability", response=VehicleAvailabilityOut, auth=auth)
 def create_vehicle_availability(request, data: VehicleAvailabilityIn):
     try:
@@ -404,130 +578,244 @@ def create_vehicle_availability(request, data: VehicleAvailabilityIn):
     except Vehicle.DoesNotExist:
         raise HttpError(404, "Vehicle not found or not owned by you")
     
-    availability = VehicleAvailability.objects.create(
-        vehicle=vehicle,
-        pickup_point=data.pickup_point,
-        available_from=data.available_from,
-        available_to=data.available_to,
-        price_per_hour=data.price_per_hour
-    )
+    try:
+        availability = create_slot(
+            vehicle,
+            pickup_point=data.pickup_point,
+            available_from=data.available_from,
+            available_to=data.available_to,
+            price_per_hour=data.price_per_hour
+        )
+    except AvailabilityError as e:
+        raise HttpError(400, str(e))
+    pricing.slot_offered(availability)
     
-    return {
-        "id": availability.id, # type: ignore
-        "vehicle_name": vehicle.name,
-        "vehicle_registration": vehicle.registration_number,
-        "pickup_point": availability.pickup_point,
-        "available_from": availability.available_from,
-        "available_to": availability.available_to,
-        "price_per_hour": float(availability.price_per_hour),
-        "is_booked": availability.is_booked,
-    }
+    return _availability_out(availability)
+
+def _open_availabilities():
+    return VehicleAvailability.objects.filter(is_booked=False, available_to__gt=now()).select_related(
+        "vehicle__health", "vehicle__driver"
+    )
 
 @router.get("/vehicle-availability", response=list[VehicleAvailabilityOut], auth=auth)
-def list_vehicle_availability(request):
-    availabilities = VehicleAvailability.objects.filter(is_booked=False).select_related("vehicle")
-    return [
-        {
-            "id": avail.id, # type: ignore
-            "vehicle_name": avail.vehicle.name,
-            "vehicle_registration": avail.vehicle.registration_number,
-            "pickup_point": avail.pickup_point,
-            "available_from": avail.available_from,
-            "available_to": avail.available_to,
-            "price_per_hour": float(avail.price_per_hour),
-            "is_booked": avail.is_booked,
-        }
-        for avail in availabilities
-    ]
+def list_vehicle_availability(
+    request,
+    campus: str | None = None,
+    sort: str | None = None,
+    min_rating: float | None = None,
+    fields: str | None = None,
+):
+    names = _projection(AVAILABILITY_FIELDS, fields)
+    availabilities, by_rating = _by_rating(
+        _open_availabilities().order_by("available_from"), "vehicle__driver", sort, min_rating
+    )
+    availabilities = campuses.fetch(
+        AVAILABILITY_FIELDS.only(
+            availabilities, names, also=["available_from", *(["vehicle__driver__rating_score"] if by_rating else [])]
+        ),
+        _listing_campus(request, campus),
+        key=lambda avail: (-avail.vehicle.driver.rating_score if by_rating else 0, avail.available_from),
+    )
+    return _listing(AVAILABILITY_FIELDS, availabilities, names)
+
+# Free slots covering the whole [start, end] window, optionally at a pickup point.
+# Any of them can be booked for exactly that window, splitting the slot.
+@router.get("/vehicle-availability/search", response=list[VehicleAvailabilityOut], auth=auth)
+def search_vehicle_availability(
+    request,
+    start: datetime,
+    end: datetime,
+    pickup: str | None = None,
+    campus: str | None = None,
+    sort: str | None = None,
+    min_rating: float | None = None,
+    fields: str | None = None,
+):
+    if start >= end:
+        raise HttpError(400, "end must be after start")
+    names = _projection(AVAILABILITY_FIELDS, fields)
+
+    availabilities = VehicleAvailability.objects.filter(
+        is_booked=False, available_from__lte=start, available_to__gte=end
+    )
+    if pickup:
+        availabilities = availabilities.filter(pickup_key=normalize_place(pickup))
+    availabilities, by_rating = _by_rating(
+        availabilities.select_related("vehicle__health", "vehicle__driver").order_by("price_per_hour"),
+        "vehicle__driver",
+        sort,
+        min_rating,
+    )
+    availabilities = campuses.fetch(
+        AVAILABILITY_FIELDS.only(
+            availabilities, names, also=["price_per_hour", *(["vehicle__driver__rating_score"] if by_rating else [])]
+        ),
+        _listing_campus(request, campus),
+        limit=100,
+        key=lambda avail: (-avail.vehicle.driver.rating_score if by_rating else 0, avail.price_per_hour),
+    )
+    return _listing(AVAILABILITY_FIELDS, availabilities, names)
 
 @router.get("/my-vehicle-availability", response=list[VehicleAvailabilityOut], auth=auth)
-def my_vehicle_availability(request):
-    availabilities = VehicleAvailability.objects.filter(vehicle__driver=request.user).select_related("vehicle")
-    return [
-        {
-            "id": avail.id, # type: ignore
-            "vehicle_name": avail.vehicle.name,
-            "vehicle_registration": avail.vehicle.registration_number,
-            "pickup_point": avail.pickup_point,
-            "available_from": avail.available_from,
-            "available_to": avail.available_to,
-            "price_per_hour": float(avail.price_per_hour),
-            "is_booked": avail.is_booked,
-        }
-        for avail in availabilities
-    ]
+def my_vehicle_availability(request, fields: str | None = None):
+    names = _projection(AVAILABILITY_FIELDS, fields)
+    availabilities = VehicleAvailability.objects.filter(vehicle__driver=request.user).select_related(
+        "vehicle__health", "vehicle__driver"
+    )
+    return _listing(AVAILABILITY_FIELDS, AVAILABILITY_FIELDS.only(availabilities, names), names)
+
+# ------------------
+# Recurring Availability Routes
+# ------------------
+def _rule_out(rule, slots_created=0):
+    return {
+        "id": rule.id, # type: ignore
+        "vehicle_id": rule.vehicle_id, # type: ignore
+        "pickup_point": rule.pickup_point,
+        "price_per_hour": float(rule.price_per_hour),
+        "weekdays": sorted(rule.weekday_set),
+        "start_time": rule.start_time,
+        "end_time": rule.end_time,
+        "starts_on": rule.starts_on,
+        "ends_on": rule.ends_on,
+        "materialized_until": rule.materialized_until,
+        "is_active": rule.is_active,
+        "slots_created": slots_created,
+    }
+
+@router.post("/vehicle-availability/rules", response=AvailabilityRuleOut, auth=auth)
+def create_availability_rule(request, data: AvailabilityRuleIn):
+    try:
+        vehicle = Vehicle.objects.get(id=data.vehicle_id, driver=request.user)
+    except Vehicle.DoesNotExist:
+        raise HttpError(404, "Vehicle not found or not owned by you")
+
+    weekdays = sorted(set(data.weekdays))
+    if not weekdays or not all(0 <= day <= 6 for day in weekdays):
+        raise HttpError(400, "weekdays must be a non-empty list of 0 (Monday) to 6 (Sunday)")
+    if data.ends_on < data.starts_on:
+        raise HttpError(400, "ends_on must not be before starts_on")
+
+    # The first horizon is validated and written in one transaction, so a
+    # conflicting rule leaves nothing behind.
+    try:
+        with campuses.atomic():
+            rule = AvailabilityRule.objects.create(
+                vehicle=vehicle,
+                pickup_point=data.pickup_point,
+                price_per_hour=data.price_per_hour,
+                weekdays=",".join(str(day) for day in weekdays),
+                start_time=data.start_time,
+                end_time=data.end_time,
+                starts_on=data.starts_on,
+                ends_on=data.ends_on,
+            )
+            slots = expand_rule(rule, strict=True)
+    except AvailabilityError as e:
+        raise HttpError(400, str(e))
+
+    return _rule_out(rule, slots_created=len(slots))
+
+@router.get("/vehicle-availability/rules", response=list[AvailabilityRuleOut], auth=auth)
+def my_availability_rules(request):
+    rules = AvailabilityRule.objects.filter(vehicle__driver=request.user, is_active=True)
+    return [_rule_out(rule) for rule in rules]
+
+@router.delete("/vehicle-availability/rules/{rule_id}", auth=auth)
+def delete_availability_rule(request, rule_id: int):
+    try:
+        rule = AvailabilityRule.objects.get(id=rule_id, vehicle__driver=request.user, is_active=True)
+    except AvailabilityRule.DoesNotExist:
+        raise HttpError(404, "Rule not found or not owned by you")
+
+    # Booked slots are kept, only future free ones are withdrawn
+    with campuses.atomic():
+        removed, _ = rule.slots.filter(is_booked=False, available_from__gt=now()).delete() # type: ignore
+        rule.is_active = False
+        rule.save(update_fields=["is_active"])
+    return {"message": "Rule deleted", "slots_removed": removed}
 
 # ------------------
 # Vehicle Booking Routes
 # ------------------
+def _vehicle_booking_out(booking):
+    return {
+        "id": booking.id, # type: ignore
+        "availability_id": booking.availability.id, # type: ignore
+        "vehicle_name": booking.availability.vehicle.name,
+        "pickup_point": booking.availability.pickup_point,
+        "available_from": booking.availability.available_from,
+        "available_to": booking.availability.available_to,
+        "price_per_hour": float(booking.availability.price_per_hour),
+        "booked_at": booking.booked_at,
+        "liability_accepted": booking.liability_accepted,
+    }
+
 @router.post("/vehicle-booking", response=VehicleBookingOut, auth=auth)
+@idempotent
 def create_vehicle_booking(request, data: VehicleBookingIn):
     if not data.liability_accepted:
         raise HttpError(400, "You must accept the liability agreement to proceed")
     
-    try:
-        availability = VehicleAvailability.objects.select_related("vehicle").get(
-            id=data.availability_id, is_booked=False
+    slot_campus = _row_campus(request, data.campus)
+    with campuses.atomic():
+        try:
+            availability = VehicleAvailability.objects.select_for_update().select_related("vehicle").get(
+                id=data.availability_id, campus=slot_campus, is_booked=False
+            )
+        except VehicleAvailability.DoesNotExist:
+            raise HttpError(404, "Vehicle availability not found or already booked")
+        
+        # Prevent self-booking
+        if availability.vehicle.driver == request.user:
+            raise HttpError(400, "You cannot book your own vehicle")
+        
+        # Check if already booked by this user
+        if VehicleBooking.objects.filter(availability=availability, renter=request.user).exists():
+            raise HttpError(400, "You have already booked this vehicle")
+        
+        # A freed slot is reserved for the waitlisted renter it was offered to
+        hold = active_hold(availability=availability)
+        if hold is not None and hold.user_id != request.user.id: # type: ignore
+            raise HttpError(400, "This vehicle is on hold for a waitlisted renter")
+        
+        # Book only part of the slot, the rest stays published as free slots
+        if data.start is not None or data.end is not None:
+            try:
+                split_slot(
+                    availability,
+                    data.start or availability.available_from,
+                    data.end or availability.available_to,
+                )
+            except AvailabilityError as e:
+                raise HttpError(400, str(e))
+        
+        # Create booking
+        booking = VehicleBooking.objects.create(
+            availability=availability,
+            renter=request.user,
+            liability_accepted=True,
+            liability_accepted_at=now()
         )
-    except VehicleAvailability.DoesNotExist:
-        raise HttpError(404, "Vehicle availability not found or already booked")
-    
-    # Prevent self-booking
-    if availability.vehicle.driver == request.user:
-        raise HttpError(400, "You cannot book your own vehicle")
-    
-    # Check if already booked by this user
-    if VehicleBooking.objects.filter(availability=availability, renter=request.user).exists():
-        raise HttpError(400, "You have already booked this vehicle")
-    
-    from django.utils.timezone import now
-    
-    # Create booking
-    booking = VehicleBooking.objects.create(
-        availability=availability,
-        renter=request.user,
-        liability_accepted=True,
-        liability_accepted_at=now()
-    )
-    
-    # Mark availability as booked
-    availability.is_booked = True
-    availability.save()
+        
+        # Mark availability as booked
+        availability.is_booked = True
+        availability.save()
+        mark_accepted(request.user, availability=availability)
+        pricing.slot_booked(availability)
+        outbox.vehicle_booked(booking)
     
-    return {
-        "id": booking.id, # type: ignore
-        "availability_id": availability.id, # type: ignore
-        "vehicle_name": availability.vehicle.name,
-        "pickup_point": availability.pickup_point,
-        "available_from": availability.available_from,
-        "available_to": availability.available_to,
-        "price_per_hour": float(availability.price_per_hour),
-        "booked_at": booking.booked_at,
-        "liability_accepted": booking.liability_accepted,
-    }
+    return _vehicle_booking_out(booking)
 
 @router.get("/my-vehicle-bookings", response=list[VehicleBookingOut], auth=auth)
 def my_vehicle_bookings(request):
     bookings = VehicleBooking.objects.filter(renter=request.user).select_related("availability__vehicle")
-    return [
-        {
-            "id": booking.id, # type: ignore
-            "availability_id": booking.availability.id, # type: ignore
-            "vehicle_name": booking.availability.vehicle.name,
-            "pickup_point": booking.availability.pickup_point,
-            "available_from": booking.availability.available_from,
-            "available_to": booking.availability.available_to,
-            "price_per_hour": float(booking.availability.price_per_hour),
-            "booked_at": booking.booked_at,
-            "liability_accepted": booking.liability_accepted,
-        }
-        for booking in bookings
-    ]
+    return [_vehicle_booking_out(booking) for booking in bookings]
 
 @router.delete("/vehicle-booking/{booking_id}", auth=auth)
 def cancel_vehicle_booking(request, booking_id: int):
     try:
-        booking = VehicleBooking.objects.select_related("availability").get(
+        booking = VehicleBooking.objects.select_related("availability__vehicle", "renter").get(
             id=booking_id, renter=request.user
         )
     except VehicleBooking.DoesNotExist:
@@ -541,12 +829,546 @@ def cancel_vehicle_booking(request, booking_id: int):
     if time_left < timedelta(hours=1):
         raise HttpError(400, "Cannot cancel within 1 hour of start time")
     
-    # Mark availability as available again
-    availability = booking.availability
-    availability.is_booked = False
-    availability.save()
-    
-    # Delete booking
-    booking.delete()
+    with campuses.atomic():
+        # Mark availability as available again
+        availability = booking.availability
+        availability.is_booked = False
+        availability.save()
+        pricing.slot_booked(availability, sign=-1)
+        outbox.vehicle_booking_cancelled(booking)
+        
+        # Delete booking
+        booking.delete()
+        
+        # Hand the slot to the first renter on the waitlist
+        offer_next(availability=availability)
     
     return {"message": "Vehicle booking cancelled successfully"}
+
+# ------------------
+# Rating Routes
+# ------------------
+def _rating_response(rating):
+    return {
+        "id": rating.id, # type: ignore
+        "rater": rating.rater.username,
+        "rated": rating.rated.username,
+        "score": rating.score,
+        "comment": rating.comment,
+        "created_at": rating.created_at,
+    }
+
+def _rate(request, other, data, **booking):
+    try:
+        rating = ratings.rate(request.user, other, data.score, data.comment, **booking)
+    except RatingError as e:
+        raise HttpError(400, str(e))
+    return _rating_response(rating)
+
+# The passenger rates the driver and the driver rates the passenger, once the ride has left
+@router.post("/bookings/{booking_id}/rating", response=RatingOut, auth=auth)
+def rate_ride_booking(request, booking_id: int, data: RatingIn):
+    try:
+        booking = RideBooking.objects.select_related("ride__driver", "passenger").get(id=booking_id)
+    except RideBooking.DoesNotExist:
+        raise HttpError(404, "Booking not found")
+    if request.user.id == booking.passenger_id: # type: ignore
+        other = booking.ride.driver
+    elif request.user.id == booking.ride.driver_id: # type: ignore
+        other = booking.passenger
+    else:
+        raise HttpError(404, "Booking not found")
+    if booking.ride.departure_time > now():
+        raise HttpError(400, "A ride can be rated once it has departed")
+    return _rate(request, other, data, ride_booking=booking)
+
+# The renter rates the vehicle owner and the owner rates the renter, once the rental has ended
+@router.post("/vehicle-booking/{booking_id}/rating", response=RatingOut, auth=auth)
+def rate_vehicle_booking(request, booking_id: int, data: RatingIn):
+    try:
+        booking = VehicleBooking.objects.select_related("availability__vehicle__driver", "renter").get(id=booking_id)
+    except VehicleBooking.DoesNotExist:
+        raise HttpError(404, "Booking not found")
+    owner = booking.availability.vehicle.driver
+    if request.user.id == booking.renter_id: # type: ignore
+        other = owner
+    elif request.user.id == owner.id: # type: ignore
+        other = booking.renter
+    else:
+        raise HttpError(404, "Booking not found")
+    if booking.availability.available_to > now():
+        raise HttpError(400, "A rental can be rated once it has ended")
+    return _rate(request, other, data, vehicle_booking=booking)
+
+@router.get("/users/{user_id}/rating", response=UserRatingOut, auth=auth)
+def user_rating(request, user_id: int):
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        raise HttpError(404, "User not found")
+    # Ratings are stored with the bookings, in the rated user's campus database
+    recent = (
+        Rating.objects.using(campuses.database(user.campus))
+        .filter(rated=user)
+        .select_related("rater", "rated")
+        .order_by("-created_at")[:20]
+    )
+    return {
+        "user_id": user.id, # type: ignore
+        "username": user.username,
+        "rating": round(user.rating_score, 2) if user.rating_count else None, # type: ignore
+        "rating_count": user.rating_count, # type: ignore
+        "average": round(user.rating_sum / user.rating_count, 2) if user.rating_count else None, # type: ignore
+        "recent": [_rating_response(rating) for rating in recent],
+    }
+
+# ------------------
+# Waitlist Routes
+# ------------------
+def _waitlist_out(entry):
+    return {
+        "id": entry.id, # type: ignore
+        "ride_id": entry.ride_id, # type: ignore
+        "availability_id": entry.availability_id, # type: ignore
+        "status": entry.status,
+        "created_at": entry.created_at,
+        "hold_expires_at": entry.hold_expires_at,
+    }
+
+def _join_waitlist(user, **target):
+    return WaitlistEntry.objects.get_or_create(
+        user=user, status__in=[WaitlistEntry.WAITING, WaitlistEntry.OFFERED], **target
+    )
+
+@router.post("/rides/{ride_id}/waitlist", response=WaitlistOut, auth=auth)
+def join_ride_waitlist(request, ride_id: int, campus: str | None = None):
+    try:
+        ride = Ride.objects.get(id=ride_id, campus=_row_campus(request, campus))
+    except Ride.DoesNotExist:
+        raise HttpError(404, "Ride not found")
+
+    if ride.driver_id == request.user.id: # type: ignore
+        raise HttpError(400, "You cannot join the waitlist for your own ride")
+    if ride.departure_time - now() < timedelta(minutes=30):
+        raise HttpError(400, "Ride departs within 30 minutes")
+    if RideBooking.objects.filter(ride=ride, passenger=request.user).exists():
+        raise HttpError(400, "You already booked this ride")
+    if not RideBooking.objects.filter(ride=ride).exists() and active_hold(ride=ride) is None:
+        raise HttpError(400, "This ride is available, book it directly")
+
+    with campuses.atomic():
+        entry, created = _join_waitlist(request.user, ride=ride)
+        if created:
+            analytics.ride_waitlisted(ride)
+    return _waitlist_out(entry)
+
+@router.post("/vehicle-availability/{availability_id}/waitlist", response=WaitlistOut, auth=auth)
+def join_availability_waitlist(request, availability_id: int, campus: str | None = None):
+    try:
+        availability = VehicleAvailability.objects.select_related("vehicle").get(
+            id=availability_id, campus=_row_campus(request, campus)
+        )
+    except VehicleAvailability.DoesNotExist:
+        raise HttpError(404, "Vehicle availability not found")
+
+    if availability.vehicle.driver_id == request.user.id: # type: ignore
+        raise HttpError(400, "You cannot join the waitlist for your own vehicle")
+    if availability.available_from - now() < timedelta(hours=1):
+        raise HttpError(400, "Slot starts within 1 hour")
+    if VehicleBooking.objects.filter(availability=availability, renter=request.user).exists():
+        raise HttpError(400, "You have already booked this vehicle")
+    if not availability.is_booked and active_hold(availability=availability) is None:
+        raise HttpError(400, "This vehicle is available, book it directly")
+
+    entry, _ = _join_waitlist(request.user, availability=availability)
+    return _waitlist_out(entry)
+
+@router.get("/my-waitlist", response=list[WaitlistOut], auth=auth)
+def my_waitlist(request):
+    entries = WaitlistEntry.objects.filter(
+        user=request.user, status__in=[WaitlistEntry.WAITING, WaitlistEntry.OFFERED]
+    ).order_by("created_at")
+    return [_waitlist_out(entry) for entry in entries]
+
+@router.delete("/waitlist/{entry_id}", auth=auth)
+def leave_waitlist(request, entry_id: int):
+    try:
+        entry = WaitlistEntry.objects.select_related("ride", "availability__vehicle").get(
+            id=entry_id, user=request.user, status__in=[WaitlistEntry.WAITING, WaitlistEntry.OFFERED]
+        )
+    except WaitlistEntry.DoesNotExist:
+        raise HttpError(404, "Waitlist entry not found")
+
+    release(entry)
+    return {"message": "Left the waitlist"}
+
+@router.get("/notifications", response=list[NotificationOut], auth=auth)
+def my_notifications(request):
+    notifications = Notification.objects.filter(user=request.user).order_by("-created_at")[:50]
+    return [
+        {
+            "id": n.id, # type: ignore
+            "message": n.message,
+            "created_at": n.created_at,
+            "read_at": n.read_at,
+        }
+        for n in notifications
+    ]
+
+@router.post("/notifications/read", auth=auth)
+def mark_notifications_read(request):
+    updated = Notification.objects.filter(user=request.user, read_at__isnull=True).update(read_at=now())
+    return {"message": "Notifications marked as read", "count": updated}
+
+# ------------------
+# Invoice Routes
+# ------------------
+def _invoice_out(invoice):
+    return {
+        "id": invoice.id, # type: ignore
+        "booking_id": invoice.booking_id, # type: ignore
+        "vehicle_name": invoice.vehicle.name if invoice.vehicle else None,
+        "period_start": invoice.period_start,
+        "period_end": invoice.period_end,
+        "hours": float(invoice.hours),
+        "rate_per_hour": float(invoice.rate_per_hour),
+        "distance_km": float(invoice.distance_km),
+        "rate_per_km": float(invoice.rate_per_km),
+        "time_amount": float(invoice.time_amount),
+        "usage_amount": float(invoice.usage_amount),
+        "total": float(invoice.total),
+        "issued_at": invoice.issued_at,
+    }
+
+@router.get("/invoices", response=list[InvoiceOut], auth=auth)
+def my_invoices(request):
+    invoices = Invoice.objects.filter(renter=request.user).select_related("vehicle").order_by("-issued_at")
+    return [_invoice_out(invoice) for invoice in invoices]
+
+@router.get("/invoices/{invoice_id}", response=InvoiceOut, auth=auth)
+def get_invoice(request, invoice_id: int):
+    try:
+        invoice = Invoice.objects.select_related("vehicle").get(id=invoice_id, renter=request.user)
+    except Invoice.DoesNotExist:
+        raise HttpError(404, "Invoice not found")
+    return _invoice_out(invoice)
+
+# ------------------
+# Analytics Routes
+# ------------------
+DEMAND_SORTS = {
+    "fill_rate": "-fill_rate_value",
+    "waitlisted": "-waitlisted",
+    "rides_offered": "-rides_offered",
+    "under_served": "fill_rate_value",
+}
+
+@router.get("/analytics/demand", response=list[RouteDemandOut], auth=auth)
+def route_demand(
+    request,
+    source: str | None = None,
+    destination: str | None = None,
+    hour_of_week: int | None = None,
+    sort: str = "waitlisted",
+    limit: int = 50,
+):
+    if sort not in DEMAND_SORTS:
+        raise HttpError(400, f"Unknown sort, expected one of: {', '.join(DEMAND_SORTS)}")
+
+    rows = RouteDemand.objects.annotate(
+        fill_rate_value=Cast("rides_booked", FloatField()) / NullIf("rides_offered", Value(0))
+    )
+    if source:
+        rows = rows.filter(source_key=normalize_place(source))
+    if destination:
+        rows = rows.filter(destination_key=normalize_place(destination))
+    if hour_of_week is not None:
+        rows = rows.filter(hour_of_week=hour_of_week)
+    order = DEMAND_SORTS[sort]
+    rows = rows.order_by(F(order[1:]).desc(nulls_last=True) if order.startswith("-") else F(order).asc(nulls_last=True), "id")
+
+    return [
+        {
+            "source": row.source_key,
+            "destination": row.destination_key,
+            "hour_of_week": row.hour_of_week,
+            "weekday": row.hour_of_week // 24,
+            "hour": row.hour_of_week % 24,
+            "rides_offered": row.rides_offered,
+            "rides_booked": row.rides_booked,
+            "waitlisted": row.waitlisted,
+            "fill_rate": round(row.fill_rate_value, 3) if row.fill_rate_value is not None else None,
+            "average_fare": round(float(row.average_fare), 2) if row.average_fare is not None else None,
+        }
+        for row in rows[: min(max(limit, 1), 200)]
+    ]
+
+# ------------------
+# Pricing Routes
+# ------------------
+@router.get("/pricing/suggest", response=PriceSuggestionOut, auth=auth)
+def suggest_fare(request, source: str, destination: str, departure_time: datetime):
+    suggestion = pricing.suggest_fare(source, destination, departure_time)
+    if suggestion is None:
+        raise HttpError(404, "No ride history to price from yet")
+    return suggestion
+
+@router.get("/pricing/suggest-rental", response=PriceSuggestionOut, auth=auth)
+def suggest_price_per_hour(request, pickup_point: str, available_from: datetime):
+    suggestion = pricing.suggest_price_per_hour(pickup_point, available_from)
+    if suggestion is None:
+        raise HttpError(404, "No rental history to price from yet")
+    return suggestion
+
+# ------------------
+# Export Routes
+# ------------------
+@router.get("/export/{dataset}", auth=auth)
+def export_data(
+    request,
+    dataset: str,
+    format: str = "csv",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    vehicle_id: int | None = None,
+    gzip: bool = False,
+):
+    if dataset not in export.DATASETS:
+        raise HttpError(404, f"Unknown dataset, expected one of: {', '.join(export.DATASETS)}")
+    if format not in export.FORMATS:
+        raise HttpError(400, f"Unknown format, expected one of: {', '.join(export.FORMATS)}")
+
+    # Staff export everything, everyone else only their own rows
+    filters = {"vehicle_id": vehicle_id} if vehicle_id is not None and dataset == "obd" else {}
+    queryset = export.DATASETS[dataset].queryset(request.user, start, end, **filters)
+
+    content_type, extension = export.FORMATS[format]
+    filename = f"{dataset}-{now():%Y%m%d%H%M%S}.{extension}"
+    response = StreamingHttpResponse(
+        export.stream(dataset, format, queryset, gzip=gzip),
+        content_type="application/gzip" if gzip else content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}{".gz" if gzip else ""}"'
+    return response
+
+# ------------------
+# Maintenance Routes
+# ------------------
+@router.get("/maintenance/jobs", auth=auth)
+def scheduled_jobs(request):
+    if not request.user.is_staff:
+        raise HttpError(403, "Staff only")
+
+    jobs = []
+    for name in settings.SCHEDULED_JOBS:
+        run = JobRun.objects.filter(name=name).order_by("-started_at").first()
+        jobs.append({
+            "name": name,
+            "last_started_at": run.started_at if run else None,
+            "last_finished_at": run.finished_at if run else None,
+            "last_result": run.result if run else None,
+            "failed": bool(run and run.error),
+        })
+    return jobs
+
+@router.get("/maintenance/obd-log", auth=auth)
+def obd_log_metrics(request):
+    if not request.user.is_staff:
+        raise HttpError(403, "Staff only")
+
+    return obdlog.metrics()
+
+@router.get("/maintenance/outbox", auth=auth)
+def outbox_metrics(request):
+    if not request.user.is_staff:
+        raise HttpError(403, "Staff only")
+
+    return outbox.metrics()
+
+@router.get("/maintenance/rate-limits", auth=auth)
+def rate_limit_metrics(request):
+    if not request.user.is_staff:
+        raise HttpError(403, "Staff only")
+
+    return {
+        "backend": settings.RATE_LIMIT_BACKEND,
+        "limits": {scope: {"per_second": rate, "burst": burst} for scope, (rate, burst) in settings.RATE_LIMITS.items()},
+        "counts": rate_limit_snapshot(),
+    }
+
+# ------------------
+# Dashboard Routes
+# ------------------
+# Each section reads with at most one query (select_related for joins)
+DASHBOARD_SECTIONS = {
+    "me": lambda user: _me_out(user),
+    "vehicles": lambda user: [_vehicle_out(v) for v in Vehicle.objects.filter(driver=user).select_related("health")],
+    "vehicle_availability": lambda user: [
+        _availability_out(a)
+        for a in campuses.fetch(_open_availabilities().order_by("available_from"), user.campus)
+    ],
+    "my_vehicle_availability": lambda user: [
+        _availability_out(a) for a in VehicleAvailability.objects.filter(vehicle__driver=user).select_related("vehicle__health", "vehicle__driver")
+    ],
+    "my_vehicle_bookings": lambda user: [
+        _vehicle_booking_out(b) for b in VehicleBooking.objects.filter(renter=user).select_related("availability__vehicle")
+    ],
+}
+
+def _section_version(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+# One authenticated call for everything the dashboard shows.
+# include=vehicles,me limits the sections; versions=vehicles:<v>,... returns
+# sections whose version still matches as {"version": v, "unchanged": true}.
+@router.get("/dashboard", auth=auth)
+def dashboard(request, include: str | None = None, versions: str | None = None):
+    names = [name.strip() for name in include.split(",") if name.strip()] if include else list(DASHBOARD_SECTIONS)
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HttpError(400, f"Unknown dashboard sections: {', '.join(unknown)}")
+
+    known_versions = dict(pair.split(":", 1) for pair in (versions or "").split(",") if ":" in pair)
+    sections = {}
+    for name in names:
+        data = DASHBOARD_SECTIONS[name](request.user)
+        version = _section_version(data)
+        if known_versions.get(name) == version:
+            sections[name] = {"version": version, "unchanged": True}
+        else:
+            sections[name] = {"version": version, "data": data}
+    return {"sections": sections}
+
+# ------------------
+# Sync Routes
+# ------------------
+# Per feed: how to load current rows for upserted ids, how to serialize
+# them, and which rows count as gone from the feed's point of view.
+SYNC_FEEDS = {
+    "rides": (
+        lambda ids: Ride.objects.filter(id__in=ids).select_related("driver"),
+        _ride_out,
+        lambda ride: ride.status != Ride.OPEN,
+    ),
+    "ride_bookings": (
+        lambda ids: RideBooking.objects.filter(id__in=ids).select_related("ride__driver"),
+        _ride_booking_out,
+        lambda booking: False,
+    ),
+    "vehicles": (
+        lambda ids: Vehicle.objects.filter(id__in=ids).select_related("health"),
+        _vehicle_out,
+        lambda vehicle: False,
+    ),
+    "vehicle_availability": (
+        lambda ids: VehicleAvailability.objects.filter(id__in=ids).select_related("vehicle__health", "vehicle__driver"),
+        _availability_out,
+        # Booked and expired slots drop out of the listing
+        lambda avail: avail.is_booked or avail.available_to <= now(),
+    ),
+    "vehicle_bookings": (
+        lambda ids: VehicleBooking.objects.filter(id__in=ids).select_related("availability__vehicle"),
+        _vehicle_booking_out,
+        lambda booking: False,
+    ),
+}
+
+# Changes visible to the caller after `since`, read from the change log.
+# Without `since` only the current cursor is returned, for clients that
+# just did a full load. A 410 means the cursor is older than the retained
+# log and the client must reload everything. The cursor stays before
+# changes that could still be overtaken (see core.sync), so those are
+# sent again on the next call. Rides and slots are scoped to a campus like
+# their listings, though only campuses in the caller's database are seen.
+@router.get("/sync", auth=auth)
+def sync(request, since: int | None = None, limit: int = 500, campus: str | None = None):
+    limit = max(1, min(limit, 2000))
+    visible = ChangeLog.objects.filter(Q(audience__isnull=True) | Q(audience=request.user))
+    campus = _listing_campus(request, campus)
+    if campus != campuses.ALL:
+        visible = visible.filter(Q(campus__isnull=True) | Q(campus=campus))
+    settled = settled_before()
+    if since is None:
+        cursor = visible.filter(created_at__lt=settled).order_by("-id").values_list("id", flat=True).first() or 0
+        return {"cursor": cursor, "has_more": False, "changes": {}}
+    if since < pruned_before():
+        raise HttpError(410, "Cursor expired, reload all data")
+
+    entries = list(
+        visible.filter(id__gt=since).order_by("id").values_list("id", "model", "object_id", "op", "created_at")[:limit]
+    )
+    cursor = since
+    for entry_id, _, _, _, created_at in entries:
+        if created_at >= settled:
+            break
+        cursor = entry_id
+    latest = {}
+    for _, model, object_id, op, _ in entries:
+        latest[(model, object_id)] = op
+
+    changes = {}
+    for name, (load, serialize, is_gone) in SYNC_FEEDS.items():
+        upserted_ids = [obj_id for (model, obj_id), op in latest.items() if model == name and op == ChangeLog.UPSERT]
+        deleted = [obj_id for (model, obj_id), op in latest.items() if model == name and op == ChangeLog.DELETE]
+        upserted = []
+        if upserted_ids:
+            found = set()
+            for obj in load(upserted_ids):
+                found.add(obj.id)
+                if is_gone(obj):
+                    deleted.append(obj.id)
+                else:
+                    upserted.append(serialize(obj))
+            # Rows deleted after the upsert was logged but before this read
+            deleted.extend(obj_id for obj_id in upserted_ids if obj_id not in found)
+        if upserted or deleted:
+            changes[name] = {"upserted": upserted, "deleted": sorted(set(deleted))}
+
+    return {
+        "cursor": cursor,
+        # A full page of unsettled changes can't move the cursor; the client
+        # picks up the rest on its next regular sync
+        "has_more": len(entries) == limit and cursor != since,
+        "changes": changes,
+    }
+
+# ------------------
+# Place Search Routes
+# ------------------
+@router.get("/places/autocomplete", response=list[PlaceOut], auth=auth)
+def autocomplete_places(request, q: str, limit: int = 10):
+    matches = search_places(q, limit=max(1, min(limit, 25)))
+    return [{"key": key, "name": name, "score": score} for key, name, score in matches]
+
+# Rides and free vehicle slots at places matching q, best place match first
+@router.get("/places/search", auth=auth)
+def search_by_place(request, q: str, campus: str | None = None):
+    scores = {key: score for key, _, score in search_places(q, limit=10)}
+    if not scores:
+        return {"places": [], "rides": [], "vehicle_availability": []}
+
+    keys = list(scores)
+    campus = _listing_campus(request, campus)
+    rides = campuses.fetch(
+        Ride.objects.filter(status=Ride.OPEN, departure_time__gt=now())
+        .filter(Q(source_key__in=keys) | Q(destination_key__in=keys))
+        .select_related("driver")
+        .order_by("departure_time"),
+        campus,
+        limit=100,
+        key=lambda ride: ride.departure_time,
+    )
+    rides = sorted(rides, key=lambda r: -max(scores.get(r.source_key, 0), scores.get(r.destination_key, 0)))
+    slots = campuses.fetch(
+        _open_availabilities().filter(pickup_key__in=keys).order_by("available_from"),
+        campus,
+        limit=100,
+        key=lambda avail: avail.available_from,
+    )
+    slots = sorted(slots, key=lambda a: -scores[a.pickup_key])
+    return {
+        "places": [{"key": key, "score": score} for key, score in scores.items()],
+        "rides": [_ride_out(ride) for ride in rides],
+        "vehicle_availability": [_availability_out(avail) for avail in slots],
+    }
@@ -0,0 +1,85 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from .models import JobRun
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicRunner(threading.Thread):
+    """
+    Runs the jobs in settings.SCHEDULED_JOBS at their own intervals and
+    records every run in JobRun.
+    """
+
+    def __init__(self, jobs=None, tick=1.0):
+        super().__init__(name="core-scheduler", daemon=True)
+        jobs = jobs if jobs is not None else settings.SCHEDULED_JOBS
+        self.jobs = [(name, import_string(path), interval) for name, (path, interval) in jobs.items()]
+        self.tick = tick
+        self._next_run = {name: 0.0 for name, _, _ in self.jobs}
+        self._stop_event = threading.Event()
+
+    def run_job(self, name, func):
+        run = JobRun.objects.create(name=name, started_at=now())
+        try:
+            run.result = _jsonable(func() or {})
+        except Exception:
+            logger.exception("Scheduled job %s failed", name)
+            run.error = traceback.format_exc()
+        run.finished_at = now()
+        run.save(update_fields=["result", "error", "finished_at"])
+        return run
+
+    def run_pending(self):
+        for name, func, interval in self.jobs:
+            if time.monotonic() >= self._next_run[name]:
+                close_old_connections()
+                self.run_job(name, func)
+                self._next_run[name] = time.monotonic() + interval
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.run_pending()
+            self._stop_event.wait(self.tick)
+        close_old_connections()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def _jsonable(result):
+    return {key: value if isinstance(value, (int, float, str, bool, type(None))) else str(value) for key, value in result.items()}
+
+
+_runner = None
+
+
+def serves_requests():
+    """False in management commands and in runserver's autoreloader parent."""
+    if sys.argv[0].endswith("manage.py"):
+        if sys.argv[1:2] != ["runserver"]:
+            return False
+        # Only the autoreloader's child process serves requests
+        if "--noreload" not in sys.argv and os.environ.get("RUN_MAIN") != "true":
+            return False
+    return True
+
+
+def start_in_process():
+    """Start the scheduler thread once per process, unless running a management command."""
+    global _runner
+    if _runner is not None or not serves_requests():
+        return None
+    _runner = PeriodicRunner()
+    _runner.start()
+    return _runner
@@ -1,5 +1,5 @@
 from ninja import Schema
-from datetime import datetime
+from datetime import date, datetime, time
 
 class UserOut(Schema):
     id: int
@@ -15,6 +15,9 @@ class RideOut(Schema):
     departure_time: datetime
     available_seats: int
     fare: float
+    campus: str
+    driver_rating: float | None = None
+    driver_rating_count: int = 0
 
 class RideIn(Schema):
     source: str
@@ -42,6 +45,7 @@ class OBDIn(Schema):
     error_code: str | None = None
     location_lat: float | None = None
     location_lng: float | None = None
+    seq: int | None = None  # per-vehicle sequence number from the device
 
 class OBDOut(Schema):
     timestamp: str
@@ -66,6 +70,7 @@ class VehicleOut(Schema):
     price_per_hour: float
     available_from: datetime
     available_to: datetime
+    health_score: float | None = None  # 0-100, from OBD history
 
 class VehicleAvailabilityIn(Schema):
     vehicle_id: int
@@ -83,10 +88,43 @@ class VehicleAvailabilityOut(Schema):
     available_to: datetime
     price_per_hour: float
     is_booked: bool
+    vehicle_health_score: float | None = None
+    campus: str
+    owner_rating: float | None = None
+    owner_rating_count: int = 0
+
+class AvailabilityRuleIn(Schema):
+    vehicle_id: int
+    pickup_point: str
+    price_per_hour: float
+    weekdays: list[int]  # Monday=0 ... Sunday=6
+    start_time: time
+    end_time: time
+    starts_on: date
+    ends_on: date
+
+class AvailabilityRuleOut(Schema):
+    id: int
+    vehicle_id: int
+    pickup_point: str
+    price_per_hour: float
+    weekdays: list[int]
+    start_time: time
+    end_time: time
+    starts_on: date
+    ends_on: date
+    materialized_until: date | None
+    is_active: bool
+    slots_created: int = 0
 
 class VehicleBookingIn(Schema):
     availability_id: int
+    # The slot's campus, as listed; defaults to the caller's
+    campus: str | None = None
     liability_accepted: bool
+    # Optional sub-window of the slot; defaults to the whole slot
+    start: datetime | None = None
+    end: datetime | None = None
 
 class VehicleBookingOut(Schema):
     id: int
@@ -97,4 +135,88 @@ class VehicleBookingOut(Schema):
     available_to: datetime
     price_per_hour: float
     booked_at: datetime
-    liability_accepted: bool
\ No newline at end of file
+    liability_accepted: bool
+class TripOut(Schema):
+    id: int
+    vehicle_id: int
+    booking_id: int | None
+    started_at: datetime
+    ended_at: datetime
+    is_open: bool
+    duration_seconds: int
+    distance_km: float
+    max_speed: float | None
+    fuel_used: float | None
+
+class InvoiceOut(Schema):
+    id: int
+    booking_id: int | None
+    vehicle_name: str | None
+    period_start: datetime
+    period_end: datetime
+    hours: float
+    rate_per_hour: float
+    distance_km: float
+    rate_per_km: float
+    time_amount: float
+    usage_amount: float
+    total: float
+    issued_at: datetime
+
+class WaitlistOut(Schema):
+    id: int
+    ride_id: int | None
+    availability_id: int | None
+    status: str
+    created_at: datetime
+    hold_expires_at: datetime | None
+
+class RatingIn(Schema):
+    score: int
+    comment: str = ""
+
+class RatingOut(Schema):
+    id: int
+    rater: str
+    rated: str
+    score: int
+    comment: str
+    created_at: datetime
+
+class UserRatingOut(Schema):
+    user_id: int
+    username: str
+    rating: float | None
+    rating_count: int
+    average: float | None
+    recent: list[RatingOut]
+
+class NotificationOut(Schema):
+    id: int
+    message: str
+    created_at: datetime
+    read_at: datetime | None
+
+class PlaceOut(Schema):
+    key: str
+    name: str
+    score: float
+
+class RouteDemandOut(Schema):
+    source: str
+    destination: str
+    hour_of_week: int
+    weekday: int  # 0 = Monday
+    hour: int
+    rides_offered: int
+    rides_booked: int
+    waitlisted: int
+    fill_rate: float | None
+    average_fare: float | None
+
+class PriceSuggestionOut(Schema):
+    suggested: float
+    typical: float  # history-weighted average before the demand adjustment
+    demand_ratio: float  # bookings plus waitlisted per offered seat/slot
+    samples: float
+    basis: str  # "history" for a known route/pickup point, "market" otherwise
@@ -0,0 +1,83 @@
+"""
+Change log behind GET /sync.
+
+ChangeLog ids are allocated when a row is inserted but become visible when
+its transaction commits, so with concurrent writers a lower id can appear
+after a higher one was already read. Cursors therefore stop before the
+first change younger than WRITE_SETTLE_SECONDS; newer changes are still
+returned and sent again on the next read. Every change is delivered at
+least once as long as no write transaction stays open longer than that
+(and app server clocks agree to within it).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.utils.timezone import now
+
+from . import campus
+from .models import ChangeLog, JobWatermark, Ride, RideBooking, Vehicle, VehicleAvailability, VehicleBooking
+
+PRUNE_WATERMARK = "changelog_pruned"
+
+# Synced model -> (feed name, function returning the user a change is
+# private to, function returning the campus whose listing shows the row;
+# either returns None when every client may see it)
+TRACKED = {
+    Ride: ("rides", lambda obj: None, lambda obj: obj.campus),
+    RideBooking: ("ride_bookings", lambda obj: obj.passenger_id, lambda obj: None),
+    Vehicle: ("vehicles", lambda obj: obj.driver_id, lambda obj: None),
+    VehicleAvailability: ("vehicle_availability", lambda obj: None, lambda obj: obj.campus),
+    VehicleBooking: ("vehicle_bookings", lambda obj: obj.renter_id, lambda obj: None),
+}
+
+
+def _change(model, obj, op):
+    name, audience, campus_of = TRACKED[model]
+    return ChangeLog(model=name, object_id=obj.pk, op=op, audience_id=audience(obj), campus=campus_of(obj))
+
+
+def record_changes(model, objects, op=ChangeLog.UPSERT):
+    """Log changes made by bulk_create()/update(), which send no signals."""
+    ChangeLog.objects.bulk_create([_change(model, obj, op) for obj in objects])
+
+
+def _on_save(sender, instance, **kwargs):
+    _change(sender, instance, ChangeLog.UPSERT).save()
+
+
+def _on_delete(sender, instance, **kwargs):
+    _change(sender, instance, ChangeLog.DELETE).save()
+
+
+def connect():
+    for model in TRACKED:
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"sync_save_{model.__name__}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"sync_delete_{model.__name__}")
+
+
+def settled_before():
+    """Changes logged before this can no longer be overtaken by an open transaction."""
+    return now() - timedelta(seconds=settings.WRITE_SETTLE_SECONDS)
+
+
+def _prune_watermark():
+    # Each campus database keeps its own change log and id sequence
+    alias = campus.database()
+    return PRUNE_WATERMARK if alias == DEFAULT_DB_ALIAS else f"{PRUNE_WATERMARK}:{alias}"
+
+
+def pruned_before():
+    """Cursors below this id may have missed pruned changes."""
+    return JobWatermark.objects.filter(name=_prune_watermark()).values_list("position", flat=True).first() or 0
+
+
+def prune_changes(cutoff):
+    last_id = ChangeLog.objects.filter(created_at__lt=cutoff).order_by("-id").values_list("id", flat=True).first()
+    if last_id is None:
+        return 0
+    JobWatermark.objects.update_or_create(name=_prune_watermark(), defaults={"position": last_id})
+    deleted, _ = ChangeLog.objects.filter(id__lte=last_id).delete()
+    return deleted
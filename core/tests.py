@@ -1,3 +1,121 @@
-from django.test import TestCase
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from backend.urls import prebuilt_openapi_is_current
+
+from . import obdlog
+from .places import remember, search_places
+
+# Imports of a fresh API-only worker, summed from python -X importtime
+IMPORT_BUDGET_MS = 1000
+
+
+class PlaceSearchTests(TestCase):
+    def setUp(self):
+        for name in ["Main Gate", "Library Block B", "Lecture Hall Complex", "Metro Station"]:
+            remember(name)
+
+    def keys(self, query):
+        return [key for key, _, _ in search_places(query)]
+
+    def test_prefix_match_comes_first(self):
+        self.assertEqual(self.keys("lib")[0], "library block b")
+
+    def test_typo(self):
+        self.assertIn("library block b", self.keys("libary"))
+
+    def test_transposition_in_short_query(self):
+        self.assertEqual(self.keys("mian"), ["main gate"])
+
+    def test_transposition_in_long_query(self):
+        self.assertIn("lecture hall complex", self.keys("lecutre hall"))
+
+    def test_typo_when_an_unrelated_prefix_matches(self):
+        remember("Metor Shop")
+        self.assertIn("metro station", self.keys("metor"))
+
+
+class ImportTimeTests(SimpleTestCase):
+    # "import time: self [us] | cumulative [us] | name", nested imports indented
+    LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$", re.MULTILINE)
+
+    def import_worker(self):
+        """(cumulative ms, nesting depth) of each module a fresh API-only worker imports."""
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE, "API_ONLY": "true"}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import backend.wsgi"],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        return {name: (int(cumulative) / 1000, len(indent)) for cumulative, indent, name in self.LINE.findall(result.stderr)}
+
+    def test_api_only_worker_imports_within_budget(self):
+        # Best of three, so a busy machine doesn't fail the test
+        total = min(
+            sum(cumulative for cumulative, depth in self.import_worker().values() if depth == 1) for _ in range(3)
+        )
+        self.assertLess(total, IMPORT_BUDGET_MS)
+
+    def test_api_only_worker_skips_lazy_dependencies(self):
+        imported = self.import_worker()
+        for package in ["requests", "rest_framework", "rest_framework_simplejwt", "cProfile", "django.contrib.admin"]:
+            self.assertFalse([name for name in imported if name == package or name.startswith(package + ".")], package)
+
+
+class PrebuiltOpenAPITests(SimpleTestCase):
+    def schema_file(self, mtime):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "openapi.json"
+        path.write_text("{}")
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_schema_built_after_the_code_is_served(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=self.schema_file(time.time() + 60)):
+            self.assertTrue(prebuilt_openapi_is_current())
+
+    def test_schema_older_than_the_code_is_ignored(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=self.schema_file(0)), self.assertLogs("backend.urls", "WARNING"):
+            self.assertFalse(prebuilt_openapi_is_current())
+
+    def test_missing_schema_is_ignored(self):
+        with override_settings(OPENAPI_SCHEMA_FILE=Path(tempfile.gettempdir()) / "no-such-openapi.json"):
+            self.assertFalse(prebuilt_openapi_is_current())
+
+
+class OBDLogTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_locked_segment_is_not_drained(self):
+        log = obdlog.OBDLog(self.directory.name, 0)
+        log.append({"vehicle_id": 1})
+        obdlog.OBDLog(self.directory.name, 0)
+        self.assertIsNone(obdlog._drain_segment(log.active, 100))
+        self.assertTrue(log.active.exists())
+
+    def test_segment_is_not_drained_while_it_is_opened(self):
+        # Another process's flusher runs between creating the segment and locking it
+        lock = obdlog._lock
+
+        def drain_then_lock(file, blocking=True):
+            if blocking:  # the appender's lock; flushers don't block
+                for path in obdlog._segments(self.directory.name):
+                    obdlog._drain_segment(path, 100)
+            return lock(file, blocking)
+
+        with mock.patch.object(obdlog, "_lock", drain_then_lock):
+            log = obdlog.OBDLog(self.directory.name, 0)
+        log.append({"vehicle_id": 1})
+        self.assertEqual(obdlog._segments(self.directory.name), [log.active])
+        self.assertEqual(log.active.read_bytes().count(b"\n"), 1)
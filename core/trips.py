@@ -0,0 +1,148 @@
+from datetime import timedelta
+from math import asin, cos, radians, sin, sqrt
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from . import campus
+from .models import JobWatermark, OBDRecord, Trip, Vehicle, VehicleBooking
+
+WATERMARK_NAME = "trip_detector"
+EARTH_RADIUS_KM = 6371.0088
+
+RECORD_FIELDS = (
+    "id", "vehicle_id", "timestamp", "speed", "rpm", "fuel_level", "location_lat", "location_lng", "received_at",
+)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def _is_running(record):
+    # There is no ignition signal in the OBD feed, a non-zero rpm or speed
+    # means the engine is on.
+    return (record.rpm or 0) > 0 or (record.speed or 0) > 0
+
+
+def _booking_database(vehicle_id):
+    # Bookings live in the database of the vehicle owner's campus
+    if not settings.CAMPUS_DATABASES:
+        return campus.database(campus.DEFAULT_CAMPUS)
+    owner_campus = Vehicle.objects.filter(id=vehicle_id).values_list("driver__campus", flat=True).first()
+    return campus.database(owner_campus or campus.DEFAULT_CAMPUS)
+
+
+def _active_booking_id(vehicle_id, at):
+    return (
+        VehicleBooking.objects.using(_booking_database(vehicle_id)).filter(
+            availability__vehicle_id=vehicle_id,
+            availability__available_from__lte=at,
+            availability__available_to__gte=at,
+        )
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def _open_trip(record):
+    return Trip(
+        vehicle_id=record.vehicle_id,
+        booking_id=_active_booking_id(record.vehicle_id, record.timestamp),
+        started_at=record.timestamp,
+        ended_at=record.timestamp,
+    )
+
+
+def _extend_trip(trip, record):
+    if record.location_lat is not None and record.location_lng is not None:
+        if trip.last_lat is not None and trip.last_lng is not None:
+            trip.distance_km += haversine_km(trip.last_lat, trip.last_lng, record.location_lat, record.location_lng)
+        trip.last_lat, trip.last_lng = record.location_lat, record.location_lng
+    if record.speed is not None:
+        trip.max_speed = max(trip.max_speed or 0, record.speed)
+    if record.fuel_level is not None:
+        if trip.fuel_start is None:
+            trip.fuel_start = record.fuel_level
+        trip.fuel_end = record.fuel_level
+    trip.ended_at = record.timestamp
+    trip.record_count += 1
+    trip.last_record_id = record.id
+
+
+def _settled(records, settled):
+    # Ids are allocated at insert but visible at commit, so a lower id may
+    # still show up behind a record inserted within the settle window. The
+    # batch stops before the first such record and the watermark with it.
+    for index, record in enumerate(records):
+        if record.received_at is not None and record.received_at >= settled:
+            return records[:index]
+    return records
+
+
+def detect_trips(batch_size=2000):
+    """
+    Group new OBD records into trips, resuming after the stored watermark.
+
+    A trip opens on the first record with the engine running and closes on
+    an engine-off record or when no record arrives for TRIP_GAP_MINUTES.
+    Records younger than WRITE_SETTLE_SECONDS wait for the next run, so none
+    is skipped as long as no ingest transaction stays open longer than that.
+    """
+    gap = timedelta(minutes=settings.TRIP_GAP_MINUTES)
+    settled = now() - timedelta(seconds=settings.WRITE_SETTLE_SECONDS)
+    stats = {"records": 0, "opened": 0, "closed": 0}
+    JobWatermark.objects.get_or_create(name=WATERMARK_NAME)
+
+    while True:
+        with transaction.atomic():
+            watermark = JobWatermark.objects.select_for_update().get(name=WATERMARK_NAME)
+            records = _settled(
+                list(
+                    OBDRecord.objects.filter(id__gt=watermark.position)
+                    .order_by("id")
+                    .values_list(*RECORD_FIELDS, named=True)[:batch_size]
+                ),
+                settled,
+            )
+            if not records:
+                break
+
+            vehicle_ids = {r.vehicle_id for r in records}
+            open_trips = {t.vehicle_id: t for t in Trip.objects.filter(is_open=True, vehicle_id__in=vehicle_ids)}
+            touched = {}
+
+            for record in records:
+                trip = open_trips.get(record.vehicle_id)
+                if trip is not None and record.timestamp - trip.ended_at > gap:
+                    trip.is_open = False
+                    touched[id(trip)] = trip
+                    open_trips.pop(record.vehicle_id)
+                    stats["closed"] += 1
+                    trip = None
+
+                if trip is None:
+                    if not _is_running(record):
+                        continue
+                    trip = open_trips[record.vehicle_id] = _open_trip(record)
+                    stats["opened"] += 1
+
+                _extend_trip(trip, record)
+                touched[id(trip)] = trip
+                if not _is_running(record):
+                    trip.is_open = False
+                    open_trips.pop(record.vehicle_id)
+                    stats["closed"] += 1
+
+            for trip in touched.values():
+                trip.save()
+            watermark.position = records[-1].id
+            watermark.save()
+            stats["records"] += len(records)
+
+    # Close trips whose vehicle went silent without an engine-off record
+    stats["closed"] += Trip.objects.filter(is_open=True, ended_at__lt=now() - gap).update(is_open=False)
+    return stats
@@ -0,0 +1,86 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from . import campus, outbox
+from .models import RideBooking, VehicleAvailability, WaitlistEntry
+
+OPEN_STATUSES = (WaitlistEntry.WAITING, WaitlistEntry.OFFERED)
+
+
+def _target(ride=None, availability=None):
+    return {"ride": ride} if ride is not None else {"availability": availability}
+
+
+def active_hold(ride=None, availability=None):
+    return (
+        WaitlistEntry.objects.filter(status=WaitlistEntry.OFFERED, hold_expires_at__gt=now(), **_target(ride, availability))
+        .only("id", "user_id")
+        .first()
+    )
+
+
+def offer_next(ride=None, availability=None):
+    """
+    Hold a freed ride or slot for the longest-waiting user and notify them.
+
+    Call inside the transaction that frees the ride or slot, so the offer
+    and the cancellation commit together.
+    """
+    entry = (
+        WaitlistEntry.objects.select_for_update()
+        .filter(status=WaitlistEntry.WAITING, **_target(ride, availability))
+        .order_by("created_at", "id")
+        .first()
+    )
+    if entry is None:
+        return None
+
+    offered_at = now()
+    entry.status = WaitlistEntry.OFFERED
+    entry.offered_at = offered_at
+    entry.hold_expires_at = offered_at + timedelta(minutes=settings.WAITLIST_HOLD_MINUTES)
+    entry.save(update_fields=["status", "offered_at", "hold_expires_at"])
+    outbox.waitlist_offered(entry)
+    return entry
+
+
+def mark_accepted(user, ride=None, availability=None):
+    WaitlistEntry.objects.filter(user=user, status__in=OPEN_STATUSES, **_target(ride, availability)).update(
+        status=WaitlistEntry.ACCEPTED
+    )
+
+
+def release(entry):
+    """Cancel an entry; a pending offer passes to the next user in line."""
+    with campus.atomic():
+        was_offered = entry.status == WaitlistEntry.OFFERED
+        entry.status = WaitlistEntry.CANCELLED
+        entry.save(update_fields=["status"])
+        if was_offered:
+            offer_next(ride=entry.ride, availability=entry.availability)
+
+
+@campus.each_database
+def expire_holds():
+    """Expire lapsed offers and pass each still-free target to the next user."""
+    stats = {"expired": 0, "offered": 0}
+    lapsed = WaitlistEntry.objects.filter(status=WaitlistEntry.OFFERED, hold_expires_at__lte=now()).select_related(
+        "ride", "availability"
+    )
+    for entry in lapsed.iterator():
+        with campus.atomic():
+            updated = WaitlistEntry.objects.filter(id=entry.id, status=WaitlistEntry.OFFERED).update(
+                status=WaitlistEntry.EXPIRED
+            )
+            if not updated:
+                continue
+            stats["expired"] += 1
+            if entry.ride_id:
+                still_free = not RideBooking.objects.filter(ride_id=entry.ride_id).exists()
+            else:
+                still_free = VehicleAvailability.objects.filter(id=entry.availability_id, is_booked=False).exists()
+            if still_free and offer_next(ride=entry.ride, availability=entry.availability):
+                stats["offered"] += 1
+    return stats
@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 
 // Helper function to get the base API URL
@@ -34,6 +34,7 @@ export default function Dashboard() {
   const [obdData, setObdData] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
+  const sectionVersions = useRef({});
 
   useEffect(() => {
     // 1. Check for token and redirect to login if not found
@@ -51,26 +52,26 @@ export default function Dashboard() {
   const fetchData = async () => {
     try {
       setLoading(true);
-      // 2. Fetch data from various endpoints concurrently
-      const [
-        userRes,
-        vehiclesRes,
-        availableVehiclesRes,
-        myAvailabilityRes,
-        myBookingsRes,
-      ] = await Promise.all([
-        axios.get(`${API_URL}/api/me`),
-        axios.get(`${API_URL}/api/vehicles`),
-        axios.get(`${API_URL}/api/vehicle-availability`),
-        axios.get(`${API_URL}/api/my-vehicle-availability`),
-        axios.get(`${API_URL}/api/my-vehicle-bookings`),
-      ]);
+      // 2. Fetch every dashboard section in one call, sending the versions we
+      // already hold so unchanged sections come back without data
+      const versions = Object.entries(sectionVersions.current)
+        .map(([name, version]) => `${name}:${version}`)
+        .join(",");
+      const res = await axios.get(`${API_URL}/api/dashboard`, {
+        params: versions ? { versions } : {},
+      });
 
-      setUser(userRes.data);
-      setVehicles(vehiclesRes.data);
-      setAvailableVehicles(availableVehiclesRes.data);
-      setMyVehicleAvailability(myAvailabilityRes.data);
-      setMyVehicleBookings(myBookingsRes.data);
+      const setters = {
+        me: setUser,
+        vehicles: setVehicles,
+        vehicle_availability: setAvailableVehicles,
+        my_vehicle_availability: setMyVehicleAvailability,
+        my_vehicle_bookings: setMyVehicleBookings,
+      };
+      Object.entries(res.data.sections).forEach(([name, section]) => {
+        sectionVersions.current[name] = section.version;
+        if (!section.unchanged) setters[name](section.data);
+      });
       setError("");
     } catch (err) {
       console.error(err);